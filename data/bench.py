@@ -0,0 +1,204 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+try:
+    from .data import generate_university_students_data
+    from .pools import user_cache_dir
+    from .profiling import record_stages
+    from .writers import write_csv
+except ImportError:
+    from data import generate_university_students_data
+    from pools import user_cache_dir
+    from profiling import record_stages
+    from writers import write_csv
+
+DEFAULT_ROW_COUNTS = [1000, 100000, 1000000]
+DEFAULT_HISTORY_PATH = os.path.join(user_cache_dir('bench'), 'bench_history.json')
+DEFAULT_THRESHOLD = 0.2
+
+"""
+Timings compared against the previous run of the same row count
+"""
+TIMED_METRICS = ['generation_seconds', 'csv_write_seconds', 'plot_seconds']
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def benchmark_generation(row_count, repeat=3):
+    """
+    Time generate_university_students_data and return the best wall time in seconds
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        generate_university_students_data(row_count)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def benchmark_row_count(row_count, repeat=3, plot=True):
+    """
+    Measure one row count: best generation time, seconds per generator stage,
+    CSV write time, plot time and the peak RSS of the process
+    """
+    result = {'row_count': row_count, 'generation_seconds': benchmark_generation(row_count, repeat)}
+
+    with record_stages() as stages:
+        df = generate_university_students_data(row_count, rng=np.random.default_rng(0))
+    result['stages'] = stages
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = os.path.join(tmp_dir, 'university_data.csv')
+        start = time.perf_counter()
+        write_csv([df], csv_path)
+        result['csv_write_seconds'] = time.perf_counter() - start
+        del df
+
+        if plot:
+            result['plot_seconds'] = _benchmark_plot(csv_path, tmp_dir)
+
+    result['peak_rss_mb'] = _peak_rss_mb()
+    return result
+
+
+def _benchmark_plot(csv_path, tmp_dir):
+    try:
+        from .plot2 import plot_pie_charts_and_distributions
+    except ImportError:
+        from plot2 import plot_pie_charts_and_distributions
+
+    cwd = os.getcwd()
+    os.makedirs(os.path.join(tmp_dir, 'output'))
+    os.chdir(tmp_dir)
+    try:
+        start = time.perf_counter()
+        plot_pie_charts_and_distributions(csv_path)
+        return time.perf_counter() - start
+    finally:
+        os.chdir(cwd)
+
+
+def run_benchmarks(row_counts, repeat=3, plot=True):
+    """
+    Benchmark every row count in a fresh process, so the peak RSS of one size
+    does not hide the next one
+    """
+    results = []
+    for row_count in row_counts:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            results.append(executor.submit(benchmark_row_count, row_count, repeat, plot).result())
+    return results
+
+
+def load_history(history_path):
+    if not os.path.exists(history_path):
+        return []
+    with open(history_path) as f:
+        return json.load(f)
+
+
+def find_regressions(history, results, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare results with the latest run in history of each row count and return
+    (row_count, metric, previous, current) for every timing more than threshold slower
+    """
+    regressions = []
+    for result in results:
+        previous = next(
+            (r for run in reversed(history) for r in run['results'] if r['row_count'] == result['row_count']),
+            None
+        )
+        if previous is None:
+            continue
+        for metric in TIMED_METRICS:
+            if metric in previous and metric in result and result[metric] > previous[metric] * (1 + threshold):
+                regressions.append((result['row_count'], metric, previous[metric], result[metric]))
+    return regressions
+
+
+def save_history(history_path, history, results):
+    history.append({
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'results': results,
+    })
+    history_dir = os.path.dirname(history_path)
+    if history_dir:
+        os.makedirs(history_dir, exist_ok=True)
+    with open(history_path, 'w') as f:
+        json.dump(history, f, indent=2)
+
+
+def print_report(results):
+    print(f"{'rows':>10} {'generate s':>11} {'rows/sec':>12} {'csv write s':>12} {'plot s':>8} {'peak RSS MB':>12}")
+    for r in results:
+        plot_seconds = f"{r['plot_seconds']:.3f}" if 'plot_seconds' in r else '-'
+        rss = f"{r['peak_rss_mb']:.0f}" if r['peak_rss_mb'] is not None else '-'
+        print(f"{r['row_count']:>10} {r['generation_seconds']:>11.3f} "
+              f"{r['row_count'] / r['generation_seconds']:>12,.0f} {r['csv_write_seconds']:>12.3f} "
+              f"{plot_seconds:>8} {rss:>12}")
+
+    largest = results[-1]
+    total = sum(largest['stages'].values())
+    print(f"\nGenerator stages at {largest['row_count']} rows:")
+    for name, seconds in sorted(largest['stages'].items(), key=lambda item: -item[1]):
+        print(f"  {name:<24} {seconds:>9.4f} s {100 * seconds / total:>6.1f}%")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='bench.py',
+        description='Benchmark generation, CSV writing and plotting of the university students dataset'
+    )
+    parser.add_argument('row_counts', nargs='*', type=int, default=DEFAULT_ROW_COUNTS,
+                        help=f'row counts to benchmark (default: {" ".join(map(str, DEFAULT_ROW_COUNTS))})')
+    parser.add_argument('--repeat', type=int, default=3, help='generation runs per row count, the best is kept')
+    parser.add_argument('--no-plot', dest='plot', action='store_false', help='skip timing plot2.py')
+    parser.add_argument('--history', default=DEFAULT_HISTORY_PATH,
+                        help=f'JSON file the results are appended to (default: {DEFAULT_HISTORY_PATH})')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='flag timings this fraction slower than the previous run (default: 0.2)')
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    if not args.row_counts or any(row_count <= 0 for row_count in args.row_counts):
+        print("Error: Row counts must be positive")
+        sys.exit(1)
+
+    results = run_benchmarks(args.row_counts, args.repeat, args.plot)
+    print_report(results)
+
+    history = load_history(args.history)
+    regressions = find_regressions(history, results, args.threshold)
+    save_history(args.history, history, results)
+    print(f"\nResults appended to '{args.history}'")
+
+    if regressions:
+        print(f"\nSlower than the previous run by more than {args.threshold:.0%}:")
+        for row_count, metric, previous, current in regressions:
+            print(f"  {row_count} rows {metric}: {previous:.3f} -> {current:.3f}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+
+try:
+    from .pools import user_cache_dir
+    from .writers import STORE_META
+except ImportError:
+    from pools import user_cache_dir
+    from writers import STORE_META
+
+DEFAULT_CACHE_DIR = user_cache_dir('datasets')
+DEFAULT_CACHE_SIZE_MB = 4096
+
+"""
+Every entry is a directory named by its key holding the cached outputs and ENTRY_META,
+the size and mtime of every file when it was stored. The mtime of ENTRY_META is the
+last use of the entry, STATS counts the hits, misses and evictions of the cache
+"""
+ENTRY_META = 'entry.json'
+STATS = 'stats.json'
+
+
+def cache_key(params):
+    """
+    Content address of a run: the hash of every parameter that decides its output
+    """
+    return hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def source_hash(paths):
+    """
+    Hash of the given source files, so a cache key changes with the generator code
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(os.path.basename(path).encode() + b'\0' + f.read() + b'\0')
+    return digest.hexdigest()
+
+
+def _files(path):
+    """
+    Paths of the files of an output relative to it, [''] when the output is a single file
+    """
+    if not os.path.isdir(path):
+        return ['']
+    return sorted(os.path.relpath(os.path.join(root, name), path)
+                  for root, _, names in os.walk(path) for name in names)
+
+
+def _copy(source, target):
+    """
+    Copy source to a new file at target, never sharing its inode: writers append to and
+    --evolve edits outputs in place, which would write through a hard link into the cache.
+    copy_file_range lets file systems that support it, like btrfs or XFS, share the extents
+    copy-on-write instead of copying the bytes
+    """
+    try:
+        with open(source, 'rb') as src, open(target, 'wb') as dst:
+            remaining = os.fstat(src.fileno()).st_size
+            while remaining > 0:
+                copied = os.copy_file_range(src.fileno(), dst.fileno(), remaining)
+                if copied == 0:
+                    break
+                remaining -= copied
+        shutil.copystat(source, target)
+    except (AttributeError, OSError):
+        shutil.copy2(source, target)
+
+
+def _copy_output(source, target):
+    """
+    Copy an output, a file or a directory of files like a column store, to target
+    """
+    if not os.path.isdir(source):
+        _copy(source, target)
+        return
+    for relative in _files(source):
+        os.makedirs(os.path.dirname(os.path.join(target, relative)), exist_ok=True)
+        _copy(os.path.join(source, relative), os.path.join(target, relative))
+
+
+def _output_file(path, relative):
+    return os.path.join(path, relative) if relative else path
+
+
+def remove_output(path):
+    """
+    Delete an output before it is written again, so the writer starts from new files
+    """
+    if os.path.isdir(path):
+        if not os.path.exists(os.path.join(path, STORE_META)):
+            raise ValueError(f"'{path}' is a directory but not a column store, refusing to replace it")
+        shutil.rmtree(path)
+    elif os.path.lexists(path):
+        os.remove(path)
+
+
+class GenerationCache:
+    """
+    Content-addressed cache of generated files under directory, at most max_bytes of
+    them, the least recently used entries are evicted first.
+    Outputs are dicts of name to path, stored and restored as copies, so an output and
+    its entry never share a file. A cached file that was modified since it was stored
+    is a miss.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_CACHE_SIZE_MB * 2 ** 20):
+        if max_bytes < 0:
+            raise ValueError("Cache size must not be negative")
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _entry(self, key):
+        return os.path.join(self.directory, key)
+
+    def _read_meta(self, key):
+        try:
+            with open(os.path.join(self._entry(key), ENTRY_META)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _is_intact(self, key, meta):
+        for name, files in meta['files'].items():
+            for relative, (size, mtime_ns) in files.items():
+                try:
+                    stat = os.stat(_output_file(os.path.join(self._entry(key), name), relative))
+                except OSError:
+                    return False
+                if (stat.st_size, stat.st_mtime_ns) != (size, mtime_ns):
+                    return False
+        return True
+
+    def _count(self, counter, amount=1):
+        """
+        Add to a counter of STATS, replacing the file atomically. Concurrent runs may lose an update
+        """
+        stats = self.stats_counters()
+        stats[counter] += amount
+        tmp_path = os.path.join(self.directory, f'{STATS}.{os.getpid()}.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(stats, f)
+        os.replace(tmp_path, os.path.join(self.directory, STATS))
+
+    def stats_counters(self):
+        try:
+            with open(os.path.join(self.directory, STATS)) as f:
+                return {'hits': 0, 'misses': 0, 'evictions': 0, **json.load(f)}
+        except (OSError, ValueError):
+            return {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def entries(self):
+        """
+        (last use, bytes, key) of every entry, least recently used first
+        """
+        entries = []
+        for key in os.listdir(self.directory):
+            meta_path = os.path.join(self._entry(key), ENTRY_META)
+            meta = self._read_meta(key) if os.path.isfile(meta_path) else None
+            if meta is not None:
+                entries.append((os.stat(meta_path).st_mtime, meta['bytes'], key))
+        return sorted(entries)
+
+    def restore(self, key, outputs):
+        """
+        Copy the cached outputs of key to their paths and return True, or return False on a miss
+        """
+        meta = self._read_meta(key)
+        if meta is None or set(meta['files']) != set(outputs) or not self._is_intact(key, meta):
+            if meta is not None:
+                shutil.rmtree(self._entry(key), ignore_errors=True)
+                self._count('evictions')
+            self._count('misses')
+            return False
+        for name, path in outputs.items():
+            remove_output(path)
+            _copy_output(os.path.join(self._entry(key), name), path)
+        os.utime(os.path.join(self._entry(key), ENTRY_META))
+        self._count('hits')
+        return True
+
+    def store(self, key, outputs, params=None):
+        """
+        Copy the freshly written outputs into the entry of key, then evict down to max_bytes.
+        When another run stored the same key first, its entry is kept
+        """
+        tmp_entry = os.path.join(self.directory, f'.{key}.{os.getpid()}.tmp')
+        shutil.rmtree(tmp_entry, ignore_errors=True)
+        os.makedirs(tmp_entry)
+        files = {}
+        for name, path in outputs.items():
+            _copy_output(path, os.path.join(tmp_entry, name))
+            files[name] = {}
+            for relative in _files(path):
+                stat = os.stat(_output_file(os.path.join(tmp_entry, name), relative))
+                files[name][relative] = [stat.st_size, stat.st_mtime_ns]
+        meta = {'params': params, 'files': files, 'stored': time.time(),
+                'bytes': sum(size for entry in files.values() for size, _ in entry.values())}
+        with open(os.path.join(tmp_entry, ENTRY_META), 'w') as f:
+            json.dump(meta, f, indent=2, default=str)
+
+        try:
+            os.rename(tmp_entry, self._entry(key))
+        except OSError:
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+        self.evict()
+
+    def evict(self):
+        """
+        Delete the least recently used entries until the cache fits in max_bytes
+        """
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, key in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(self._entry(key), ignore_errors=True)
+            total -= size
+            evicted += 1
+        if evicted:
+            self._count('evictions', evicted)
+
+    def report(self):
+        stats = self.stats_counters()
+        entries = self.entries()
+        lookups = stats['hits'] + stats['misses']
+        rate = f" ({stats['hits'] / lookups:.0%} hit rate)" if lookups else ''
+        return (f"cache: {stats['hits']} hits, {stats['misses']} misses{rate}, {stats['evictions']} evictions, "
+                f"{len(entries)} entries, {sum(size for _, size, _ in entries) / 2 ** 20:.1f} of "
+                f"{self.max_bytes / 2 ** 20:.0f} MB in '{self.directory}'")
@@ -0,0 +1,17 @@
+import os
+import shutil
+import tempfile
+
+"""
+Tests must not write Faker pools or cached datasets into the real ~/.cache. XDG_CACHE_HOME
+is set before any test module imports data.pools, and the data.py subprocesses inherit it
+"""
+_cache_home = tempfile.mkdtemp(prefix='data-generator-tests-')
+
+
+def pytest_configure(config):
+    os.environ['XDG_CACHE_HOME'] = _cache_home
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(_cache_home, ignore_errors=True)
@@ -0,0 +1,78 @@
+import numpy as np
+
+"""
+Philox turns every value of its counter into 4 random 64-bit words
+"""
+WORDS_PER_COUNTER = 4
+
+
+def chunk_rng(entropy, chunk_index):
+    """
+    Independent random generator of one chunk, derived from the master seed entropy
+    and the chunk index, so a chunk draws the same values whichever process runs it
+    """
+    return np.random.default_rng(np.random.SeedSequence(entropy, spawn_key=(chunk_index,)))
+
+
+def _poisson_cdf(lam):
+    """
+    Cumulative probabilities of a poisson(lam) up to where the tail is below float precision
+    """
+    pmf = [np.exp(-lam)]
+    while sum(pmf) < 1 - 1e-16 and len(pmf) < 10000:
+        pmf.append(pmf[-1] * lam / len(pmf))
+    return np.cumsum(pmf)
+
+
+class CounterRandom:
+    """
+    Stand-in for the np.random.Generator methods the column specs use, where every
+    value of a call for row start + i only depends on the entropy, the stream, the
+    number of the call and start + i. Any range of rows therefore draws exactly the
+    values the same rows draw in any other range.
+    Each call reads one Philox word per row, positioned by the row index, and turns
+    it into the distribution by inversion, so no method consumes a variable number
+    of words.
+    """
+
+    def __init__(self, entropy, stream, start):
+        self.entropy = entropy
+        self.stream = tuple(stream)
+        self.start = start
+        self._calls = 0
+
+    def _uniform(self, size):
+        key = np.random.SeedSequence(self.entropy, spawn_key=self.stream + (self._calls,)).generate_state(2, np.uint64)
+        self._calls += 1
+        skip = self.start % WORDS_PER_COUNTER
+        counter = np.array([self.start // WORDS_PER_COUNTER, 0, 0, 0], dtype=np.uint64)
+        words = np.random.Philox(key=key, counter=counter).random_raw(skip + size)[skip:]
+        return (words >> np.uint64(11)) * 2.0 ** -53
+
+    def random(self, size=None):
+        return self._uniform(size)
+
+    def integers(self, low, high=None, size=None, dtype=np.int64):
+        if high is None:
+            low, high = 0, low
+        values = low + np.floor(self._uniform(size) * (high - low))
+        return np.minimum(values, high - 1).astype(dtype)
+
+    def choice(self, a, size=None, p=None):
+        if p is None:
+            return self.integers(0, a, size)
+        cumulative = np.cumsum(p)
+        return np.minimum(np.searchsorted(cumulative / cumulative[-1], self._uniform(size), side='right'), a - 1)
+
+    def normal(self, loc=0.0, scale=1.0, size=None):
+        """
+        Box-Muller transform of two calls
+        """
+        radius = np.sqrt(-2.0 * np.log1p(-self._uniform(size)))
+        return loc + scale * radius * np.cos(2.0 * np.pi * self._uniform(size))
+
+    def poisson(self, lam=1.0, size=None):
+        return np.searchsorted(_poisson_cdf(lam), self._uniform(size), side='right')
+
+    def standard_cauchy(self, size=None):
+        return np.tan(np.pi * (self._uniform(size) - 0.5))
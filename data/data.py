@@ -1,231 +1,1010 @@
-import csv
+import argparse
+import shutil
 import sys
-import pandas as pd
+import time
+from collections import deque
+from contextlib import nullcontext
 import numpy as np
-from faker import Faker
-from scipy import stats
-from datetime import datetime
+from datetime import date, datetime, timedelta
 import os
 from dateutil.relativedelta import relativedelta
 
+try:
+    from .cache import DEFAULT_CACHE_DIR, DEFAULT_CACHE_SIZE_MB, GenerationCache, cache_key, remove_output, source_hash
+    from .counter_rng import chunk_rng
+    from .incremental import append_point, evolve_output
+    from .lazy import lazy_import
+    from .pools import DEFAULT_LOCALE, DEFAULT_POOL_SIZE, faker_version, load_pools
+    from .writers import DEFAULT_ROW_GROUP_SIZE, FORMAT_EXTENSIONS, WRITERS, format_from_path, write_csv
+    from .profiling import is_profiling, is_tracing_memory, merge_profile, profiling, record_chunk, run_profiled, stage
+    from .schema import Schema
+    from .pipeline import DEFAULT_QUEUE_DEPTH, write_pipelined, write_tables_pipelined
+    from .sinks import DEFAULT_SINK_BATCH_ROWS, SINKS, parse_sink
+    from .tables import (DEFAULT_ADVISOR_COUNT, advisor_ids, advisor_names, advisor_pool_size, advisors_table,
+                         check_advisor_count, courses_table, enrollments, prefixed_ids, program_advisors,
+                         programs_table)
+except ImportError:
+    from cache import DEFAULT_CACHE_DIR, DEFAULT_CACHE_SIZE_MB, GenerationCache, cache_key, remove_output, source_hash
+    from counter_rng import chunk_rng
+    from incremental import append_point, evolve_output
+    from lazy import lazy_import
+    from pools import DEFAULT_LOCALE, DEFAULT_POOL_SIZE, faker_version, load_pools
+    from writers import DEFAULT_ROW_GROUP_SIZE, FORMAT_EXTENSIONS, WRITERS, format_from_path, write_csv
+    from profiling import is_profiling, is_tracing_memory, merge_profile, profiling, record_chunk, run_profiled, stage
+    from schema import Schema
+    from pipeline import DEFAULT_QUEUE_DEPTH, write_pipelined, write_tables_pipelined
+    from sinks import DEFAULT_SINK_BATCH_ROWS, SINKS, parse_sink
+    from tables import (DEFAULT_ADVISOR_COUNT, advisor_ids, advisor_names, advisor_pool_size, advisors_table,
+                        check_advisor_count, courses_table, enrollments, prefixed_ids, program_advisors,
+                        programs_table)
+
+"""
+pandas and the process pool are imported on first use, so --help and bad arguments
+answer without loading them
+"""
+pd = lazy_import('pandas')
+futures = lazy_import('concurrent.futures')
+
 current_year = datetime.now().year
 
-fake = Faker()
-
-def generate_university_students_data(row_count):
-    """
-    Generate university-related pseudorandom data
-    """
-    data = {
-        'student_id': [f'STU{str(i).zfill(6)}' for i in range(row_count)],
-        'first_name': [],
-        'last_name': [fake.last_name() for _ in range(row_count)],
-        'type_id_number': [],
-        'identification_number': [],
-        'date_of_birth': [fake.date_of_birth(minimum_age=16, maximum_age=25) for _ in range(row_count)],
-        'email': [],
-        'address': [],
-        'gender': [],
-        'nationality': [],
-        'country_code': [],
-        'phone_number': [],
-        'program': [],
-        'state_program': [],
-        'current_semester': [],
-        'Number_of_credits_approved': [],
-        'credits_remaining': [],
-        'GPA': [],
-        'enrollment_date': [fake.date_between(start_date='-4y', end_date='today') for _ in range(row_count)],
-        'student_status': [],
-        'advisor_id': [f'ADV{str(i).zfill(4)}' for i in np.random.randint(1, 50, row_count)],
-        'advisor_name': [fake.name() for _ in range(row_count)],
-        'scholarship': [],
-        'payment_status': np.random.choice(['Paid', 'Pending', 'Late'], row_count),
-        'academic_standing': [],
-        'course_load': [],
-        'marital_status': [],
-        'library_books_borrowed': np.random.poisson(lam=3, size=row_count)
-    }
+DEFAULT_CHUNK_SIZE = 1000000
 
-    """
-    Generate random data, according the gender if the name
-    """
-    genders = np.random.choice(['Male', 'Female', 'Other'], size=row_count, p=[0.45, 0.45, 0.1])
-    data['gender'] = genders
-    for i in range(row_count):
-        gender = data['gender'][i]
-        if gender == 'Male':
-            data['first_name'].append(fake.first_name_male())
-        elif gender == 'Female':
-            data['first_name'].append(fake.first_name_female())
-        else:
-            data['first_name'].append(fake.first_name_nonbinary())
+GENDERS = ['Male', 'Female', 'Other']
 
-    """
-    Generate random data, according the first name and last name
-    """
-    for i in range(row_count):
-        data['email'].append(
-            f"{data['first_name'][i].lower()}.{data['last_name'][i].lower()}@university.edu.co"
-        )
+PROGRAMS = [
+    'Computer Science', 'Software Engineering', 'Information Technology', 'Data Science',
+    'Cybersecurity', 'Artificial Intelligence', 'Engineering', 'Mechanical Engineering',
+    'Electrical Engineering', 'Civil Engineering', 'Industrial Engineering', 'Biology',
+    'Chemistry', 'Biotechnology', 'Medicine', 'Nursing', 'Pharmacy', 'Psychology',
+    'Sociology', 'Anthropology', 'Political Science', 'Philosophy', 'History',
+    'Business Administration', 'Marketing', 'Accounting', 'Economics', 'Finance',
+    'Entrepreneurship', 'Graphic Design', 'Architecture', 'Music', 'International Relations'
+]
 
-    """
-    Generate random address
-    """
-    data['address'] = [fake.address().replace('\n', ', ') for _ in range(row_count)]
+NATIONALITIES = ['Colombia', 'USA', 'Brazil', 'Argentina', 'Spain', 'Mexico', 'Peru', 'Chile', 'Ecuador', 'Venezuela']
 
-    """
-    Generate random data, according the age of the student
-    """
-    for i in range(row_count):
-        age = current_year - data['date_of_birth'][i].year
-        if 16 <= age <= 17:
-            data['type_id_number'].append('TI')
-        else:
-            data['type_id_number'].append('CC')
+"""
+Colombia has 80 draws out of 98, every other country 2
+"""
+NATIONALITY_WEIGHTS = np.array([80] + [2] * (len(NATIONALITIES) - 1)) / 98
+
+COUNTRY_CODES = {
+    'Colombia': '+57', 'USA': '+1', 'Brazil': '+55', 'Argentina': '+54', 'Spain': '+34',
+    'Mexico': '+52', 'Peru': '+51', 'Chile': '+56', 'Ecuador': '+593', 'Venezuela': '+58'
+}
+
+PHONE_STARTS = {
+    'Colombia': [3], 'USA': [2, 3, 4, 5, 6, 7, 8, 9], 'Brazil': [9],
+    'Argentina': [9], 'Spain': [6, 7], 'Mexico': [2, 3, 4, 5, 6, 7, 8, 9],
+    'Peru': [9], 'Chile': [9], 'Ecuador': [9], 'Venezuela': [4]
+}
+
+"""
+Lookup table indexed by nationality code of the allowed first digits of
+the phone number, padded to a rectangle
+"""
+PHONE_START_COUNTS = np.array([len(PHONE_STARTS[n]) for n in NATIONALITIES])
+PHONE_START_TABLE = np.array([
+    PHONE_STARTS[n] + [0] * (PHONE_START_COUNTS.max() - len(PHONE_STARTS[n])) for n in NATIONALITIES
+])
+
+COLUMNS = [
+    'student_id', 'first_name', 'last_name', 'type_id_number', 'identification_number', 'date_of_birth',
+    'email', 'address', 'gender', 'nationality', 'country_code', 'phone_number', 'program', 'state_program',
+    'current_semester', 'Number_of_credits_approved', 'credits_remaining', 'GPA', 'enrollment_date',
+    'student_status', 'advisor_id', 'advisor_name', 'scholarship', 'payment_status', 'academic_standing',
+    'course_load', 'marital_status', 'library_books_borrowed'
+]
+
+TYPE_ID_NUMBERS = ['TI', 'CC']
+PAYMENT_STATUSES = ['Paid', 'Pending', 'Late']
+ACADEMIC_STANDINGS = ['Excellent', 'Good', 'Average', 'Poor']
+MARITAL_STATUSES = ['Single', 'Married', 'Divorced']
+STATE_PROGRAMS = ['Enrolled', 'Suspended', 'Withdrawn']
+STUDENT_STATUSES = ['Active', 'Inactive']
+
+"""
+Every value the low-cardinality columns can take, used to dictionary encode them
+"""
+CATEGORIES = {
+    'type_id_number': TYPE_ID_NUMBERS,
+    'gender': GENDERS,
+    'nationality': NATIONALITIES,
+    'country_code': [COUNTRY_CODES[n] for n in NATIONALITIES],
+    'program': PROGRAMS,
+    'state_program': STATE_PROGRAMS,
+    'student_status': STUDENT_STATUSES,
+    'payment_status': PAYMENT_STATUSES,
+    'academic_standing': ACADEMIC_STANDINGS,
+    'marital_status': MARITAL_STATUSES,
+}
 
-    """
-    Generate random data, according the type of id number
-    """
-    data['identification_number'] = np.random.randint(10000000, 9999999999, size=row_count, dtype=np.int64)
 
+def _months_between(start, end):
+    """
+    Whole months elapsed from each start date to end, like relativedelta(end, start):
+    a month is not complete until end reaches the start day, clipped to the length of
+    the end month, so 2025-08-31 to 2026-02-28 is 6 months
+    """
+    start_months = start.astype('datetime64[M]')
+    start_days = (start - start_months).astype(np.int64) + 1
+    end_months = np.datetime64(end, 'M')
+    end_month_days = ((end_months + 1).astype('datetime64[D]') - end_months.astype('datetime64[D]')).astype(np.int64)
+    months = (end_months - start_months).astype(np.int64)
+    return months - (np.minimum(start_days, end_month_days) > end.day)
+
+
+def _random_dates(rng, start, end, size):
     """
-    Generate random programs
+    Draw dates uniformly between start and end (both inclusive) as datetime64[D]
     """
-    data['program'] = np.random.choice([
-        'Computer Science', 'Software Engineering', 'Information Technology', 'Data Science',
-        'Cybersecurity', 'Artificial Intelligence', 'Engineering', 'Mechanical Engineering',
-        'Electrical Engineering', 'Civil Engineering', 'Industrial Engineering', 'Biology',
-        'Chemistry', 'Biotechnology', 'Medicine', 'Nursing', 'Pharmacy', 'Psychology',
-        'Sociology', 'Anthropology', 'Political Science', 'Philosophy', 'History',
-        'Business Administration', 'Marketing', 'Accounting', 'Economics', 'Finance',
-        'Entrepreneurship', 'Graphic Design', 'Architecture', 'Music', 'International Relations'
-    ], row_count)
+    days = rng.integers(0, (end - start).days + 1, size)
+    return np.datetime64(start, 'D') + days
+
 
+def _enumeration(column, codes, compact):
     """
-    Generate randon number total credits
+    Column of CATEGORIES[column] values from their integer codes, as a pandas
+    Categorical when compact and as an array of strings otherwise
     """
-    total_credits = np.random.randint(140, 181, size=row_count)
+    if compact:
+        return pd.Categorical.from_codes(codes, categories=CATEGORIES[column])
+    return np.array(CATEGORIES[column])[codes]
+
+
+def _narrow(values, dtype, compact):
+    return values.astype(dtype) if compact else values
+
+
+"""
+Every column of the dataset, plus the hidden ones they are computed from, in the
+order they were historically generated. Enumerations are generated as integer
+codes into CATEGORIES and turned into values when the DataFrame is built.
+"""
+SCHEMA = Schema()
+
+
+def _pools(batch):
+    return load_pools(batch.locale, batch.pool_size)
+
+
+@SCHEMA.column('student_id', distribution='sequential STU000000 from the chunk offset')
+def _student_id(batch):
+    return prefixed_ids('STU', np.arange(batch.offset, batch.offset + batch.size), 6)
+
+
+@SCHEMA.column('date_of_birth', distribution='uniform over the days of ages 16 to 26')
+def _date_of_birth(batch):
+    return _random_dates(batch.rng, batch.today - relativedelta(years=26) + timedelta(days=1),
+                         batch.today - relativedelta(years=16), batch.size)
+
+
+@SCHEMA.column('enrollment_date', distribution='uniform over the last 4 years')
+def _enrollment_date(batch):
+    return _random_dates(batch.rng, batch.today - relativedelta(years=4), batch.today, batch.size)
+
+
+"""
+Students join the advisors table by index: advisor_id and advisor_name are looked up
+from the same hidden advisor_index, an advisor of the student's program
+"""
+@SCHEMA.column('advisor_id', depends=['advisor_index'], distribution='id of the advisor, from ADV0001')
+def _advisor_id(batch):
+    return advisor_ids(np.arange(batch.advisor_count))[batch['advisor_index']]
+
+
+@SCHEMA.column('advisor_name', depends=['advisor_index'], distribution='name of the advisor')
+def _advisor_name(batch):
+    pools = load_pools(batch.locale, advisor_pool_size(batch.pool_size, batch.advisor_count))
+    return advisor_names(pools, batch.advisor_count)[batch['advisor_index']]
+
+
+@SCHEMA.column('payment_status', distribution='uniform over PAYMENT_STATUSES')
+def _payment_status(batch):
+    return batch.rng.choice(len(PAYMENT_STATUSES), batch.size)
+
+
+@SCHEMA.column('library_books_borrowed', distribution='poisson, mean 3')
+def _library_books_borrowed(batch):
+    return batch.rng.poisson(lam=3, size=batch.size)
+
+
+@SCHEMA.column('gender', distribution='Male 45%, Female 45%, Other 10%')
+def _gender(batch):
+    return batch.rng.choice(len(GENDERS), size=batch.size, p=[0.45, 0.45, 0.1])
+
+
+"""
+Generate random data, according the gender if the name.
+The pool indices are hidden columns so the email can lowercase the pools instead of every row
+"""
+@SCHEMA.column('first_name_index', distribution='uniform index into the first name pools')
+def _first_name_index(batch):
+    return batch.rng.integers(0, batch.pool_size, batch.size)
+
+
+@SCHEMA.column('last_name_index', distribution='uniform index into the last name pool')
+def _last_name_index(batch):
+    return batch.rng.integers(0, batch.pool_size, batch.size)
+
+
+def _first_name_pool(pools):
+    return np.stack([pools['first_name_male'], pools['first_name_female'], pools['first_name_nonbinary']])
+
+
+@SCHEMA.column('first_name', depends=['gender', 'first_name_index'], distribution='Faker first name of the gender')
+def _first_name(batch):
+    return _first_name_pool(_pools(batch))[batch['gender'], batch['first_name_index']]
+
+
+@SCHEMA.column('last_name', depends=['last_name_index'], distribution='Faker last name')
+def _last_name(batch):
+    return _pools(batch)['last_name'][batch['last_name_index']]
+
+
+"""
+Generate random data, according the first name and last name
+"""
+@SCHEMA.column('email', depends=['gender', 'first_name_index', 'last_name_index'],
+               distribution='first_name.last_name@university.edu.co, lowercase')
+def _email(batch):
+    pools = _pools(batch)
+    first_names = np.char.lower(_first_name_pool(pools))[batch['gender'], batch['first_name_index']]
+    last_names = np.char.lower(pools['last_name'])[batch['last_name_index']]
+    return np.char.add(np.char.add(np.char.add(first_names, '.'), last_names), '@university.edu.co')
+
+
+@SCHEMA.column('address', distribution='uniform from the Faker address pool')
+def _address(batch):
+    return _pools(batch)['address'][batch.rng.integers(0, batch.pool_size, batch.size)]
+
+
+"""
+Generate random data, according the age of the student
+"""
+@SCHEMA.column('type_id_number', depends=['date_of_birth'], distribution='TI when 16 or 17 years old, CC otherwise')
+def _type_id_number(batch):
+    birth_years = batch['date_of_birth'].astype('datetime64[Y]').astype(np.int64) + 1970
+    ages = current_year - birth_years
+    return np.where((ages >= 16) & (ages <= 17), 0, 1)
+
+
+@SCHEMA.column('identification_number', distribution='uniform 10000000 to 9999999998')
+def _identification_number(batch):
+    return batch.rng.integers(10000000, 9999999999, size=batch.size, dtype=np.int64)
+
+
+@SCHEMA.column('program', distribution='uniform over PROGRAMS')
+def _program(batch):
+    return batch.rng.choice(len(PROGRAMS), batch.size)
+
+
+@SCHEMA.column('total_credits', distribution='uniform 140 to 180 (hidden)')
+def _total_credits(batch):
+    return batch.rng.integers(140, 181, size=batch.size)
+
+
+"""
+Calculate the current semester from the enrollment date
+"""
+@SCHEMA.column('current_semester', depends=['enrollment_date'], distribution='semesters since enrollment, 1 to 10')
+def _current_semester(batch):
+    months_passed = _months_between(batch['enrollment_date'], batch.now)
+    return np.clip(months_passed // 6 + 1, 1, 10)
+
+
+"""
+Generate random number of credits approved, according the current semester,
+and the credits remaining, according the total credits
+"""
+@SCHEMA.column('Number_of_credits_approved', depends=['current_semester', 'total_credits'],
+               distribution='cauchy around 18 per semester, clipped to the semester and total credits')
+def _credits_approved(batch):
+    semesters = batch['current_semester']
+    return np.clip(
+        semesters * 18 + 5 * batch.rng.standard_cauchy(batch.size),
+        0, np.minimum(semesters * 18 + 18, batch['total_credits'])
+    ).astype(np.int64)
+
+
+@SCHEMA.column('credits_remaining', depends=['Number_of_credits_approved', 'total_credits'],
+               distribution='total credits minus credits approved')
+def _credits_remaining(batch):
+    return np.maximum(0, batch['total_credits'] - batch['Number_of_credits_approved'])
+
+
+"""
+Generate random GPA, and according the GPA its classification:
+Excellent from 4.5, Good from 4.0, Average from 3.0, Poor below.
+If the GPA is less than 4.5, the student is not eligible for a scholarship.
+The GPA is rounded to gpa_precision decimals (when given) and narrowed right away
+so the classification matches the written value
+"""
+@SCHEMA.column('GPA', distribution='normal, mean 3.5 and sd 0.5, clipped to 2.0 - 5.0')
+def _gpa(batch):
+    gpa = np.clip(batch.rng.normal(loc=3.5, scale=0.5, size=batch.size), 2.0, 5.0)
+    if batch.gpa_precision is not None:
+        gpa = np.round(gpa, batch.gpa_precision)
+    return _narrow(gpa, np.float32, batch.compact)
+
+
+@SCHEMA.column('academic_standing', depends=['GPA'], distribution='classification of the GPA')
+def _academic_standing(batch):
+    return 3 - np.searchsorted([3.0, 4.0, 4.5], batch['GPA'], side='right')
+
+
+@SCHEMA.column('scholarship', depends=['GPA'], distribution='GPA from 4.5')
+def _scholarship(batch):
+    return batch['GPA'] >= 4.5
+
+
+@SCHEMA.column('course_load', distribution='uniform 15 to 20')
+def _course_load(batch):
+    return batch.rng.integers(15, 21, batch.size)
+
 
+@SCHEMA.column('marital_status', distribution='Single 90%, Married 8%, Divorced 2%')
+def _marital_status(batch):
+    return batch.rng.choice(len(MARITAL_STATUSES), batch.size, p=[0.9, 0.08, 0.02])
+
+
+"""
+Generate random data about the state of the program, the student status is
+active or inactive according the state of the program
+"""
+@SCHEMA.column('state_program', distribution='Enrolled 70%, Suspended 15%, Withdrawn 15%')
+def _state_program(batch):
+    return batch.rng.choice(len(STATE_PROGRAMS), batch.size, p=[0.7, 0.15, 0.15])
+
+
+@SCHEMA.column('student_status', depends=['state_program'], distribution='Active when Enrolled')
+def _student_status(batch):
+    return (batch['state_program'] != 0).astype(np.int8)
+
+
+"""
+Generate nationalities random with a higher probability of being Colombian
+"""
+@SCHEMA.column('nationality', distribution='Colombia 80/98, every other country 2/98')
+def _nationality(batch):
+    return batch.rng.choice(len(NATIONALITIES), batch.size, p=NATIONALITY_WEIGHTS)
+
+
+@SCHEMA.column('country_code', depends=['nationality'], distribution='calling code of the nationality')
+def _country_code(batch):
+    return batch['nationality']
+
+
+"""
+Generate random phone numbers, according the country code and the first digit
+"""
+@SCHEMA.column('phone_number', depends=['nationality'],
+               distribution='10 digits starting with a mobile prefix of the nationality')
+def _phone_number(batch):
+    nationality_codes = batch['nationality']
+    start_index = (batch.rng.random(batch.size) * PHONE_START_COUNTS[nationality_codes]).astype(np.int64)
+    start_digits = PHONE_START_TABLE[nationality_codes, start_index]
+    remaining_digits = batch.rng.integers(100000000, 999999999, size=batch.size, dtype=np.int64)
+    return (start_digits * 1000000000 + remaining_digits).astype(str)
+
+
+"""
+Registered last so the streams of the columns above keep their registration index
+"""
+@SCHEMA.column('advisor_index', depends=['program'], distribution='uniform over the advisors of the program (hidden)')
+def _advisor_index(batch):
+    return program_advisors(batch['program'], batch.rng.random(batch.size), batch.advisor_count, len(PROGRAMS))
+
+
+@SCHEMA.column('enrollments', depends=['student_id', 'program', 'current_semester', 'course_load', 'GPA'],
+               distribution='course_load // 3 distinct courses of the program, grade around the GPA (table)')
+def _enrollments(batch):
+    return enrollments(np.arange(batch.offset, batch.offset + batch.size), batch['student_id'], batch['program'],
+                       batch['current_semester'], batch['course_load'], batch['GPA'], batch.rng, len(PROGRAMS))
+
+
+"""
+Dtypes of the small numeric columns when compact
+"""
+COMPACT_DTYPES = {
+    'library_books_borrowed': np.int16,
+    'current_semester': np.int8,
+    'Number_of_credits_approved': np.int16,
+    'credits_remaining': np.int16,
+    'course_load': np.int8,
+}
+
+
+def select_columns(columns=None):
+    """
+    Check a list of column names and return it without duplicates, all of COLUMNS when None
+    """
+    if columns is None:
+        return list(COLUMNS)
+    columns = list(dict.fromkeys(columns))
+    if not columns:
+        raise ValueError("At least one column must be selected")
+    unknown = [column for column in columns if column not in COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown column(s): {', '.join(unknown)}")
+    return columns
+
+
+"""
+Tables besides students: enrollments are generated with every batch of students,
+the dimension tables once per run
+"""
+ROW_TABLES = ['students', 'enrollments']
+DIMENSION_TABLES = ['advisors', 'programs', 'courses']
+TABLES = ROW_TABLES[1:] + DIMENSION_TABLES
+
+
+def select_tables(tables=None):
     """
-    Generate random enrollment date and calculate current semester 
+    Check a list of table names and return it without duplicates, in TABLES order
     """
-    current_date = datetime.now()
-    for i in range(row_count):
-        enrollment_date = data['enrollment_date'][i] if isinstance(data['enrollment_date'][i], datetime) else datetime.strptime(str(data['enrollment_date'][i]), '%Y-%m-%d')
-        delta = relativedelta(current_date, enrollment_date)
-        months_passed = delta.years * 12 + delta.months
-        semesters_passed = months_passed // 6
-        data['current_semester'].append(min(10, max(1, semesters_passed + 1)))
+    tables = set(tables or [])
+    unknown = sorted(tables - set(TABLES))
+    if unknown:
+        raise ValueError(f"Unknown table(s): {', '.join(unknown)}")
+    return [table for table in TABLES if table in tables]
+
 
+def uses_advisors(columns, tables):
     """
-    Generate random number of credits approved, according the current semester
+    Whether the given student columns or tables draw advisors, so the advisor count has to be checked
     """
-    data['Number_of_credits_approved'] = [
-        int(np.clip(stats.cauchy.rvs(loc=sem * 18, scale=5), 0, min(sem * 18 + 18, total_credits[i])))
-        for i, sem in enumerate(data['current_semester'])
+    return 'advisor_index' in SCHEMA.resolve(columns) or any(table in tables for table in ('advisors', 'enrollments'))
+
+
+def generate_university_tables(row_count, stop=None, tables=('students',), pool_size=DEFAULT_POOL_SIZE,
+                               locale=DEFAULT_LOCALE, offset=0, rng=None, compact=True, columns=None, seed=None,
+                               advisor_count=DEFAULT_ADVISOR_COUNT, gpa_precision=None):
+    """
+    Like generate_university_students_data, but return a dict of DataFrames for the
+    given ROW_TABLES of the batch. The enrollments reference the student_id of the
+    students and the course_id of courses_table, whichever columns are selected.
+    """
+    columns = select_columns(columns)
+    unknown = [table for table in tables if table not in ROW_TABLES]
+    if unknown:
+        raise ValueError(f"Unknown table(s): {', '.join(unknown)}")
+    if uses_advisors(columns if 'students' in tables else [], tables):
+        check_advisor_count(advisor_count, len(PROGRAMS))
+    if stop is not None:
+        if seed is None:
+            raise ValueError("Generating rows start to stop needs a seed")
+        offset, row_count = row_count, stop - row_count
+    if row_count < 0 or offset < 0:
+        raise ValueError("Rows must not be negative")
+    if seed is not None:
+        if rng is not None:
+            raise ValueError("Pass either rng or seed, not both")
+        source = dict(entropy=np.random.SeedSequence(seed).entropy, start=offset)
+    else:
+        source = dict(rng=rng if rng is not None else np.random.default_rng())
+    generated = (columns if 'students' in tables else []) + (['enrollments'] if 'enrollments' in tables else [])
+    values = SCHEMA.generate(generated, row_count, offset=offset, pool_size=pool_size, locale=locale,
+                             compact=compact, advisor_count=advisor_count, gpa_precision=gpa_precision,
+                             today=date.today(), now=datetime.now(), **source)
+
+    with stage('dataframe'):
+        frames = {}
+        if 'students' in tables:
+            data = {}
+            for column in columns:
+                if column in CATEGORIES:
+                    data[column] = _enumeration(column, values[column], compact)
+                elif column in COMPACT_DTYPES:
+                    data[column] = _narrow(values[column], COMPACT_DTYPES[column], compact)
+                else:
+                    data[column] = values[column]
+            frames['students'] = pd.DataFrame(data)
+        if 'enrollments' in tables:
+            data = dict(values['enrollments'])
+            data['semester'] = _narrow(data['semester'], np.int8, compact)
+            data['grade'] = _narrow(data['grade'], np.float32, compact)
+            frames['enrollments'] = pd.DataFrame(data)
+        return frames
+
+
+def generate_university_students_data(row_count, stop=None, pool_size=DEFAULT_POOL_SIZE, locale=DEFAULT_LOCALE,
+                                      offset=0, rng=None, compact=True, columns=None, seed=None,
+                                      advisor_count=DEFAULT_ADVISOR_COUNT, gpa_precision=None):
+    """
+    Generate university-related pseudorandom data.
+    Faker values come from pre-sampled pools of pool_size entries per column,
+    rows only draw indices into them. Student ids are numbered from offset.
+    All randomness comes from rng, a np.random.Generator (a fresh unseeded one by default).
+    With compact the enumerations are pandas Categoricals and the small numeric
+    columns use int8/int16/float32, otherwise they are strings, int64 and float64.
+    Only the given columns (all of COLUMNS by default) and the ones they depend on
+    are generated, and a column has the same values whichever others are selected.
+    Every student gets one of the advisor_count advisors of advisors_table assigned to their program.
+    With gpa_precision the GPA is rounded to that many decimals before it is classified.
+
+    generate_university_students_data(start, stop, seed=...) instead returns the rows
+    start to stop - 1 of the dataset keyed by seed, drawn from a counter-based generator
+    indexed by row: any row is the same whichever range it is generated in, so a single
+    student can be regenerated without the rows before it. The same happens when seed
+    is given without stop, for the rows offset to offset + row_count.
+    """
+    return generate_university_tables(row_count, stop, ('students',), pool_size=pool_size, locale=locale,
+                                      offset=offset, rng=rng, compact=compact, columns=columns, seed=seed,
+                                      advisor_count=advisor_count, gpa_precision=gpa_precision)['students']
+
+
+def dimension_tables(tables=DIMENSION_TABLES, pool_size=DEFAULT_POOL_SIZE, locale=DEFAULT_LOCALE,
+                     advisor_count=DEFAULT_ADVISOR_COUNT):
+    """
+    DataFrames of the given DIMENSION_TABLES, the same for every run with these options
+    """
+    if uses_advisors([], tables):
+        check_advisor_count(advisor_count, len(PROGRAMS))
+    builders = {
+        'advisors': lambda: advisors_table(load_pools(locale, advisor_pool_size(pool_size, advisor_count)),
+                                           advisor_count, PROGRAMS),
+        'programs': lambda: programs_table(PROGRAMS),
+        'courses': lambda: courses_table(PROGRAMS),
+    }
+    return {table: builders[table]() for table in tables}
+
+
+def iter_university_students_data(row_count, chunk_size=DEFAULT_CHUNK_SIZE, seed=None, start=0, counter=False,
+                                   **kwargs):
+    """
+    Return a lazy iterator over the dataset as DataFrames of at most chunk_size rows,
+    with student ids continuing across chunks from start, so only one chunk is alive at a time.
+    Each chunk is drawn from chunk_rng(seed entropy, chunk index), so for a given
+    seed and chunk_size the rows are the same however the chunks are scheduled.
+    With counter, rows are drawn by row index instead, so they do not depend on
+    chunk_size either and a run can be resumed from any start.
+    With tables=ROW_TABLES in kwargs, every chunk is a dict of DataFrames instead.
+    """
+    if chunk_size <= 0:
+        raise ValueError("Chunk size must be positive")
+    return (_generate_chunk(*task) for task in _chunk_tasks(row_count, chunk_size, seed, kwargs, start, counter))
+
+
+def _chunk_tasks(row_count, chunk_size, seed, kwargs, start=0, counter=False):
+    entropy = np.random.SeedSequence(seed).entropy
+    return [
+        (min(chunk_size, row_count - offset), start + offset, entropy, chunk_index, counter, kwargs)
+        for chunk_index, offset in enumerate(range(0, row_count, chunk_size))
     ]
 
-    """
-    Generate random number of credits remaining, according the total credits and number of credits approved
-    """
-    data['credits_remaining'] = [max(0, total_credits[i] - credits) for i, credits in enumerate(data['Number_of_credits_approved'])]
 
+def _generate_chunk(row_count, offset, entropy, chunk_index, counter, kwargs):
     """
-    Generate random GPA
+    The chunk as a DataFrame of students, or as a dict of DataFrames when kwargs has tables
     """
-    data['GPA'] = np.clip(np.random.normal(loc=3.5, scale=0.5, size=row_count), 2.0, 5.0)
+    generate = generate_university_tables if 'tables' in kwargs else generate_university_students_data
+    with record_chunk(chunk_index, row_count):
+        if counter:
+            return generate(offset, offset + row_count, seed=entropy, **kwargs)
+        return generate(row_count, offset=offset, rng=chunk_rng(entropy, chunk_index), **kwargs)
 
-    """
-    Generate random data, according the GPA its classification
-    """
-    data['academic_standing'] = np.where(
-        data['GPA'] >= 4.5, 'Excellent',
-        np.where(data['GPA'] >= 4.0, 'Good',
-                 np.where(data['GPA'] >= 3.0, 'Average', 'Poor'))
-    )
 
-    """
-    if the GPA is less than 3.0, the student is not eligible for a scholarship
-    """
-    data['scholarship'] = data['GPA'] >= 4.5
+def _write_part(file_format, part_path, header, writer_options, *chunk):
+    df = _generate_chunk(*chunk)
+    if file_format == 'csv':
+        write_csv([df], part_path, header=header, **writer_options)
+    else:
+        WRITERS[file_format]([df], part_path, **writer_options)
+    return part_path
 
-    """
-    Generate random data about the corse load
-    """
-    data['course_load'] = np.random.randint(15, 21, row_count)
 
+def _in_order(executor, fn, tasks, window):
     """
-    Generate random data about the marital status
+    Submit fn(*task) for every task and yield the results in task order, with at most
+    window tasks in flight, so memory and part files waiting on disk stay bounded.
+    When profiling, every task is profiled in its worker and merged in here.
     """
-    data['marital_status'] = np.random.choice(['Single', 'Married', 'Divorced'], row_count, p=[0.9, 0.08, 0.02])
+    profiled = is_profiling()
+    trace_memory = is_tracing_memory()
+    pending = deque()
 
-    """
-    Generate random data about the state of the program
-    """
-    data['state_program'] = np.random.choice(['Enrolled', 'Suspended', 'Withdrawn'], row_count, p=[0.7, 0.15, 0.15])
+    def result(future):
+        if not profiled:
+            return future.result()
+        value, profile = future.result()
+        merge_profile(profile)
+        return value
 
-    """
-    The student status is active or inactive, according the state of the program
-    """
-    data['student_status'] = ['Active' if state == 'Enrolled' else 'Inactive' for state in data['state_program']]
+    for task in tasks:
+        if profiled:
+            pending.append(executor.submit(run_profiled, fn, trace_memory, *task))
+        else:
+            pending.append(executor.submit(fn, *task))
+        if len(pending) >= window:
+            yield result(pending.popleft())
+    while pending:
+        yield result(pending.popleft())
+
+
+def iter_parallel(row_count, workers, chunk_size=DEFAULT_CHUNK_SIZE, seed=None, start=0, counter=False, **kwargs):
+    """
+    Like iter_university_students_data, but the chunks are generated ahead in a pool
+    of worker processes, at most 2 * workers of them waiting
+    """
+    if chunk_size <= 0:
+        raise ValueError("Chunk size must be positive")
+    if workers <= 0:
+        raise ValueError("Workers must be positive")
+    with futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        tasks = _chunk_tasks(row_count, chunk_size, seed, kwargs, start, counter)
+        yield from _in_order(executor, _generate_chunk, tasks, 2 * workers)
+
+
+def write_parallel(row_count, output_path, workers, file_format='csv', chunk_size=DEFAULT_CHUNK_SIZE, seed=None,
+                   keep_parts=False, writer_options=None, start=0, counter=False, **kwargs):
+    """
+    Generate chunks in a pool of worker processes and write them to output_path in
+    chunk order. The result is byte-identical to the sequential writer for the same
+    seed and chunk_size.
+    CSV chunks are written by the workers to part files that are then concatenated,
+    other formats are sent back to this process and written by a single writer.
+    With keep_parts every chunk is left as a standalone <output>.partNNNNN file.
+    Returns the paths written.
+    """
+    if chunk_size <= 0:
+        raise ValueError("Chunk size must be positive")
+    if workers <= 0:
+        raise ValueError("Workers must be positive")
+    writer_options = writer_options or {}
+
+    if file_format != 'csv' and not keep_parts:
+        frames = iter_parallel(row_count, workers, chunk_size, seed, start, counter, **kwargs)
+        WRITERS[file_format](frames, output_path, **writer_options)
+        return [output_path]
+
+    root, ext = os.path.splitext(output_path)
+    ext = ext or FORMAT_EXTENSIONS[file_format][0]
+    chunks = _chunk_tasks(row_count, chunk_size, seed, kwargs, start, counter)
+    with futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        parts = _in_order(executor, _write_part, [
+            (file_format, f'{root}.part{chunk[3]:05d}{ext}', keep_parts or chunk[3] == 0, writer_options, *chunk)
+            for chunk in chunks
+        ], 2 * workers)
+        if keep_parts:
+            return list(parts)
+
+        with open(output_path, 'wb') as output:
+            for part_path in parts:
+                with open(part_path, 'rb') as part:
+                    shutil.copyfileobj(part, output, 16 * 1024 * 1024)
+                os.remove(part_path)
+        return [output_path]
+
+
+"""
+Columns indexed by --sink-indexes once a table is loaded
+"""
+SINK_INDEXES = {
+    'students': ['student_id', 'program', 'nationality'],
+    'enrollments': ['student_id', 'course_id'],
+}
+
+
+"""
+Sources of the generator and the writers, hashed into the --cache keys so a cached
+file is never returned for a different version of the code
+"""
+GENERATOR_SOURCES = ['data.py', 'schema.py', 'counter_rng.py', 'tables.py', 'pools.py', 'writers.py']
 
-    """
-    Generate nationalities random with a higher probability of being Colombian
-    """
-    nationalities = ['Colombia'] * 80 + ['USA', 'Brazil', 'Argentina', 'Spain', 'Mexico', 'Peru', 'Chile', 'Ecuador', 'Venezuela'] * 2
-    data['nationality'] = np.random.choice(nationalities, row_count)
 
+def load_pandas():
     """
-    Generate random data about the phone number, according the country code and the first digit
+    Import pandas, which is otherwise imported by the first chunk, and return the start and end
+    of the import in perf_counter_ns. --profile imports it before tracemalloc starts and shows
+    it as its own stage instead of charging it to the dataframe stage of the first chunk
     """
-    country_codes = {
-        'Colombia': '+57', 'USA': '+1', 'Brazil': '+55', 'Argentina': '+54', 'Spain': '+34',
-        'Mexico': '+52', 'Peru': '+51', 'Chile': '+56', 'Ecuador': '+593', 'Venezuela': '+58'
-    }
-    phone_starts = {
-        'Colombia': ['3'], 'USA': ['2', '3', '4', '5', '6', '7', '8', '9'], 'Brazil': ['9'],
-        'Argentina': ['9'], 'Spain': ['6', '7'], 'Mexico': ['2', '3', '4', '5', '6', '7', '8', '9'],
-        'Peru': ['9'], 'Chile': ['9'], 'Ecuador': ['9'], 'Venezuela': ['4']
-    }
+    start = time.perf_counter_ns()
+    pd.DataFrame
+    return start, time.perf_counter_ns()
+
+
+def generator_hash():
+    directory = os.path.dirname(os.path.abspath(__file__))
+    return source_hash([os.path.join(directory, name) for name in GENERATOR_SOURCES])
+
 
+def table_output_path(output_path, table, file_format):
     """
-    Generate random phone numbers, according the country code and the first digit
+    <output>_<table> with the extension of the output, e.g. output/university_data_advisors.csv
     """
-    for i in range(row_count):
-        nationality = data['nationality'][i]
-        data['country_code'].append(country_codes[nationality])
-        start_digit = np.random.choice(phone_starts[nationality])
-        remaining_digits = np.random.randint(100000000, 999999999)
-        data['phone_number'].append(f"{start_digit}{remaining_digits}")
+    root, ext = os.path.splitext(output_path)
+    return f'{root}_{table}{ext or FORMAT_EXTENSIONS[file_format][0]}'
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='data.py',
+        description='Generate pseudorandom university students data as CSV'
+    )
+    parser.add_argument('row_count', nargs='?', default=None, help='number of rows to generate')
+    parser.add_argument('output_path', nargs='?', default=None,
+                        help='file to write (default: output/university_data.csv, or .parquet/.feather/.store)')
+    parser.add_argument('--format', choices=list(WRITERS), default=None,
+                        help='output format (default: from the output extension, otherwise csv)')
+    parser.add_argument('--row-group-size', type=int, default=DEFAULT_ROW_GROUP_SIZE,
+                        help=f'rows per Parquet row group or Feather record batch (default: {DEFAULT_ROW_GROUP_SIZE})')
+    parser.add_argument('--gpa-precision', type=int, default=None,
+                        help='decimals of the GPA in CSV output, rounded before the academic standing and scholarship '
+                             'are decided (default: the shortest form that reads back as the exact value)')
+    parser.add_argument('--pool-size', type=int, default=DEFAULT_POOL_SIZE,
+                        help='distinct Faker values sampled per column; smaller is faster to warm up '
+                             f'but repeats more (default: {DEFAULT_POOL_SIZE})')
+    parser.add_argument('--locale', default=DEFAULT_LOCALE,
+                        help=f'Faker locale of the names and addresses (default: {DEFAULT_LOCALE})')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help='generate and write this many rows at a time to keep memory flat '
+                             f'(default: {DEFAULT_CHUNK_SIZE})')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='master seed; the same seed and chunk size give byte-identical output '
+                             'whatever the number of workers')
+    parser.add_argument('--rng', choices=['stream', 'counter'], default='stream',
+                        help='stream draws every chunk from its own generator; counter draws every row from a '
+                             'counter-based generator indexed by row, so rows do not depend on --chunk-size and any '
+                             'range can be regenerated on its own (default: stream)')
+    parser.add_argument('--start', type=int, default=0,
+                        help='with --rng counter, first row to generate, to resume a run or extract a range '
+                             '(default: 0)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='generate chunks in this many processes (default: 1)')
+    parser.add_argument('--columns', type=lambda value: [c.strip() for c in value.split(',') if c.strip()],
+                        default=None,
+                        help='comma separated columns to generate, in that order; the columns they depend on '
+                             'are computed but not written (default: all of them)')
+    parser.add_argument('--no-compact', dest='compact', action='store_false',
+                        help='generate plain string, int64 and float64 columns instead of categoricals '
+                             'and narrow dtypes (GPA keeps full float64 precision)')
+    parser.add_argument('--profile', action='store_true',
+                        help='print the wall time, peak allocations and rows/sec of every generator stage and chunk')
+    parser.add_argument('--profile-json', metavar='PATH', default=None,
+                        help='also write the profile as JSON (implies --profile)')
+    parser.add_argument('--profile-trace', metavar='PATH', default=None,
+                        help='also write a Chrome trace of the stages and chunks (implies --profile)')
+    parser.add_argument('--profile-no-memory', dest='profile_memory', action='store_false',
+                        help='profile wall time only, tracemalloc slows allocation heavy stages down several times')
+    parser.add_argument('--pipeline', action='store_true',
+                        help='write in a separate thread while the next chunks are generated, and report whether '
+                             'the run is CPU or I/O bound (CSV with --workers already writes in the workers)')
+    parser.add_argument('--queue-depth', type=int, default=DEFAULT_QUEUE_DEPTH,
+                        help='with --pipeline, chunks that may wait for the writer; generation blocks when it is full '
+                             f'(default: {DEFAULT_QUEUE_DEPTH})')
+    parser.add_argument('--tables', type=lambda value: [t.strip() for t in value.split(',') if t.strip()],
+                        default=None,
+                        help=f'comma separated tables to write besides the students, each to <output>_<table>: '
+                             f'{", ".join(TABLES)} (default: none)')
+    parser.add_argument('--advisors', type=int, default=DEFAULT_ADVISOR_COUNT,
+                        help='rows of the advisors table, at least one per program; students get an advisor of '
+                             f'their program (default: {DEFAULT_ADVISOR_COUNT})')
+    parser.add_argument('--sink', metavar='URL', default=None,
+                        help='load the rows straight into a database table instead of writing a file: '
+                             'sqlite:///path.db, or duckdb:///path.duckdb when duckdb is installed; '
+                             '--tables go to tables of the same name')
+    parser.add_argument('--sink-batch-rows', type=int, default=DEFAULT_SINK_BATCH_ROWS,
+                        help=f'with --sink, rows inserted per transaction (default: {DEFAULT_SINK_BATCH_ROWS})')
+    parser.add_argument('--sink-indexes', action='store_true',
+                        help='with --sink, index ' + ', '.join(SINK_INDEXES['students']) + ' of the students '
+                             'table, and the foreign keys of enrollments, after the load')
+    parser.add_argument('--cache', action='store_true',
+                        help='with --seed, reuse the files of an earlier run with the same options from a '
+                             'content-addressed cache, copied into place, and store them after a miss')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                        help=f'directory of the --cache entries (default: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--cache-size-mb', type=int, default=DEFAULT_CACHE_SIZE_MB,
+                        help='evict the least recently used --cache entries beyond this size '
+                             f'(default: {DEFAULT_CACHE_SIZE_MB})')
+    parser.add_argument('--append', action='store_true',
+                        help='add the rows after those of an existing csv or store output (and of its enrollments '
+                             'table), with student ids continuing from its last one; with --seed this needs '
+                             '--rng counter')
+    parser.add_argument('--evolve', metavar='PATH', default=None,
+                        help='instead of generating rows, advance every student of an existing output by one '
+                             'semester: semester, credits and program state change, names and addresses stay')
+    parser.add_argument('--keep-parts', action='store_true',
+                        help='leave one standalone CSV per chunk (<output>.partNNNNN.csv) instead of merging them')
+    return parser.parse_args(argv)
 
-    return pd.DataFrame(data)
 
 def main():
-    if len(sys.argv) not in [2, 3]:
-        print("Usage: python script.py <row_count> [output_path]")
-        sys.exit(1)
+    args = parse_args()
 
     try:
-        row_count = int(sys.argv[1])
+        if args.evolve:
+            if args.row_count is not None or args.output_path:
+                raise ValueError("--evolve advances an existing output, it takes no row count or output path")
+            if args.chunk_size <= 0:
+                raise ValueError("Chunk size must be positive")
+            if not os.path.exists(args.evolve):
+                raise ValueError(f"'{args.evolve}' does not exist, there is nothing to evolve")
+            file_format = args.format or format_from_path(args.evolve)
+            rows = evolve_output(args.evolve, file_format, STATE_PROGRAMS, STUDENT_STATUSES, args.chunk_size,
+                                 args.seed, CATEGORIES)
+            print(f"Advanced {rows} students of '{args.evolve}' by one semester")
+            return
+
+        if args.row_count is None:
+            raise ValueError("Row count is required")
+        row_count = int(args.row_count)
         if row_count <= 0:
             raise ValueError("Row count must be positive")
 
-        df = generate_university_students_data(row_count)
+        if args.chunk_size <= 0:
+            raise ValueError("Chunk size must be positive")
+        if args.workers <= 0:
+            raise ValueError("Workers must be positive")
+        if args.row_group_size <= 0:
+            raise ValueError("Row group size must be positive")
+        if args.start < 0:
+            raise ValueError("Start must not be negative")
+        if args.start and args.rng != 'counter':
+            raise ValueError("--start needs --rng counter, otherwise the rows would not match the full run")
+        if args.gpa_precision is not None and not 0 <= args.gpa_precision <= 9:
+            raise ValueError("GPA precision must be between 0 and 9")
+        if args.queue_depth <= 0:
+            raise ValueError("Queue depth must be positive")
+        columns = select_columns(args.columns) if args.columns is not None else None
+        tables = select_tables(args.tables)
+        if uses_advisors(columns or COLUMNS, tables):
+            check_advisor_count(args.advisors, len(PROGRAMS))
+        if args.keep_parts and 'enrollments' in tables:
+            raise ValueError("--keep-parts cannot write the enrollments table")
+        if args.sink_batch_rows <= 0:
+            raise ValueError("Sink batch rows must be positive")
+        if args.cache and args.seed is None:
+            raise ValueError("--cache needs --seed, an unseeded run never repeats")
+        if args.cache and (args.sink or args.keep_parts):
+            raise ValueError("--cache stores output files, it cannot be combined with --sink or --keep-parts")
+        if args.append and (args.cache or args.sink or args.keep_parts):
+            raise ValueError("--append adds to one output file, it cannot be combined with --cache, --sink "
+                             "or --keep-parts")
+        if args.append and args.start:
+            raise ValueError("--append continues after the last row of the output, it takes no --start")
 
-        if len(sys.argv) == 3:
-            output_path = sys.argv[2]
-            output_dir = os.path.dirname(output_path)
-            if output_dir and not os.path.exists(output_dir):
-                os.makedirs(output_dir)
+        if args.sink:
+            if args.output_path or args.format or args.keep_parts:
+                raise ValueError("--sink loads a database, it cannot be combined with an output file")
+            file_format, output_path = parse_sink(args.sink)
+            write = SINKS[file_format]
         else:
-            output_dir = 'output'
-            if not os.path.exists(output_dir):
-                os.makedirs(output_dir)
-            output_path = os.path.join(output_dir, 'university_data.csv')
+            file_format = args.format or (format_from_path(args.output_path) if args.output_path else 'csv')
+            output_path = args.output_path or os.path.join('output',
+                                                           'university_data' + FORMAT_EXTENSIONS[file_format][0])
+            write = WRITERS[file_format]
+        output_dir = os.path.dirname(output_path)
+        if output_dir and not os.path.exists(output_dir):
+            os.makedirs(output_dir)
 
-        df.to_csv(output_path, index=False, quoting=csv.QUOTE_ALL)
-        print(f"Generated {row_count} rows of university data and saved to '{output_path}'")
+        start = args.start
+        append = args.append and os.path.exists(output_path)
+        if append:
+            if args.seed is not None and args.rng != 'counter':
+                raise ValueError("--append with --seed needs --rng counter, otherwise the new rows would repeat "
+                                 "the random draws of the first ones")
+            existing_columns, start = append_point(output_path, file_format)
+            if columns is None:
+                columns = select_columns(existing_columns)
+            if list(columns) != existing_columns:
+                raise ValueError(f"Cannot append columns {', '.join(columns)} to '{output_path}', "
+                                 f"which has {', '.join(existing_columns)}")
+
+        def table_writer(table):
+            """
+            (write, path, writer options) of a table: a file next to the output, or a table of the sink
+            """
+            if args.sink:
+                indexes = SINK_INDEXES.get(table, []) if args.sink_indexes else []
+                return write, output_path, dict(table=table, batch_rows=args.sink_batch_rows, indexes=indexes)
+            path = output_path if table == 'students' else table_output_path(output_path, table, file_format)
+            extra = dict(append=True) if append and table in ROW_TABLES and os.path.exists(path) else {}
+            if file_format == 'csv':
+                precision = None
+                if args.gpa_precision is not None and table == 'students':
+                    precision = {'GPA': args.gpa_precision}
+                return write, path, dict(float_precision=precision, **extra)
+            return write, path, dict(row_group_size=args.row_group_size, categories=CATEGORIES, **extra)
+
+        writer_options = table_writer('students')[2]
+
+        options = dict(chunk_size=args.chunk_size, seed=args.seed, pool_size=args.pool_size, locale=args.locale,
+                       compact=args.compact, columns=columns, start=start, counter=args.rng == 'counter',
+                       advisor_count=args.advisors,
+                       gpa_precision=args.gpa_precision if file_format == 'csv' else None)
+        if 'enrollments' in tables:
+            options['tables'] = ROW_TABLES
+        table_paths = {table: table_writer(table)[1] for table in tables}
+        outputs = {'students': output_path, **table_paths}
+        cache = None
+        if args.cache:
+            cache = GenerationCache(args.cache_dir, args.cache_size_mb * 2 ** 20)
+            cache_params = dict(
+                rows=row_count, start=args.start, seed=args.seed, rng=args.rng,
+                chunk_size=args.chunk_size if args.rng == 'stream' else None, pool_size=args.pool_size,
+                locale=args.locale, compact=args.compact, columns=columns, advisors=args.advisors, tables=tables,
+                format=file_format, gpa_precision=args.gpa_precision if file_format == 'csv' else None,
+                row_group_size=args.row_group_size if file_format != 'csv' else None, today=date.today(),
+                numpy=np.__version__, faker=faker_version(), generator=generator_hash(),
+            )
+            key = cache_key(cache_params)
+        hit = cache is not None and cache.restore(key, outputs)
+
+        profile = None
+        pipeline_stats = {}
+        written = [output_path]
+        if not hit:
+            if cache is not None:
+                for path in outputs.values():
+                    remove_output(path)
+            profile_requested = args.profile or args.profile_json or args.profile_trace or not args.profile_memory
+            import_span = load_pandas() if profile_requested else None
+            with (profiling(args.profile_memory) if profile_requested else nullcontext()) as profile:
+                if profile is not None:
+                    profile.add_stage('import pandas', *import_span, 0)
+                for table, df in dimension_tables([t for t in tables if t in DIMENSION_TABLES], args.pool_size,
+                                                  args.locale, args.advisors).items():
+                    table_write, table_path, table_options = table_writer(table)
+                    table_write([df], table_path, **table_options)
+
+                if 'tables' in options:
+                    if args.workers != 1:
+                        chunks = iter_parallel(row_count, args.workers, **options)
+                    else:
+                        chunks = iter_university_students_data(row_count, **options)
+                    stats = write_tables_pipelined(chunks, {table: table_writer(table) for table in ROW_TABLES},
+                                                   args.queue_depth)
+                    if args.pipeline:
+                        pipeline_stats = stats
+                elif args.keep_parts or (args.workers != 1 and file_format == 'csv' and not append):
+                    written = write_parallel(row_count, output_path, args.workers, file_format,
+                                             keep_parts=args.keep_parts, writer_options=writer_options, **options)
+                else:
+                    if args.workers != 1:
+                        frames = iter_parallel(row_count, args.workers, **options)
+                    else:
+                        frames = iter_university_students_data(row_count, **options)
+                    if args.pipeline:
+                        pipeline_stats = {None: write_pipelined(frames, write, output_path, args.queue_depth,
+                                                                **writer_options)}
+                    else:
+                        write(frames, output_path, **writer_options)
+
+            if cache is not None:
+                cache.store(key, outputs, cache_params)
+
+        if profile is not None:
+            print(profile.report())
+            if args.profile_json:
+                profile.write_json(args.profile_json)
+                print(f"Profile saved to '{args.profile_json}'")
+            if args.profile_trace:
+                profile.write_chrome_trace(args.profile_trace)
+                print(f"Chrome trace saved to '{args.profile_trace}'")
+
+        for table, stats in pipeline_stats.items():
+            if table is not None:
+                print(f"{table}:")
+            print(stats.report())
+
+        if hit:
+            print(f"Restored {row_count} rows of university data from the cache to '{output_path}'")
+        elif append:
+            print(f"Appended {row_count} rows of university data (STU{start:06d} to "
+                  f"STU{start + row_count - 1:06d}) to '{output_path}'")
+        elif args.keep_parts:
+            print(f"Generated {row_count} rows of university data and saved to {len(written)} part files "
+                  f"'{written[0]}' ... '{written[-1]}'")
+        else:
+            print(f"Generated {row_count} rows of university data and saved to '{output_path}'"
+                  + (" as table 'students'" if args.sink else ''))
+        for table, path in table_paths.items():
+            action = 'Restored' if hit else 'Appended' if append and table in ROW_TABLES else 'Saved'
+            print(f"{action} the {table} table to '{path}'"
+                  + (f" as table '{table}'" if args.sink else ''))
+        if cache is not None:
+            print(cache.report())
         print(f"Current working directory: {os.getcwd()}")
 
     except ValueError as e:
@@ -0,0 +1,395 @@
+import csv
+import io
+import itertools
+import os
+import numpy as np
+
+try:
+    from .counter_rng import chunk_rng
+    from .lazy import lazy_import
+    from .store import ColumnStore
+    from .writers import (CSV_BLOCK_ROWS, DEFAULT_ROW_GROUP_SIZE, WRITERS, _byte_matrix, _format_integers,
+                          read_store_meta)
+except ImportError:
+    from counter_rng import chunk_rng
+    from lazy import lazy_import
+    from store import ColumnStore
+    from writers import (CSV_BLOCK_ROWS, DEFAULT_ROW_GROUP_SIZE, WRITERS, _byte_matrix, _format_integers,
+                         read_store_meta)
+
+pd = lazy_import('pandas')
+
+STUDENT_ID_PREFIX = 'STU'
+
+"""
+Bytes read from the end of a CSV at a time while looking for its last line
+"""
+TAIL_BLOCK_BYTES = 65536
+
+"""
+Probability of moving from each state of a program to each state in a semester,
+a withdrawn student never comes back
+"""
+STATE_TRANSITIONS = {
+    'Enrolled': {'Enrolled': 0.95, 'Suspended': 0.03, 'Withdrawn': 0.02},
+    'Suspended': {'Enrolled': 0.5, 'Suspended': 0.4, 'Withdrawn': 0.1},
+    'Withdrawn': {'Withdrawn': 1.0},
+}
+MAX_SEMESTER = 10
+
+"""
+Credits a student can have approved per semester, plus one semester ahead, the bound
+the generator puts on Number_of_credits_approved
+"""
+CREDITS_PER_SEMESTER = 18
+
+"""
+Columns a semester changes, every other column of a student is left as it is
+"""
+EVOLVED_COLUMNS = ['current_semester', 'Number_of_credits_approved', 'credits_remaining',
+                   'state_program', 'student_status']
+EVOLVE_INPUTS = EVOLVED_COLUMNS + ['course_load']
+
+
+def _last_line(path):
+    """
+    Last non-empty line of a text file, reading blocks backwards from its end
+    """
+    with open(path, 'rb') as f:
+        end = f.seek(0, os.SEEK_END)
+        tail = b''
+        position = end
+        while position > 0:
+            position = max(0, position - TAIL_BLOCK_BYTES)
+            f.seek(position)
+            tail = f.read(min(TAIL_BLOCK_BYTES, end - position)) + tail
+            lines = tail.rstrip(b'\r\n').split(b'\n')
+            if len(lines) > 1 or position == 0:
+                return lines[-1].decode('utf-8')
+    return ''
+
+
+def _parse_line(line):
+    return next(csv.reader(io.StringIO(line)), [])
+
+
+def _next_number(student_id):
+    if not student_id.startswith(STUDENT_ID_PREFIX):
+        raise ValueError(f"Cannot continue after the student id '{student_id}'")
+    return int(student_id[len(STUDENT_ID_PREFIX):]) + 1
+
+
+def append_point(path, file_format):
+    """
+    (columns, next student number) of an existing output, read from the header and the
+    last line of a CSV or from the metadata and last id of a column store, never the whole file
+    """
+    if file_format == 'csv':
+        with open(path, encoding='utf-8') as f:
+            columns = _parse_line(f.readline())
+        last = _parse_line(_last_line(path))
+        if last == columns:
+            return columns, 0
+        if 'student_id' not in columns:
+            raise ValueError(f"'{path}' has no student_id column to continue from")
+        return columns, _next_number(last[columns.index('student_id')])
+    if file_format == 'store':
+        store = ColumnStore(path)
+        if store.rows == 0:
+            return store.columns, 0
+        if 'student_id' not in store.meta:
+            raise ValueError(f"'{path}' has no student_id column to continue from")
+        return store.columns, _next_number(store.strings('student_id', store.rows - 1, store.rows)[0])
+    raise ValueError(f"Only csv and store outputs can be appended to, not {file_format}")
+
+
+def _transition_table(states):
+    """
+    Cumulative transition probabilities as a matrix indexed by state code, in the order of states
+    """
+    table = np.zeros((len(states), len(states)))
+    for i, state in enumerate(states):
+        for j, target in enumerate(states):
+            table[i, j] = STATE_TRANSITIONS.get(state, {state: 1.0}).get(target, 0.0)
+    return np.cumsum(table, axis=1)
+
+
+def advance_semester(semester, approved, remaining, course_load, state_codes, states, rng):
+    """
+    One semester of every student given as arrays: students enrolled at the start of it
+    move up a semester and earn credits around their course load, up to their total and
+    to the bound of the generator for their new semester, then every student moves to a
+    new state of their program. Returns the new semester, approved and remaining credits
+    and state codes.
+    """
+    enrolled = state_codes == states.index('Enrolled')
+    total = approved + remaining
+    earned = np.clip(np.rint(rng.normal(0.9 * course_load, 2.0)), 0, course_load).astype(approved.dtype)
+    semester = np.where(enrolled, np.minimum(semester + 1, MAX_SEMESTER), semester)
+    limit = np.minimum(total, (semester + 1) * CREDITS_PER_SEMESTER)
+    approved = np.where(enrolled, np.maximum(approved, np.minimum(approved + earned, limit)), approved)
+    cumulative = _transition_table(states)[state_codes]
+    codes = np.minimum((rng.random(len(state_codes))[:, None] >= cumulative).sum(axis=1), len(states) - 1)
+    return semester, approved, total - approved, codes
+
+
+def _evolve_frame(df, states, statuses, rng):
+    """
+    Advance the students of df by one semester in place, whatever the dtypes the columns were read as
+    """
+    state_codes = pd.Categorical(df['state_program'].astype(str), categories=states).codes
+    if (state_codes < 0).any():
+        raise ValueError(f"Unknown state_program values, expected {', '.join(states)}")
+    numbers = [df[column].astype(np.int64).to_numpy()
+               for column in ['current_semester', 'Number_of_credits_approved', 'credits_remaining', 'course_load']]
+    semester, approved, remaining, codes = advance_semester(*numbers, state_codes, states, rng)
+    status = np.where(codes == states.index('Enrolled'), 0, 1)
+    for column, values in [('current_semester', semester), ('Number_of_credits_approved', approved),
+                           ('credits_remaining', remaining)]:
+        df[column] = values.astype(str) if df[column].dtype == object or pd.api.types.is_string_dtype(
+            df[column].dtype) else values.astype(df[column].dtype)
+    for column, names, values in [('state_program', states, codes), ('student_status', statuses, status)]:
+        if isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = pd.Categorical.from_codes(values, dtype=pd.CategoricalDtype(names))
+        else:
+            df[column] = np.array(names, dtype=object)[values]
+    return df
+
+
+def _check_columns(columns, path):
+    missing = [column for column in EVOLVE_INPUTS if column not in columns]
+    if missing:
+        raise ValueError(f"'{path}' has no {', '.join(missing)} column, cannot advance it a semester")
+
+
+def _evolve_store(path, states, statuses, chunk_size, entropy):
+    """
+    Rewrite the evolved columns of a store in place through writable memory maps
+    """
+    meta = read_store_meta(path)
+    _check_columns(meta['columns'], path)
+    for column in ['state_program', 'student_status']:
+        if meta['columns'][column]['kind'] != 'categorical':
+            raise ValueError(f"'{column}' of '{path}' is not stored as categories, cannot evolve it in place")
+    arrays = {column: np.load(os.path.join(path, f'{column}.npy'), mmap_mode='r+') for column in EVOLVE_INPUTS}
+    state_names = meta['columns']['state_program']['categories']
+    state_map = np.array([states.index(name) for name in state_names])
+    state_codes = np.array([state_names.index(name) for name in states])
+    status_names = meta['columns']['student_status']['categories']
+    status_codes = np.array([status_names.index(name) for name in statuses])
+    for chunk_index, start in enumerate(range(0, meta['rows'], chunk_size)):
+        rng = chunk_rng(entropy, chunk_index)
+        rows = slice(start, start + chunk_size)
+        semester, approved, remaining, codes = advance_semester(
+            arrays['current_semester'][rows].astype(np.int64),
+            arrays['Number_of_credits_approved'][rows].astype(np.int64),
+            arrays['credits_remaining'][rows].astype(np.int64), arrays['course_load'][rows].astype(np.int64),
+            state_map[arrays['state_program'][rows]], states, rng)
+        arrays['current_semester'][rows] = semester
+        arrays['Number_of_credits_approved'][rows] = approved
+        arrays['credits_remaining'][rows] = remaining
+        arrays['state_program'][rows] = state_codes[codes]
+        arrays['student_status'][rows] = status_codes[np.where(codes == states.index('Enrolled'), 0, 1)]
+    for array in arrays.values():
+        array.flush()
+    return meta['rows']
+
+
+def _field_bounds(data, field_count):
+    """
+    (line starts, line ends, field starts, field stops) of the lines of data, the fields as
+    (lines, field_count) arrays of offsets inside the quotes. None unless every line is
+    field_count quoted fields, as write_csv writes them: a quote or separator inside a field
+    adds a separator and a newline inside one splits its line, so either changes the counts.
+    """
+    ends = np.flatnonzero(data == ord('\n'))
+    if len(ends) == 0 or ends[-1] != len(data) - 1:
+        return None
+    line_starts = np.concatenate([[0], ends[:-1] + 1])
+    quote = data == ord('"')
+    separators = np.flatnonzero(quote[:-2] & (data[1:-1] == ord(',')) & quote[2:])
+    counts = np.searchsorted(separators, ends) - np.searchsorted(separators, line_starts)
+    if (counts != field_count - 1).any() or not (quote[line_starts] & quote[ends - 1]).all():
+        return None
+    separators = separators.reshape(len(ends), field_count - 1)
+    starts = np.concatenate([line_starts[:, None] + 1, separators + 3], axis=1)
+    stops = np.concatenate([separators, ends[:, None] - 1], axis=1)
+    return line_starts, ends, starts, stops
+
+
+def _field_matrix(data, starts, stops):
+    """
+    data[starts[i]:stops[i]] of every line as a byte matrix padded with NUL
+    """
+    width = int((stops - starts).max(initial=0))
+    index = starts[:, None] + np.arange(width)
+    matrix = data[np.minimum(index, len(data) - 1)]
+    matrix[index >= stops[:, None]] = 0
+    return matrix
+
+
+def _field_values(data, starts, stops):
+    matrix = np.ascontiguousarray(_field_matrix(data, starts, stops))
+    return matrix.view(f'S{max(matrix.shape[1], 1)}').ravel() if matrix.shape[1] else np.zeros(len(starts), 'S1')
+
+
+def _splice_fields(data, starts, stops, fields):
+    """
+    data with the bytes between starts[:, i] and stops[:, i] of every line replaced by
+    the NUL padded byte matrix fields[i], fields that do not move are never copied one by one
+    """
+    removed = np.zeros(len(data) + 1, dtype=np.int8)
+    removed[starts.ravel()] = 1
+    removed[stops.ravel()] = -1
+    kept = data[np.cumsum(removed[:-1], dtype=np.int8) == 0]
+    lengths = (stops - starts).ravel()
+    positions = starts.ravel() - (np.cumsum(lengths) - lengths)
+    width = max(field.shape[1] for field in fields)
+    matrix = np.zeros((len(starts), len(fields), width), dtype=np.uint8)
+    for i, field in enumerate(fields):
+        matrix[:, i, :field.shape[1]] = field
+    present = matrix != 0
+    return np.insert(kept, np.repeat(positions, present.sum(axis=2).ravel()), matrix[present])
+
+
+def _evolve_csv_text(path, tmp_path, states, statuses, chunk_size, entropy):
+    """
+    Rewrite a CSV written by write_csv to tmp_path, parsing and formatting only the bytes of
+    the evolved columns and copying every other field as it is. Returns the number of rows,
+    or None when a line is not one row of quoted fields and the file needs a real CSV parser.
+    """
+    with open(path, 'rb') as f:
+        header = f.readline()
+        columns = _parse_line(header.decode('utf-8'))
+        _check_columns(columns, path)
+        evolved = sorted(columns.index(column) for column in EVOLVED_COLUMNS)
+        inputs = {column: columns.index(column) for column in EVOLVE_INPUTS}
+        names = {'state_program': np.array(states, dtype='S'), 'student_status': np.array(statuses, dtype='S')}
+        rows = 0
+        with open(tmp_path, 'wb') as out:
+            out.write(header)
+            for chunk_index in itertools.count():
+                lines = list(itertools.islice(f, chunk_size))
+                if not lines:
+                    break
+                blocks = []
+                values = {column: [] for column in EVOLVE_INPUTS}
+                for start in range(0, len(lines), CSV_BLOCK_ROWS):
+                    data = np.frombuffer(b''.join(lines[start:start + CSV_BLOCK_ROWS]), dtype=np.uint8)
+                    bounds = _field_bounds(data, len(columns))
+                    if bounds is None:
+                        return None
+                    line_starts, ends, starts, stops = bounds
+                    blocks.append((data, line_starts, ends, starts[:, evolved], stops[:, evolved]))
+                    for column, index in inputs.items():
+                        values[column].append(_field_values(data, starts[:, index], stops[:, index]))
+                del lines
+                values = {column: np.concatenate(parts) for column, parts in values.items()}
+                state_codes = np.full(len(values['state_program']), -1)
+                for code, name in enumerate(names['state_program']):
+                    state_codes[values['state_program'] == name] = code
+                if (state_codes < 0).any():
+                    raise ValueError(f"Unknown state_program values, expected {', '.join(states)}")
+                semester, approved, remaining, codes = advance_semester(
+                    *[values[column].astype(np.int64) for column in
+                      ['current_semester', 'Number_of_credits_approved', 'credits_remaining', 'course_load']],
+                    state_codes, states, chunk_rng(entropy, chunk_index))
+                new_values = {
+                    'current_semester': _format_integers(semester),
+                    'Number_of_credits_approved': _format_integers(approved),
+                    'credits_remaining': _format_integers(remaining),
+                    'state_program': _byte_matrix(names['state_program'])[codes],
+                    'student_status': _byte_matrix(names['student_status'])[
+                        np.where(codes == states.index('Enrolled'), 0, 1)],
+                }
+                offset = 0
+                for data, line_starts, ends, starts, stops in blocks:
+                    block = slice(offset, offset + len(line_starts))
+                    out.write(_splice_fields(data, starts, stops,
+                                             [new_values[columns[index]][block] for index in evolved]).tobytes())
+                    offset += len(line_starts)
+                rows += offset
+    return rows
+
+
+def _arrow_batches(path, file_format):
+    """
+    Record batches of a Parquet or Feather file, read one row group or batch at a time
+    """
+    if file_format == 'parquet':
+        import pyarrow.parquet as pq
+        yield from pq.ParquetFile(path).iter_batches()
+    else:
+        import pyarrow as pa
+        with pa.memory_map(str(path)) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                yield reader.get_batch(i)
+
+
+def _batch_rows(path, file_format):
+    """
+    Rows of the first row group or record batch, to write the evolved file with the same layout
+    """
+    for batch in _arrow_batches(path, file_format):
+        return batch.num_rows
+    return None
+
+
+def _arrow_frames(path, file_format, chunk_size):
+    """
+    DataFrames of exactly chunk_size rows (the last one excepted) of a Parquet or Feather
+    file, holding at most one chunk and one record batch in memory
+    """
+    import pyarrow as pa
+    pending, rows = [], 0
+    for batch in _arrow_batches(path, file_format):
+        pending.append(batch)
+        rows += batch.num_rows
+        while rows >= chunk_size:
+            table = pa.Table.from_batches(pending)
+            yield table.slice(0, chunk_size).to_pandas()
+            rest = table.slice(chunk_size)
+            pending, rows = rest.to_batches(), rest.num_rows
+    if rows:
+        yield pa.Table.from_batches(pending).to_pandas()
+
+
+def evolve_output(path, file_format, states, statuses, chunk_size, seed=None, categories=None):
+    """
+    Advance every student of an existing output by one semester, chunk_size rows at a
+    time: the semester, credits and state of their program change, names, addresses and
+    every other column are kept. A store is updated in place, a CSV is rewritten as text
+    without parsing the untouched columns, and Parquet or Feather files are rewritten
+    streaming chunk_size rows at a time, with columns in categories dictionary encoded.
+    states and statuses are the state_program and student_status values, active first.
+    Returns the number of rows advanced.
+    """
+    entropy = np.random.SeedSequence(seed).entropy
+    if file_format == 'store':
+        return _evolve_store(path, states, statuses, chunk_size, entropy)
+
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    if file_format == 'csv':
+        frames = pd.read_csv(path, dtype=str, keep_default_na=False, chunksize=chunk_size)
+        writer_options = {}
+    else:
+        frames = _arrow_frames(path, file_format, chunk_size)
+        writer_options = dict(categories=categories,
+                              row_group_size=_batch_rows(path, file_format) or DEFAULT_ROW_GROUP_SIZE)
+
+    def evolved():
+        for chunk_index, df in enumerate(frames):
+            _check_columns(df.columns, path)
+            yield _evolve_frame(df, states, statuses, chunk_rng(entropy, chunk_index))
+
+    try:
+        rows = _evolve_csv_text(path, tmp_path, states, statuses, chunk_size, entropy) \
+            if file_format == 'csv' else None
+        if rows is None:
+            rows = WRITERS[file_format](evolved(), tmp_path, **writer_options)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return rows
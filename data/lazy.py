@@ -0,0 +1,24 @@
+import importlib
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported the first time one of its attributes is
+    used, so a heavy dependency costs nothing on the code paths that never touch it
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attribute):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attribute)
+
+    def __repr__(self):
+        return f"<lazy module '{self._name}'{'' if self._module is None else ' (imported)'}>"
+
+
+def lazy_import(name):
+    return LazyModule(name)
@@ -0,0 +1,184 @@
+import queue
+import threading
+import time
+
+DEFAULT_QUEUE_DEPTH = 2
+
+"""
+Put on the queue after the last chunk, or with the exception that stopped the producer
+"""
+_DONE = object()
+
+
+class _ProducerFailed(Exception):
+    pass
+
+
+class PipelineStats:
+    """
+    Counters of a pipelined run: how long the producer spent generating and waiting
+    for room in the queue, how long the writer spent writing and waiting for chunks,
+    and the queue depth seen by every put
+    """
+
+    def __init__(self, queue_depth):
+        self.queue_depth = queue_depth
+        self.chunks = 0
+        self.rows = 0
+        self.generate_seconds = 0.0
+        self.put_wait_seconds = 0.0
+        self.write_seconds = 0.0
+        self.get_wait_seconds = 0.0
+        self.max_depth = 0
+        self._depth_total = 0
+
+    def record_put(self, depth):
+        self.max_depth = max(self.max_depth, depth)
+        self._depth_total += depth
+
+    @property
+    def mean_depth(self):
+        return self._depth_total / self.chunks if self.chunks else 0.0
+
+    @property
+    def bound(self):
+        """
+        'io' when the generator mostly waited for the writer, 'cpu' when the writer
+        mostly waited for the generator
+        """
+        return 'io' if self.put_wait_seconds > self.get_wait_seconds else 'cpu'
+
+    def as_dict(self):
+        return {
+            'queue_depth': self.queue_depth, 'chunks': self.chunks, 'rows': self.rows,
+            'generate_seconds': self.generate_seconds, 'put_wait_seconds': self.put_wait_seconds,
+            'write_seconds': self.write_seconds, 'get_wait_seconds': self.get_wait_seconds,
+            'max_depth': self.max_depth, 'mean_depth': self.mean_depth, 'bound': self.bound,
+        }
+
+    def report(self):
+        def rate(seconds):
+            return f"{self.rows / seconds:,.0f} rows/sec" if seconds else '-'
+
+        return '\n'.join([
+            f"generate: {self.generate_seconds:.3f} s ({rate(self.generate_seconds)}), "
+            f"waited {self.put_wait_seconds:.3f} s for the writer",
+            f"write:    {self.write_seconds:.3f} s ({rate(self.write_seconds)}), "
+            f"waited {self.get_wait_seconds:.3f} s for chunks",
+            f"queue:    {self.chunks} chunks, depth max {self.max_depth}/{self.queue_depth}, mean {self.mean_depth:.2f}",
+            f"{'I/O' if self.bound == 'io' else 'CPU'}-bound: the "
+            f"{'generator waited for the writer' if self.bound == 'io' else 'writer waited for the generator'} longer",
+        ])
+
+
+class _WriterThread:
+    """
+    Runs write(chunks, output_path, **writer_options) in a thread, fed with the chunks
+    put on a queue of at most stats.queue_depth of them
+    """
+
+    def __init__(self, write, output_path, writer_options, stats):
+        self.stats = stats
+        self.pending = queue.Queue(maxsize=stats.queue_depth)
+        self.error = None
+        self.thread = threading.Thread(target=self._run, args=(write, output_path, writer_options),
+                                       name='writer', daemon=True)
+        self.thread.start()
+
+    def _consume(self):
+        while True:
+            start = time.perf_counter()
+            item = self.pending.get()
+            self.stats.get_wait_seconds += time.perf_counter() - start
+            if item is _DONE:
+                return
+            if isinstance(item, _ProducerFailed):
+                raise item
+            yield item
+
+    def _run(self, write, output_path, writer_options):
+        start = time.perf_counter()
+        try:
+            write(self._consume(), output_path, **writer_options)
+        except _ProducerFailed:
+            pass
+        except BaseException as e:
+            self.error = e
+        finally:
+            self.stats.write_seconds = time.perf_counter() - start - self.stats.get_wait_seconds
+
+    def is_alive(self):
+        return self.thread.is_alive()
+
+    def put(self, item):
+        """
+        Block until there is room for item, giving up when the writer has stopped
+        """
+        start = time.perf_counter()
+        while self.thread.is_alive():
+            try:
+                self.pending.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        self.stats.put_wait_seconds += time.perf_counter() - start
+
+
+def write_tables_pipelined(chunks, outputs, queue_depth=DEFAULT_QUEUE_DEPTH):
+    """
+    Like write_pipelined for chunks that are dicts of DataFrames, one per table: outputs
+    maps every table to (write, output_path, writer_options), and each table gets its
+    own writer thread and queue, so the tables are written side by side.
+    Returns the PipelineStats of every table, they share the generation time.
+    """
+    if queue_depth <= 0:
+        raise ValueError("Queue depth must be positive")
+    writers = {
+        table: _WriterThread(write, output_path, writer_options, PipelineStats(queue_depth))
+        for table, (write, output_path, writer_options) in outputs.items()
+    }
+    generate_seconds = 0.0
+    chunks = iter(chunks)
+    try:
+        while all(writer.is_alive() for writer in writers.values()):
+            start = time.perf_counter()
+            try:
+                tables = next(chunks)
+            except StopIteration:
+                break
+            finally:
+                generate_seconds += time.perf_counter() - start
+            for table, writer in writers.items():
+                df = tables.pop(table)
+                writer.stats.chunks += 1
+                writer.stats.rows += len(df)
+                writer.put(df)
+                del df
+                writer.stats.record_put(writer.pending.qsize())
+            del tables
+    except BaseException:
+        for writer in writers.values():
+            writer.put(_ProducerFailed())
+        for writer in writers.values():
+            writer.thread.join()
+        raise
+    for writer in writers.values():
+        writer.put(_DONE)
+    for writer in writers.values():
+        writer.thread.join()
+    for writer in writers.values():
+        writer.stats.generate_seconds = generate_seconds
+        if writer.error is not None:
+            raise writer.error
+    return {table: writer.stats for table, writer in writers.items()}
+
+
+def write_pipelined(chunks, write, output_path, queue_depth=DEFAULT_QUEUE_DEPTH, **writer_options):
+    """
+    Write the chunks with write(chunks, output_path, **writer_options) in a writer thread
+    while this thread keeps pulling the next chunks, so generation and disk I/O overlap.
+    At most queue_depth chunks wait in between, the producer blocks when the queue is
+    full. Returns the PipelineStats of the run.
+    """
+    chunks = ({None: df} for df in chunks)
+    return write_tables_pipelined(chunks, {None: (write, output_path, writer_options)}, queue_depth)[None]
@@ -1,52 +1,335 @@
+import argparse
+import hashlib
+import json
+import os
+import re
 import sys
-import pandas as pd
-import matplotlib.pyplot as plt
+from collections import Counter
 import numpy as np
-from scipy.stats import norm
-import seaborn as sns
 
-def plot_pie_charts_and_distributions(csv_path):
+try:
+    from .lazy import lazy_import
+    from .store import open_store
+    from .writers import format_from_path
+except ImportError:
+    from lazy import lazy_import
+    from store import open_store
+    from writers import format_from_path
+
+"""
+Plotting libraries are imported when the charts are drawn, not when reading or aggregating
+"""
+pd = lazy_import('pandas')
+matplotlib = lazy_import('matplotlib')
+plt = lazy_import('matplotlib.pyplot')
+sns = lazy_import('seaborn')
+futures = lazy_import('concurrent.futures')
+
+categorical_columns = [
+    'gender', 'nationality', 'state_program', 'student_status',
+    'academic_standing', 'payment_status', 'marital_status', 'scholarship'
+]
+
+numerical_columns = [
+    'GPA', 'library_books_borrowed'
+]
+
+"""
+Fixed histogram bins of the numerical columns for the streaming mode, values
+outside them are counted in the first or last bin
+"""
+HISTOGRAM_EDGES = {
+    'GPA': np.linspace(2.0, 5.0, 61),
+    'library_books_borrowed': np.arange(-0.5, 21),
+}
+
+DEFAULT_KDE_SAMPLE = 100000
+DEFAULT_CHUNK_SIZE = 1000000
+DEFAULT_OUTPUT = os.path.join('output', 'pie_charts_and_distributions.png')
+DEFAULT_DPI = 300
+FIGURE_FORMATS = ['png', 'svg', 'pdf']
+
+"""
+Seed of the reservoir samples, so the same data always gives the same aggregates
+and an unchanged figure can be recognised and skipped
+"""
+AGGREGATE_SEED = 0
+
+
+def read_data(path, columns=None):
+    """
+    Read a generated dataset as CSV, Parquet, Feather or a column store depending on
+    its extension, loading only the given columns
+    """
+    file_format = format_from_path(path)
+    if file_format == 'store':
+        return open_store(path).to_frame(columns)
+    if file_format == 'parquet':
+        return pd.read_parquet(path, columns=columns)
+    if file_format == 'feather':
+        return pd.read_feather(path, columns=columns)
+    return pd.read_csv(path, usecols=columns)
+
+
+def iter_data_chunks(path, columns, chunk_size):
+    """
+    Yield a generated dataset as DataFrames of at most chunk_size rows with only
+    the given columns, without ever loading the whole file
+    """
+    file_format = format_from_path(path)
+    if file_format == 'store':
+        store = open_store(path)
+        for start in range(0, len(store), chunk_size):
+            yield store.rows_between(start, start + chunk_size, columns)
+    elif file_format == 'parquet':
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    elif file_format == 'feather':
+        import pyarrow as pa
+        with pa.memory_map(str(path)) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i).select(columns)
+                for start in range(0, batch.num_rows, chunk_size):
+                    yield batch.slice(start, chunk_size).to_pandas()
+    else:
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunk_size)
+
+
+def _update_reservoir(reservoir, values, size, rng):
+    """
+    Keep a uniform sample of at most size values of a stream: every value gets a
+    random key and the values with the smallest keys seen so far are kept
+    """
+    kept_values, kept_keys = reservoir
+    values = np.concatenate([kept_values, values])
+    keys = np.concatenate([kept_keys, rng.random(len(values) - len(kept_values))])
+    if len(values) > size:
+        keep = np.argpartition(keys, size)[:size]
+        values, keys = values[keep], keys[keep]
+    return values, keys
+
+
+class _Aggregates:
+    """
+    Running value counts of the categorical columns, fixed-bin histograms of the numerical
+    columns and a reservoir sample of kde_sample values of each numerical column
+    """
+
+    def __init__(self, kde_sample, rng):
+        self.kde_sample = kde_sample
+        self.rng = rng
+        self.rows = 0
+        self.counts = {column: Counter() for column in categorical_columns}
+        self.histograms = {column: np.zeros(len(HISTOGRAM_EDGES[column]) - 1, dtype=np.int64)
+                           for column in numerical_columns}
+        self.reservoirs = {column: (np.empty(0), np.empty(0)) for column in numerical_columns}
+
+    def add_numerical(self, column, values):
+        edges = HISTOGRAM_EDGES[column]
+        values = np.asarray(values, dtype=np.float64)
+        self.histograms[column] += np.histogram(np.clip(values, edges[0], edges[-1]), bins=edges)[0]
+        if self.kde_sample > 0:
+            self.reservoirs[column] = _update_reservoir(self.reservoirs[column], values, self.kde_sample, self.rng)
+
+    def add_frame(self, chunk):
+        self.rows += len(chunk)
+        for column in categorical_columns:
+            self.counts[column].update(chunk[column].value_counts().to_dict())
+        for column in numerical_columns:
+            self.add_numerical(column, chunk[column])
+
+    def result(self):
+        return {
+            'rows': self.rows,
+            'counts': {
+                column: pd.Series(counter, dtype=np.int64).sort_values(ascending=False)
+                for column, counter in self.counts.items()
+            },
+            'histograms': {column: (self.histograms[column], HISTOGRAM_EDGES[column]) for column in numerical_columns},
+            'samples': {column: self.reservoirs[column][0] for column in numerical_columns},
+        }
+
+
+def aggregate_data(path, chunk_size, kde_sample=DEFAULT_KDE_SAMPLE, rng=None, facets=()):
+    """
+    Read the dataset chunk by chunk and return the value counts of the categorical
+    columns, fixed-bin histograms of the numerical columns and a reservoir sample
+    of kde_sample values of each numerical column, in memory bounded by chunk_size.
+    The same single pass aggregates every group of each facet column, under
+    'facets' as {facet: {value: aggregates}}.
+    """
+    if chunk_size <= 0:
+        raise ValueError("Chunk size must be positive")
+    if rng is None:
+        rng = np.random.default_rng()
+
+    total = _Aggregates(kde_sample, rng)
+    groups = {facet: {} for facet in facets}
+
+    if format_from_path(path) == 'store' and not facets:
+        """
+        Count the codes and histogram the numerical columns straight from the mapped arrays
+        """
+        store = open_store(path)
+        total.rows = len(store)
+        for start in range(0, total.rows, chunk_size):
+            for column in categorical_columns:
+                labels = store.categories(column)
+                if labels is None:
+                    values, value_counts = np.unique(store.column(column, start, start + chunk_size), return_counts=True)
+                    total.counts[column].update(dict(zip(values.tolist(), value_counts.tolist())))
+                else:
+                    codes = np.asarray(store.array(column)[start:start + chunk_size])
+                    total.counts[column].update(
+                        dict(zip(labels, np.bincount(codes[codes >= 0], minlength=len(labels)).tolist())))
+            for column in numerical_columns:
+                total.add_numerical(column, store.array(column)[start:start + chunk_size])
+    else:
+        columns = categorical_columns + numerical_columns
+        columns += [facet for facet in facets if facet not in columns]
+        for chunk in iter_data_chunks(path, columns, chunk_size):
+            total.add_frame(chunk)
+            for facet in facets:
+                for value, group in chunk.groupby(facet, observed=True, sort=False):
+                    if value not in groups[facet]:
+                        groups[facet][value] = _Aggregates(kde_sample, rng)
+                    groups[facet][value].add_frame(group)
+
+    aggregates = total.result()
+    if facets:
+        aggregates['facets'] = {
+            facet: {value: groups[facet][value].result() for value in sorted(groups[facet], key=str)}
+            for facet in facets
+        }
+    return aggregates
+
+
+def _normal_pdf(x, loc, scale):
+    return np.exp(-0.5 * ((x - loc) / scale) ** 2) / (scale * np.sqrt(2 * np.pi))
+
+
+def _gaussian_kde(sample, x, block=16):
+    """
+    Gaussian kernel density of sample evaluated at x, with Scott's rule bandwidth like
+    scipy.stats.gaussian_kde, block points of x at a time to bound memory
+    """
+    sample = np.asarray(sample, dtype=np.float64)
+    bandwidth = sample.std(ddof=1) * len(sample) ** (-1 / 5)
+    density = np.empty(len(x))
+    for start in range(0, len(x), block):
+        distances = (x[start:start + block, None] - sample[None, :]) / bandwidth
+        density[start:start + block] = np.exp(-0.5 * distances ** 2).sum(axis=1)
+    return density / (len(sample) * bandwidth * np.sqrt(2 * np.pi))
+
+
+def _plot_pie(ax, value_counts, column):
+    value_counts = value_counts[value_counts > 0]
+    ax.pie(
+        value_counts.values,
+        labels=value_counts.index,
+        autopct='%1.1f%%',
+        startangle=90,
+        labeldistance=1.1,
+        pctdistance=0.85,
+        textprops={'fontsize': 10}
+    )
+    ax.set_title(f'Distribution of {column}')
+    ax.axis('equal')
+
+
+def _finish_distribution(ax, column):
+    if column == 'GPA':
+        mean_gpa = 3.5
+        std_gpa = 0.5
+        x = np.linspace(2.0, 5.0, 100)
+        p = _normal_pdf(x, mean_gpa, std_gpa)
+        ax.plot(x, p, 'r-', lw=2, label=f'Theoretical Normal\n(μ={mean_gpa}, σ={std_gpa})')
+        ax.legend()
+    ax.set_title(f'Distribution of {column}')
+    ax.set_xlabel(column)
+    ax.set_ylabel('Density')
+    ax.grid(True, alpha=0.3)
+
+
+def _use_agg():
+    """
+    Render with the non-interactive Agg backend, in this process or a worker of the pool
+    """
+    matplotlib.use('Agg')
+
+
+def _save_charts(fig, axes, output_path, dpi):
+    for ax in axes[10:]:
+        ax.axis('off')
+
+    fig.tight_layout()
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    fig.savefig(output_path, dpi=dpi, bbox_inches='tight')
+    plt.close(fig)
+
+
+def plot_aggregates(aggregates, output_path=DEFAULT_OUTPUT, dpi=DEFAULT_DPI, title=None):
+    """
+    Generate the same charts as plot_pie_charts_and_distributions from the result
+    of aggregate_data: pies from the counts, densities from the histograms and a
+    KDE curve from the reservoir sample. Returns output_path.
+    """
+    _use_agg()
+    fig, axes = plt.subplots(3, 4, figsize=(24, 18))
+    axes = axes.flatten()
+    if title is not None:
+        fig.suptitle(title, fontsize=20)
+
+    for idx, column in enumerate(categorical_columns):
+        _plot_pie(axes[idx], aggregates['counts'][column], column)
+
+    for idx, column in enumerate(numerical_columns, start=len(categorical_columns)):
+        counts, edges = aggregates['histograms'][column]
+        total = counts.sum()
+        density = counts / (total * np.diff(edges)) if total else counts.astype(float)
+        axes[idx].stairs(density, edges, fill=True, color='skyblue')
+        sample = aggregates['samples'][column]
+        if len(sample) > 1 and np.ptp(sample) > 0:
+            x = np.linspace(edges[0], edges[-1], 200)
+            axes[idx].plot(x, _gaussian_kde(sample, x), color='steelblue', lw=2)
+        _finish_distribution(axes[idx], column)
+
+    _save_charts(fig, axes, output_path, dpi)
+    return output_path
+
+
+def plot_pie_charts_and_distributions(csv_path, output_path=DEFAULT_OUTPUT, dpi=DEFAULT_DPI, manifest=None):
     """
     Generate pie charts for categorical columns and histograms with KDE for numerical columns.
+    With a manifest, the figure is skipped when the plotted data and options have not changed
+    since the manifest was last saved. Returns whether the figure was drawn.
     """
     try:
-        df = pd.read_csv(csv_path)
+        df = read_data(csv_path, categorical_columns + numerical_columns)
     except FileNotFoundError:
         print(f"Error: The file '{csv_path}' was not found.")
         sys.exit(1)
     except Exception as e:
-        print(f"Error reading CSV file: {e}")
+        print(f"Error reading data file: {e}")
         sys.exit(1)
 
-    categorical_columns = [
-        'gender', 'nationality', 'state_program', 'student_status',
-        'academic_standing', 'payment_status', 'marital_status', 'scholarship'
-    ]
-
-    numerical_columns = [
-        'GPA', 'library_books_borrowed'
-    ]
+    if manifest is not None:
+        digest = hashlib.sha256(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+        fingerprint = _fingerprint({'data': digest.hexdigest(), 'dpi': dpi, 'title': None})
+        if manifest.is_unchanged(output_path, fingerprint):
+            print(f"Charts in '{output_path}' are up to date")
+            return False
 
+    _use_agg()
     fig, axes = plt.subplots(3, 4, figsize=(24, 18))
     axes = axes.flatten()
 
     for idx, column in enumerate(categorical_columns):
-        value_counts = df[column].value_counts()
-        labels = value_counts.index
-        sizes = value_counts.values
-        percentages = 100. * sizes / sizes.sum()
-
-        axes[idx].pie(
-            sizes,
-            labels=labels,
-            autopct='%1.1f%%',
-            startangle=90,
-            labeldistance=1.1,
-            pctdistance=0.85,
-            textprops={'fontsize': 10}
-        )
-        axes[idx].set_title(f'Distribution of {column}')
-        axes[idx].axis('equal')
+        _plot_pie(axes[idx], df[column].value_counts(), column)
 
     for idx, column in enumerate(numerical_columns, start=len(categorical_columns)):
         sns.histplot(
@@ -57,34 +340,193 @@ def plot_pie_charts_and_distributions(csv_path):
             color='skyblue',
             ax=axes[idx]
         )
-        if column == 'GPA':
-            mean_gpa = 3.5
-            std_gpa = 0.5
-            x = np.linspace(2.0, 5.0, 100)
-            p = norm.pdf(x, loc=mean_gpa, scale=std_gpa)
-            axes[idx].plot(x, p, 'r-', lw=2, label=f'Theoretical Normal\n(μ={mean_gpa}, σ={std_gpa})')
-            axes[idx].legend()
-        axes[idx].set_title(f'Distribution of {column}')
-        axes[idx].set_xlabel(column)
-        axes[idx].set_ylabel('Density')
-        axes[idx].grid(True, alpha=0.3)
+        _finish_distribution(axes[idx], column)
 
-    for ax in axes[10:]:
-        ax.axis('off')
-
-    plt.tight_layout()
-    output_path = 'output/pie_charts_and_distributions.png'
-    plt.savefig(output_path, dpi=300, bbox_inches='tight')
-    plt.close()
+    _save_charts(fig, axes, output_path, dpi)
+    if manifest is not None:
+        manifest.update(output_path, fingerprint)
     print(f"Charts saved to '{output_path}'")
+    return True
+
+
+def _slug(value):
+    return re.sub(r'[^0-9a-z]+', '_', str(value).lower()).strip('_') or 'none'
+
+
+def figure_path(output_path, facet, value):
+    """
+    <output>_<facet>_<value> with the extension of the output, e.g.
+    output/pie_charts_and_distributions_program_computer_science.png
+    """
+    root, ext = os.path.splitext(output_path)
+    return f'{root}_{_slug(facet)}_{_slug(value)}{ext}'
+
+
+def figures(aggregates, output_path):
+    """
+    (path, title, aggregates) of every figure: all the rows, then each group of each facet
+    """
+    result = [(output_path, None, aggregates)]
+    for facet, groups in aggregates.get('facets', {}).items():
+        for value, group in groups.items():
+            result.append((figure_path(output_path, facet, value), f"{facet}: {value} ({group['rows']} students)",
+                           group))
+    return result
+
+
+def _fingerprint(options, aggregates=None):
+    """
+    Hash of everything a figure is drawn from: its aggregates, the drawing options and
+    the source of this module, so changing how the charts are drawn redraws them
+    """
+    with open(os.path.abspath(__file__), 'rb') as f:
+        source = hashlib.sha256(f.read()).hexdigest()
+    digest = hashlib.sha256(json.dumps({**options, 'source': source}, sort_keys=True, default=str).encode())
+    if aggregates is not None:
+        digest.update(str(aggregates['rows']).encode())
+        for column in categorical_columns:
+            counts = aggregates['counts'][column]
+            digest.update(json.dumps(sorted([str(key), int(value)] for key, value in counts.items())).encode())
+        for column in numerical_columns:
+            digest.update(aggregates['histograms'][column][0].tobytes())
+            digest.update(np.asarray(aggregates['samples'][column], dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+class FigureManifest:
+    """
+    Fingerprints of the figures drawn into an output, saved next to it as <output>.manifest.json,
+    so a figure whose aggregates and options did not change since it was drawn is skipped
+    """
+
+    def __init__(self, output_path):
+        self.path = os.path.splitext(output_path)[0] + '.manifest.json'
+        try:
+            with open(self.path) as f:
+                self.fingerprints = json.load(f)
+        except (OSError, ValueError):
+            self.fingerprints = {}
+
+    def is_unchanged(self, figure, fingerprint):
+        return os.path.exists(figure) and self.fingerprints.get(figure) == fingerprint
+
+    def update(self, figure, fingerprint):
+        self.fingerprints[figure] = fingerprint
+        self.save()
+
+    def save(self):
+        output_dir = os.path.dirname(self.path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        with open(self.path, 'w') as f:
+            json.dump(self.fingerprints, f, indent=2, sort_keys=True)
+
+
+def render_figures(aggregates, output_path=DEFAULT_OUTPUT, dpi=DEFAULT_DPI, jobs=1, manifest=None):
+    """
+    Draw every figure of aggregates, in a pool of jobs processes when there are several to
+    draw. Figures the manifest knows to be unchanged are skipped.
+    Returns the paths of the figures drawn and of those skipped.
+    """
+    drawn, skipped, pending = [], [], []
+    for path, title, group in figures(aggregates, output_path):
+        fingerprint = _fingerprint({'dpi': dpi, 'title': title}, group)
+        if manifest is not None and manifest.is_unchanged(path, fingerprint):
+            skipped.append(path)
+        else:
+            pending.append((path, title, group, fingerprint))
+
+    if jobs > 1 and len(pending) > 1:
+        with futures.ProcessPoolExecutor(max_workers=min(jobs, len(pending))) as executor:
+            rendered = executor.map(plot_aggregates, *zip(*[(group, path, dpi, title)
+                                                            for path, title, group, _ in pending]))
+            drawn = list(rendered)
+    else:
+        drawn = [plot_aggregates(group, path, dpi, title) for path, title, group, _ in pending]
+
+    if manifest is not None:
+        for path, _, _, fingerprint in pending:
+            manifest.fingerprints[path] = fingerprint
+        manifest.save()
+    return drawn, skipped
+
+
+def output_figure_path(output_path, figure_format):
+    """
+    output_path with the extension of figure_format, the format of output_path when it is None
+    """
+    root, ext = os.path.splitext(output_path)
+    if figure_format is None:
+        if ext.lower().lstrip('.') not in FIGURE_FORMATS:
+            raise ValueError(f"Unknown figure format '{ext}', use one of {', '.join(FIGURE_FORMATS)}")
+        return output_path
+    return f'{root}.{figure_format}'
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='plot2.py',
+        description='Plot the distributions of a generated university students dataset'
+    )
+    parser.add_argument('csv_path', help='CSV, Parquet or Feather file, or column store directory, to plot')
+    parser.add_argument('--chunk-size', type=int, default=None,
+                        help='read the file this many rows at a time and plot from running counts and '
+                             'histograms, in bounded memory (default: load the plotted columns at once, or '
+                             f'{DEFAULT_CHUNK_SIZE} rows at a time with --facets)')
+    parser.add_argument('--kde-sample', type=int, default=DEFAULT_KDE_SAMPLE,
+                        help='with --chunk-size, values per numerical column kept in a reservoir sample for the '
+                             f'KDE curve, 0 to skip the KDE (default: {DEFAULT_KDE_SAMPLE})')
+    parser.add_argument('--facets', type=lambda value: [c.strip() for c in value.split(',') if c.strip()],
+                        default=[],
+                        help='comma separated columns, e.g. program,nationality; one more figure is drawn for '
+                             'every value of each, to <output>_<column>_<value>, from the same pass over the data')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT,
+                        help=f'figure of all the rows, facet figures are named after it (default: {DEFAULT_OUTPUT})')
+    parser.add_argument('--format', choices=FIGURE_FORMATS, default=None,
+                        help='figure format (default: from the --output extension)')
+    parser.add_argument('--dpi', type=int, default=DEFAULT_DPI,
+                        help=f'resolution of raster figures; the 24x18 inch figures take a quarter of the time '
+                             f'at 150 (default: {DEFAULT_DPI})')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1,
+                        help='draw figures in this many processes (default: the number of CPUs)')
+    parser.add_argument('--force', action='store_true',
+                        help='redraw every figure, even those whose data and options did not change since the '
+                             'last run')
+    return parser.parse_args(argv)
+
 
 def main():
-    if len(sys.argv) != 2:
-        print("Usage: python plot.py <csv_path>")
+    args = parse_args()
+
+    try:
+        if args.dpi <= 0:
+            raise ValueError("DPI must be positive")
+        if args.jobs <= 0:
+            raise ValueError("Jobs must be positive")
+        output_path = output_figure_path(args.output, args.format)
+    except ValueError as e:
+        print(f"Error: {e}")
         sys.exit(1)
+    manifest = None if args.force else FigureManifest(output_path)
+
+    if args.chunk_size is None and not args.facets:
+        plot_pie_charts_and_distributions(args.csv_path, output_path, args.dpi, manifest)
+        return
 
-    csv_path = sys.argv[1]
-    plot_pie_charts_and_distributions(csv_path)
+    try:
+        aggregates = aggregate_data(args.csv_path, args.chunk_size or DEFAULT_CHUNK_SIZE, args.kde_sample,
+                                    np.random.default_rng(AGGREGATE_SEED), args.facets)
+    except FileNotFoundError:
+        print(f"Error: The file '{args.csv_path}' was not found.")
+        sys.exit(1)
+    except Exception as e:
+        print(f"Error reading data file: {e}")
+        sys.exit(1)
+    drawn, skipped = render_figures(aggregates, output_path, args.dpi, args.jobs, manifest)
+    for path in drawn:
+        print(f"Charts saved to '{path}'")
+    if skipped:
+        print(f"Skipped {len(skipped)} unchanged figures")
 
 if __name__ == "__main__":
     main()
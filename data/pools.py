@@ -0,0 +1,101 @@
+import importlib.util
+import os
+import re
+import sys
+import numpy as np
+
+
+def user_cache_dir(name):
+    """
+    Directory of one cache of the generator, under $XDG_CACHE_HOME when it is set and ~/.cache otherwise
+    """
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'data-generator', name)
+
+
+DEFAULT_LOCALE = 'en_US'
+DEFAULT_POOL_SIZE = 10000
+POOL_CACHE_DIR = user_cache_dir('pools')
+
+"""
+Pools are always drawn with the same Faker seed, so a cached pool is identical
+to a freshly built one and row-level randomness only comes from the indices
+"""
+POOL_SEED = 0
+
+POOL_PROVIDERS = {
+    'last_name': lambda fake: fake.last_name(),
+    'first_name_male': lambda fake: fake.first_name_male(),
+    'first_name_female': lambda fake: fake.first_name_female(),
+    'first_name_nonbinary': lambda fake: fake.first_name_nonbinary(),
+    'address': lambda fake: fake.address().replace('\n', ', '),
+    'advisor_name': lambda fake: fake.name(),
+}
+
+_loaded_pools = {}
+
+
+def faker_version():
+    """
+    Version of the installed Faker. Importing faker takes longer than reading a
+    cached pool, so the version is read from its __init__.py unless it is already imported
+    """
+    if 'faker' in sys.modules:
+        return sys.modules['faker'].VERSION
+    spec = importlib.util.find_spec('faker')
+    if spec is not None and spec.origin:
+        with open(spec.origin, encoding='utf-8') as f:
+            match = re.search(r'^VERSION\s*=\s*[\'"]([^\'"]+)[\'"]', f.read(), re.MULTILINE)
+        if match:
+            return match.group(1)
+    import faker
+    return faker.VERSION
+
+
+def _pool_cache_path(cache_dir, locale, pool_size):
+    return os.path.join(cache_dir, f'{locale}-{pool_size}-faker{faker_version()}.npz')
+
+
+def build_pools(locale=DEFAULT_LOCALE, pool_size=DEFAULT_POOL_SIZE):
+    """
+    Call Faker pool_size times per provider and return the values as string arrays.
+    Faker is only imported here, when a pool is not cached yet
+    """
+    from faker import Faker
+
+    fake = Faker(locale)
+    fake.seed_instance(POOL_SEED)
+    return {
+        name: np.array([provider(fake) for _ in range(pool_size)], dtype=str)
+        for name, provider in POOL_PROVIDERS.items()
+    }
+
+
+def load_pools(locale=DEFAULT_LOCALE, pool_size=DEFAULT_POOL_SIZE, cache_dir=POOL_CACHE_DIR):
+    """
+    Return the vocabulary pools for a locale, reading them from the on-disk cache
+    when available and building (and caching) them otherwise.
+    Pass cache_dir=None to skip the disk cache.
+    """
+    if pool_size <= 0:
+        raise ValueError("Pool size must be positive")
+
+    key = (locale, pool_size, cache_dir)
+    if key in _loaded_pools:
+        return _loaded_pools[key]
+
+    path = _pool_cache_path(cache_dir, locale, pool_size) if cache_dir else None
+    if path and os.path.exists(path):
+        with np.load(path, allow_pickle=False) as cached:
+            pools = {name: cached[name] for name in POOL_PROVIDERS}
+    else:
+        pools = build_pools(locale, pool_size)
+        if path:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                np.savez_compressed(f, **pools)
+            os.replace(tmp_path, path)
+
+    _loaded_pools[key] = pools
+    return pools
@@ -0,0 +1,203 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+"""
+The profile stage() and record_chunk() record into, None when profiling is off so
+the instrumented code only pays for one global lookup
+"""
+_active = None
+
+
+class Profile:
+    """
+    Wall time, peak traced allocations and rows of every named stage and chunk,
+    plus the raw events for a Chrome trace
+    """
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.stages = {}
+        self.chunks = []
+        self.events = []
+        """
+        Rows of the chunk each thread is generating, so a writer thread does not
+        credit its stages with the chunk of the generator
+        """
+        self._rows = {}
+        self._watermark = 0
+
+    def _memory(self):
+        if not self.trace_memory:
+            return 0, 0
+        return tracemalloc.get_traced_memory()
+
+    def _event(self, name, category, start, end, args):
+        self.events.append({
+            'name': name, 'cat': category, 'ph': 'X',
+            'ts': start / 1000, 'dur': (end - start) / 1000,
+            'pid': os.getpid(), 'tid': threading.get_ident(), 'args': args,
+        })
+
+    def add_stage(self, name, start, end, allocated):
+        totals = self.stages.setdefault(name, {'calls': 0, 'seconds': 0.0, 'rows': 0, 'peak_allocated': 0})
+        totals['calls'] += 1
+        totals['seconds'] += (end - start) / 1e9
+        rows = self._rows.get(threading.get_ident(), 0)
+        totals['rows'] += rows
+        totals['peak_allocated'] = max(totals['peak_allocated'], allocated)
+        self._event(name, 'stage', start, end, {'rows': rows, 'allocated': allocated})
+
+    def add_chunk(self, index, rows, start, end, allocated):
+        self.chunks.append({'chunk': index, 'rows': rows, 'seconds': (end - start) / 1e9, 'peak_allocated': allocated})
+        self._event(f'chunk {index}', 'chunk', start, end, {'rows': rows, 'allocated': allocated})
+
+    def merge(self, other):
+        """
+        Add the stages, chunks and events of a profile recorded in another process
+        """
+        for name, totals in other.stages.items():
+            mine = self.stages.setdefault(name, {'calls': 0, 'seconds': 0.0, 'rows': 0, 'peak_allocated': 0})
+            mine['calls'] += totals['calls']
+            mine['seconds'] += totals['seconds']
+            mine['rows'] += totals['rows']
+            mine['peak_allocated'] = max(mine['peak_allocated'], totals['peak_allocated'])
+        self.chunks.extend(other.chunks)
+        self.chunks.sort(key=lambda c: c['chunk'])
+        self.events.extend(other.events)
+
+    def report(self):
+        """
+        Table of the stages sorted by time, then of the chunks
+        """
+        total = sum(s['seconds'] for s in self.stages.values()) or 1.0
+        lines = [f"{'stage':<28} {'calls':>6} {'seconds':>9} {'%':>6} {'rows/sec':>13} {'peak alloc MB':>14}"]
+        for name, s in sorted(self.stages.items(), key=lambda item: -item[1]['seconds']):
+            rows_per_second = f"{s['rows'] / s['seconds']:,.0f}" if s['rows'] and s['seconds'] else '-'
+            lines.append(f"{name:<28} {s['calls']:>6} {s['seconds']:>9.4f} {100 * s['seconds'] / total:>6.1f} "
+                         f"{rows_per_second:>13} {s['peak_allocated'] / 2 ** 20:>14.1f}")
+        if self.chunks:
+            lines.append('')
+            lines.append(f"{'chunk':<28} {'rows':>6} {'seconds':>9} {'':>6} {'rows/sec':>13} {'peak alloc MB':>14}")
+            for c in self.chunks:
+                rows_per_second = f"{c['rows'] / c['seconds']:,.0f}" if c['seconds'] else '-'
+                lines.append(f"{c['chunk']:<28} {c['rows']:>6} {c['seconds']:>9.4f} {'':>6} "
+                             f"{rows_per_second:>13} {c['peak_allocated'] / 2 ** 20:>14.1f}")
+        return '\n'.join(lines)
+
+    def write_json(self, path):
+        with open(path, 'w') as f:
+            json.dump({'stages': self.stages, 'chunks': self.chunks}, f, indent=2)
+
+    def write_chrome_trace(self, path):
+        """
+        Write the events in the Trace Event format read by chrome://tracing and Perfetto
+        """
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': self.events, 'displayTimeUnit': 'ms'}, f)
+
+
+@contextmanager
+def stage(name):
+    """
+    Record the wall time and peak traced allocations of the block as the named
+    stage of the active profile, a no-op when nothing is recording
+    """
+    profile = _active
+    if profile is None:
+        yield
+        return
+    before = profile._memory()[0]
+    if profile.trace_memory:
+        tracemalloc.reset_peak()
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        end = time.perf_counter_ns()
+        peak = profile._memory()[1]
+        profile._watermark = max(profile._watermark, peak)
+        profile.add_stage(name, start, end, max(0, peak - before))
+
+
+@contextmanager
+def record_chunk(index, rows):
+    """
+    Record the block as one chunk of rows of the active profile, the stages
+    run inside it are credited with its rows
+    """
+    profile = _active
+    if profile is None:
+        yield
+        return
+    before = profile._memory()[0]
+    profile._watermark = before
+    thread = threading.get_ident()
+    previous_rows, profile._rows[thread] = profile._rows.get(thread, 0), rows
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        end = time.perf_counter_ns()
+        profile._rows[thread] = previous_rows
+        peak = max(profile._watermark, profile._memory()[1])
+        profile.add_chunk(index, rows, start, end, max(0, peak - before))
+
+
+def is_profiling():
+    return _active is not None
+
+
+def is_tracing_memory():
+    return _active is not None and _active.trace_memory
+
+
+@contextmanager
+def profiling(trace_memory=True):
+    """
+    Activate a Profile for the block, tracing allocations with tracemalloc when
+    trace_memory is set
+    """
+    global _active
+    previous, _active = _active, Profile(trace_memory)
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    try:
+        yield _active
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+        _active = previous
+
+
+def merge_profile(profile):
+    """
+    Merge a profile returned by run_profiled into the active one
+    """
+    if _active is not None:
+        _active.merge(profile)
+
+
+def run_profiled(fn, trace_memory, *args):
+    """
+    Run fn(*args) under a fresh profile, for worker processes, and return the
+    result together with the profile so the parent can merge it
+    """
+    with profiling(trace_memory) as profile:
+        result = fn(*args)
+    return result, profile
+
+
+@contextmanager
+def record_stages():
+    """
+    Collect the seconds spent in each stage() while the block runs into a dict
+    """
+    seconds = {}
+    with profiling(trace_memory=False) as profile:
+        yield seconds
+    seconds.update({name: totals['seconds'] for name, totals in profile.stages.items()})
@@ -0,0 +1,121 @@
+import numpy as np
+
+try:
+    from .counter_rng import CounterRandom
+    from .profiling import stage
+except ImportError:
+    from counter_rng import CounterRandom
+    from profiling import stage
+
+
+class ColumnSpec:
+    """
+    One column of a schema: the columns it is computed from, a short description
+    of its distribution and the vectorized function generating a whole batch of it
+    """
+
+    def __init__(self, name, depends, distribution, generate, index):
+        self.name = name
+        self.depends = tuple(depends)
+        self.distribution = distribution
+        self.generate = generate
+        self.index = index
+
+
+class Batch:
+    """
+    What the generate function of a column gets: the batch size, its own random
+    generator, the values of the columns it depends on and the options of the run
+    """
+
+    def __init__(self, size, rng, values, options):
+        self.size = size
+        self.rng = rng
+        self.values = values
+        self.options = options
+
+    def __getitem__(self, name):
+        return self.values[name]
+
+    def __getattr__(self, name):
+        try:
+            return self.options[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+class Schema:
+    """
+    Registry of column specs. Generating a set of columns only runs their specs and
+    those they depend on, in dependency order, each once per batch
+    """
+
+    def __init__(self):
+        self.specs = {}
+
+    def column(self, name, depends=(), distribution=''):
+        """
+        Decorator registering fn(batch) as the generator of the named column
+        """
+        def register(fn):
+            if name in self.specs:
+                raise ValueError(f"Column '{name}' is already registered")
+            self.specs[name] = ColumnSpec(name, depends, distribution, fn, len(self.specs))
+            return fn
+        return register
+
+    def __getitem__(self, name):
+        return self.specs[name]
+
+    def __contains__(self, name):
+        return name in self.specs
+
+    def resolve(self, columns):
+        """
+        The given columns and everything they depend on, topologically sorted so
+        every column comes after its dependencies
+        """
+        order = []
+        state = {}
+
+        def visit(name, path):
+            if name not in self.specs:
+                raise ValueError(f"Unknown column '{name}'" + (f" (needed by '{path[-1]}')" if path else ''))
+            if state.get(name) == 'done':
+                return
+            if state.get(name) == 'visiting':
+                raise ValueError(f"Circular column dependency: {' -> '.join(path + [name])}")
+            state[name] = 'visiting'
+            for dependency in self.specs[name].depends:
+                visit(dependency, path + [name])
+            state[name] = 'done'
+            order.append(name)
+
+        for name in columns:
+            visit(name, [])
+        return order
+
+    def generate(self, columns, size, rng=None, entropy=None, start=0, **options):
+        """
+        Generate the given columns for a batch of size rows and return the values
+        of every column computed on the way, keyed by name.
+        Each column draws from its own stream, derived from one draw of rng and the
+        registration index of the column, so a column has the same values whichever
+        other columns are generated with it.
+        With entropy, the batch is rows start to start + size of the dataset keyed by
+        entropy instead, drawn from a CounterRandom per column, so every row has the
+        same values whichever range it is generated in.
+        """
+        if entropy is None:
+            key = rng.integers(0, 2 ** 63, size=2)
+        values = {}
+        for name in self.resolve(columns):
+            spec = self.specs[name]
+            if entropy is None:
+                spec_rng = np.random.default_rng(np.random.SeedSequence(key, spawn_key=(spec.index,)))
+            else:
+                spec_rng = CounterRandom(entropy, (spec.index,), start)
+            batch = Batch(size, spec_rng, values, options)
+            with stage(name):
+                values[name] = spec.generate(batch)
+        return values
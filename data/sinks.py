@@ -0,0 +1,195 @@
+import sqlite3
+import numpy as np
+
+try:
+    from .lazy import lazy_import
+    from .profiling import stage
+except ImportError:
+    from lazy import lazy_import
+    from profiling import stage
+
+pd = lazy_import('pandas')
+
+DEFAULT_SINK_BATCH_ROWS = 100000
+
+"""
+Column types of each database by kind of column, see _column_kind
+"""
+SQLITE_TYPES = {
+    'bool': 'INTEGER', 'int8': 'INTEGER', 'int16': 'INTEGER', 'int32': 'INTEGER', 'int64': 'INTEGER',
+    'float32': 'REAL', 'float64': 'REAL', 'date': 'TEXT', 'timestamp': 'TEXT', 'category': 'TEXT', 'text': 'TEXT',
+}
+DUCKDB_TYPES = {
+    'bool': 'BOOLEAN', 'int8': 'TINYINT', 'int16': 'SMALLINT', 'int32': 'INTEGER', 'int64': 'BIGINT',
+    'float32': 'REAL', 'float64': 'DOUBLE', 'date': 'DATE', 'timestamp': 'TIMESTAMP', 'category': 'VARCHAR',
+    'text': 'VARCHAR',
+}
+
+
+def parse_sink(url):
+    """
+    Split a sink URL like sqlite:///output/university.db into ('sqlite', 'output/university.db'),
+    four slashes make the path absolute as in SQLAlchemy URLs
+    """
+    kind, separator, path = url.partition('://')
+    if not separator or kind not in SINKS:
+        raise ValueError(f"Unknown sink '{url}', expected {' or '.join(f'{k}:///path' for k in SINKS)}")
+    if not path.startswith('/') or len(path) == 1:
+        raise ValueError(f"The sink '{url}' needs a database path, like {kind}:///output/university.db")
+    return kind, path[1:]
+
+
+def _require_duckdb():
+    try:
+        import duckdb
+    except ImportError:
+        raise ImportError("DuckDB sinks need duckdb, install it with 'pip install duckdb'")
+    return duckdb
+
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _literal(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _column_kind(series):
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        return 'category'
+    if pd.api.types.is_bool_dtype(dtype):
+        return 'bool'
+    if pd.api.types.is_integer_dtype(dtype):
+        return f'int{8 * dtype.itemsize}'
+    if pd.api.types.is_float_dtype(dtype):
+        return 'float32' if dtype == np.float32 else 'float64'
+    if pd.api.types.is_datetime64_dtype(dtype):
+        values = series.to_numpy()
+        values = values[~np.isnat(values)]
+        return 'date' if (values == values.astype('datetime64[D]')).all() else 'timestamp'
+    return 'text'
+
+
+def _column_types(df, kinds, types):
+    """
+    SQL type of every column of df, DuckDB category columns are ENUMs of their categories.
+    SQLite has no enumerations, and CHECK constraints would make inserts several times slower
+    """
+    column_types = {}
+    for column in df.columns:
+        column_types[column] = types[kinds[column]]
+        if kinds[column] == 'category' and types is DUCKDB_TYPES:
+            column_types[column] = f"ENUM({', '.join(_literal(value) for value in df[column].dtype.categories)})"
+    return column_types
+
+
+def _create_table(table, column_types):
+    columns = ', '.join(f'{_quote(column)} {column_type} NOT NULL' for column, column_type in column_types.items())
+    return f'CREATE TABLE {_quote(table)} ({columns})'
+
+
+def _create_indexes(connection, table, columns, indexes):
+    """
+    Index the given columns of table once it is loaded, student_id as a unique key
+    """
+    for column in indexes:
+        if column in columns:
+            unique = 'UNIQUE ' if column == 'student_id' and table == 'students' else ''
+            connection.execute(f'CREATE {unique}INDEX {_quote(f"{table}_{column}")} '
+                               f'ON {_quote(table)} ({_quote(column)})')
+
+
+def _sqlite_values(series, kind):
+    """
+    The column as a list of Python values sqlite3 binds directly: category codes are
+    looked up in a table of Python strings, dates become ISO text and float32 values
+    their shortest decimal form, so the database reads like the CSV output
+    """
+    if kind == 'category':
+        table = np.array([str(value) for value in series.dtype.categories], dtype=object)
+        return table[series.cat.codes.to_numpy()].tolist()
+    values = series.to_numpy()
+    if kind == 'float32':
+        return values.astype(str).astype(np.float64).tolist()
+    if kind == 'date':
+        return np.datetime_as_string(values.astype('datetime64[D]')).tolist()
+    if kind == 'timestamp':
+        return np.char.replace(np.datetime_as_string(values, unit='s'), 'T', ' ').tolist()
+    if kind == 'text':
+        return series.to_numpy(dtype=object).tolist()
+    return values.tolist()
+
+
+def write_sqlite(chunks, output_path, table='students', batch_rows=DEFAULT_SINK_BATCH_ROWS, indexes=()):
+    """
+    Load DataFrame chunks into table of the SQLite database at output_path, replacing
+    the table. Rows are inserted with a prepared executemany, batch_rows per
+    transaction, and the indexes on the given columns are built after the load.
+    Returns the number of rows written.
+    """
+    connection = sqlite3.connect(output_path, timeout=600, isolation_level=None)
+    rows = 0
+    kinds = None
+    try:
+        connection.execute('PRAGMA synchronous = OFF')
+        for df in chunks:
+            with stage('write_sqlite'):
+                if kinds is None:
+                    kinds = {column: _column_kind(df[column]) for column in df.columns}
+                    connection.execute(f'DROP TABLE IF EXISTS {_quote(table)}')
+                    connection.execute(_create_table(table, _column_types(df, kinds, SQLITE_TYPES)))
+                    insert = f'INSERT INTO {_quote(table)} VALUES ({", ".join("?" * len(df.columns))})'
+                for start in range(0, len(df), batch_rows):
+                    block = df.iloc[start:start + batch_rows]
+                    values = [_sqlite_values(block[column], kinds[column]) for column in block.columns]
+                    connection.execute('BEGIN')
+                    connection.executemany(insert, zip(*values))
+                    connection.execute('COMMIT')
+            rows += len(df)
+        if kinds is not None:
+            with stage('sqlite_indexes'):
+                _create_indexes(connection, table, kinds, indexes)
+    finally:
+        connection.close()
+    return rows
+
+
+def write_duckdb(chunks, output_path, table='students', batch_rows=None, indexes=()):
+    """
+    Load DataFrame chunks into table of the DuckDB database at output_path, replacing
+    the table. Every chunk is inserted in one transaction by scanning the DataFrame
+    in place, batch_rows is unused. Indexes are built after the load.
+    Returns the number of rows written.
+    """
+    duckdb = _require_duckdb()
+    connection = duckdb.connect(str(output_path))
+    rows = 0
+    kinds = None
+    try:
+        for df in chunks:
+            with stage('write_duckdb'):
+                if kinds is None:
+                    kinds = {column: _column_kind(df[column]) for column in df.columns}
+                    connection.execute(f'DROP TABLE IF EXISTS {_quote(table)}')
+                    column_types = _column_types(df, kinds, DUCKDB_TYPES)
+                    connection.execute(_create_table(table, column_types))
+                    select = ', '.join(f'CAST({_quote(column)} AS {column_type})'
+                                       for column, column_type in column_types.items())
+                connection.register('chunk', df)
+                connection.execute(f'INSERT INTO {_quote(table)} SELECT {select} FROM chunk')
+                connection.unregister('chunk')
+            rows += len(df)
+        if kinds is not None:
+            with stage('duckdb_indexes'):
+                _create_indexes(connection, table, kinds, indexes)
+    finally:
+        connection.close()
+    return rows
+
+
+SINKS = {
+    'sqlite': write_sqlite,
+    'duckdb': write_duckdb,
+}
@@ -0,0 +1,112 @@
+import json
+import os
+import numpy as np
+
+try:
+    from .lazy import lazy_import
+    from .writers import STORE_META
+except ImportError:
+    from lazy import lazy_import
+    from writers import STORE_META
+
+pd = lazy_import('pandas')
+
+
+class ColumnStore:
+    """
+    Read-only view of a directory written by writers.write_store. Every column file
+    is memory-mapped, so reading a slice of rows only touches the pages it lives in.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, STORE_META)) as f:
+            meta = json.load(f)
+        self.rows = meta['rows']
+        self.meta = meta['columns']
+        self._mapped = {}
+
+    def __len__(self):
+        return self.rows
+
+    @property
+    def columns(self):
+        return list(self.meta)
+
+    def _map(self, filename):
+        if filename not in self._mapped:
+            self._mapped[filename] = np.load(os.path.join(self.path, filename), mmap_mode='r')
+        return self._mapped[filename]
+
+    def _check(self, column):
+        if column not in self.meta:
+            raise KeyError(f"Column '{column}' is not in the store")
+        return self.meta[column]
+
+    def array(self, column):
+        """
+        The whole memory-mapped array of a numeric column, or the integer codes of a
+        categorical column, nothing is read until it is indexed
+        """
+        if self._check(column)['kind'] == 'string':
+            raise ValueError(f"'{column}' is a string column, use strings() to read it")
+        return self._map(f'{column}.npy')
+
+    def categories(self, column):
+        return self._check(column).get('categories')
+
+    def strings(self, column, start=0, stop=None):
+        """
+        Rows start to stop of a string column as a unicode array, only reading the
+        offsets and the bytes of those rows
+        """
+        self._check(column)
+        start, stop, _ = slice(start, stop).indices(self.rows)
+        stop = max(start, stop)
+        offsets = np.asarray(self._map(f'{column}.offsets.npy')[start:stop + 1])
+        lengths = np.diff(offsets)
+        width = int(lengths.max(initial=0))
+        if width == 0:
+            return np.full(stop - start, '', dtype='U1')
+        with open(os.path.join(self.path, f'{column}.blob'), 'rb') as f:
+            f.seek(int(offsets[0]))
+            blob = np.frombuffer(f.read(int(offsets[-1] - offsets[0])), dtype=np.uint8)
+
+        """
+        Scatter the bytes of every row at the start of its own fixed-width slot
+        """
+        matrix = np.zeros((stop - start, width), dtype=np.uint8)
+        row_starts = offsets[:-1] - offsets[0]
+        positions = np.arange(len(blob)) - np.repeat(row_starts - np.arange(stop - start) * width, lengths)
+        matrix.ravel()[positions] = blob
+        return np.char.decode(matrix.view(f'S{width}').ravel(), 'utf-8')
+
+    def column(self, column, start=0, stop=None):
+        """
+        Rows start to stop of a column: a view of the mapped file for numeric columns,
+        a Categorical over the mapped codes and decoded strings otherwise
+        """
+        kind = self._check(column)['kind']
+        if kind == 'string':
+            return self.strings(column, start, stop)
+        values = self.array(column)[start:stop]
+        if kind == 'categorical':
+            return pd.Categorical.from_codes(values, categories=self.categories(column))
+        return values
+
+    def rows_between(self, start, stop, columns=None):
+        """
+        DataFrame of the rows start to stop (excluded) of the given columns, all by default
+        """
+        columns = self.columns if columns is None else columns
+        start, stop, _ = slice(start, stop).indices(self.rows)
+        stop = max(start, stop)
+        return pd.DataFrame({column: self.column(column, start, stop) for column in columns},
+                            index=pd.RangeIndex(start, stop), copy=False)
+
+    def to_frame(self, columns=None):
+        return self.rows_between(0, self.rows, columns)
+
+
+def open_store(path):
+    return ColumnStore(path)
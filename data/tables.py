@@ -0,0 +1,166 @@
+import numpy as np
+
+try:
+    from .lazy import lazy_import
+except ImportError:
+    from lazy import lazy_import
+
+pd = lazy_import('pandas')
+
+DEFAULT_ADVISOR_COUNT = 49
+
+"""
+Every program has this many courses, COURSES_PER_LEVEL per level from 100 to 400
+"""
+COURSES_PER_PROGRAM = 40
+COURSES_PER_LEVEL = 10
+
+"""
+Most courses a student enrolls in during a semester, one per 3 credits of the course load
+"""
+MAX_ENROLLMENTS = 7
+
+"""
+Strides coprime with COURSES_PER_PROGRAM: stepping through the courses of a program
+by one of them visits MAX_ENROLLMENTS distinct courses
+"""
+COURSE_STRIDES = np.array([s for s in range(1, COURSES_PER_PROGRAM) if np.gcd(s, COURSES_PER_PROGRAM) == 1])
+
+PROGRAM_FACULTIES = {
+    'Computer Science': 'Engineering', 'Software Engineering': 'Engineering',
+    'Information Technology': 'Engineering', 'Data Science': 'Engineering', 'Cybersecurity': 'Engineering',
+    'Artificial Intelligence': 'Engineering', 'Engineering': 'Engineering', 'Mechanical Engineering': 'Engineering',
+    'Electrical Engineering': 'Engineering', 'Civil Engineering': 'Engineering',
+    'Industrial Engineering': 'Engineering', 'Biology': 'Sciences', 'Chemistry': 'Sciences',
+    'Biotechnology': 'Sciences', 'Medicine': 'Health', 'Nursing': 'Health', 'Pharmacy': 'Health',
+    'Psychology': 'Social Sciences', 'Sociology': 'Social Sciences', 'Anthropology': 'Social Sciences',
+    'Political Science': 'Social Sciences', 'Philosophy': 'Humanities', 'History': 'Humanities',
+    'Business Administration': 'Business', 'Marketing': 'Business', 'Accounting': 'Business',
+    'Economics': 'Business', 'Finance': 'Business', 'Entrepreneurship': 'Business', 'Graphic Design': 'Arts',
+    'Architecture': 'Arts', 'Music': 'Arts', 'International Relations': 'Social Sciences',
+}
+
+
+def prefixed_ids(prefix, numbers, width):
+    """
+    Build ids like STU000042 from an integer array
+    """
+    return np.char.add(prefix, np.char.zfill(np.asarray(numbers).astype(str), width))
+
+
+def program_ids(program_count):
+    return prefixed_ids('PRG', np.arange(1, program_count + 1), 2)
+
+
+def advisor_ids(advisor_indices):
+    return prefixed_ids('ADV', np.asarray(advisor_indices) + 1, 4)
+
+
+def course_ids(course_indices):
+    return prefixed_ids('CRS', np.asarray(course_indices) + 1, 4)
+
+
+def check_advisor_count(advisor_count, program_count):
+    """
+    Every program needs an advisor
+    """
+    if advisor_count < program_count:
+        raise ValueError(f"Advisor count must be at least the number of programs ({program_count})")
+
+
+def advisor_pool_size(pool_size, advisor_count):
+    """
+    Size of the pools advisor names are drawn from: the pool size, grown to one entry
+    per advisor when it is smaller, so every advisor has a name of its own
+    """
+    return max(pool_size, advisor_count)
+
+
+def advisor_names(pools, advisor_count):
+    """
+    Name of every advisor: advisor i is the i-th entry of the advisor name pool,
+    which needs at least advisor_count entries (see advisor_pool_size)
+    """
+    return pools['advisor_name'][:advisor_count]
+
+
+def advisor_programs(advisor_count, program_count):
+    """
+    Program code of every advisor, the advisors are dealt to the programs in turn
+    """
+    return np.arange(advisor_count) % program_count
+
+
+def program_advisors(program_codes, uniforms, advisor_count, program_count):
+    """
+    Index of an advisor of each program, picked by a uniform in [0, 1): the advisors of
+    program p are p, p + program_count, p + 2 * program_count ...
+    """
+    per_program = (advisor_count - program_codes + program_count - 1) // program_count
+    return program_codes + program_count * np.minimum((uniforms * per_program).astype(np.int64), per_program - 1)
+
+
+def advisors_table(pools, advisor_count, programs):
+    return pd.DataFrame({
+        'advisor_id': advisor_ids(np.arange(advisor_count)),
+        'advisor_name': advisor_names(pools, advisor_count),
+        'program_id': program_ids(len(programs))[advisor_programs(advisor_count, len(programs))],
+    })
+
+
+def programs_table(programs):
+    return pd.DataFrame({
+        'program_id': program_ids(len(programs)),
+        'program': programs,
+        'faculty': [PROGRAM_FACULTIES[program] for program in programs],
+    })
+
+
+def courses_table(programs):
+    """
+    COURSES_PER_PROGRAM courses per program, course k of program p has index p * COURSES_PER_PROGRAM + k
+    """
+    program_codes = np.repeat(np.arange(len(programs)), COURSES_PER_PROGRAM)
+    numbers = np.tile(np.arange(COURSES_PER_PROGRAM), len(programs))
+    levels = numbers // COURSES_PER_LEVEL + 1
+    course_numbers = levels * 100 + numbers % COURSES_PER_LEVEL + 1
+    return pd.DataFrame({
+        'course_id': course_ids(np.arange(len(program_codes))),
+        'program_id': program_ids(len(programs))[program_codes],
+        'course_name': np.char.add(np.char.add(np.asarray(programs)[program_codes], ' '), course_numbers.astype(str)),
+        'level': levels.astype(np.int8),
+        'credits': (numbers % 3 + 2).astype(np.int8),
+    })
+
+
+def enrollment_counts(course_loads):
+    return np.minimum(np.asarray(course_loads) // 3, MAX_ENROLLMENTS)
+
+
+def enrollments(student_numbers, student_ids, program_codes, semesters, course_loads, gpas, rng, program_count):
+    """
+    The courses every student is enrolled in this semester: course_load // 3 distinct
+    courses of their program, each with a grade around their GPA.
+    Every student draws the same number of values from rng whatever their course count,
+    so with a counter-based rng a student's enrollments do not depend on the batch.
+    enrollment_id is student_number * MAX_ENROLLMENTS + the position of the course.
+    """
+    size = len(student_ids)
+    first = rng.integers(0, COURSES_PER_PROGRAM, size)
+    stride = COURSE_STRIDES[rng.integers(0, len(COURSE_STRIDES), size)]
+    noise = np.column_stack([rng.normal(0.0, 0.5, size) for _ in range(MAX_ENROLLMENTS)])
+
+    counts = enrollment_counts(course_loads)
+    taken = np.arange(MAX_ENROLLMENTS) < counts[:, None]
+    positions = np.broadcast_to(np.arange(MAX_ENROLLMENTS), taken.shape)[taken]
+    students = np.repeat(np.arange(size), counts)
+    courses = program_codes[students] * COURSES_PER_PROGRAM + (
+        first[students] + positions * stride[students]) % COURSES_PER_PROGRAM
+    grades = np.clip(np.asarray(gpas, dtype=np.float64)[:, None] + noise, 0.0, 5.0)[taken]
+    return {
+        'enrollment_id': np.asarray(student_numbers, dtype=np.int64)[students] * MAX_ENROLLMENTS + positions,
+        'student_id': student_ids[students],
+        'course_id': course_ids(np.arange(program_count * COURSES_PER_PROGRAM))[courses],
+        'semester': semesters[students],
+        'grade': np.round(grades, 1),
+    }
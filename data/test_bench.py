@@ -0,0 +1,42 @@
+import os
+from data.bench import DEFAULT_HISTORY_PATH, find_regressions, load_history, save_history
+from data.data import generate_university_students_data
+from data.profiling import record_stages
+
+
+class TestBench:
+    def test_generator_stages_are_recorded(self):
+        with record_stages() as stages:
+            generate_university_students_data(50)
+        assert {'email', 'phone_number', 'Number_of_credits_approved', 'GPA', 'dataframe'} <= set(stages), \
+            "Each column should be a stage"
+        assert all(seconds >= 0 for seconds in stages.values()), "Stage times should not be negative"
+
+    def test_stages_are_not_recorded_outside_record_stages(self):
+        with record_stages() as stages:
+            pass
+        generate_university_students_data(10)
+        assert stages == {}, "Stages should only be recorded inside record_stages"
+
+    def test_find_regressions(self):
+        history = [{'results': [{'row_count': 100, 'generation_seconds': 1.0, 'csv_write_seconds': 1.0}]}]
+        results = [
+            {'row_count': 100, 'generation_seconds': 1.5, 'csv_write_seconds': 1.1},
+            {'row_count': 200, 'generation_seconds': 9.0, 'csv_write_seconds': 9.0},
+        ]
+        regressions = find_regressions(history, results, threshold=0.2)
+        assert regressions == [(100, 'generation_seconds', 1.0, 1.5)], "Only timings over the threshold should be flagged"
+
+    def test_history_round_trip(self, tmp_path):
+        history_path = str(tmp_path / 'history.json')
+        assert load_history(history_path) == [], "A missing history should be empty"
+        save_history(history_path, [], [{'row_count': 10, 'generation_seconds': 0.1}])
+        history = load_history(history_path)
+        assert len(history) == 1 and history[0]['results'][0]['row_count'] == 10, "Runs should be appended"
+
+    def test_default_history_is_kept_out_of_the_working_directory(self, tmp_path):
+        assert DEFAULT_HISTORY_PATH.startswith(os.environ['XDG_CACHE_HOME']), \
+            "The history should default to the cache directory, not the directory the benchmark runs from"
+        history_path = str(tmp_path / 'bench' / 'history.json')
+        save_history(history_path, [], [{'row_count': 10, 'generation_seconds': 0.1}])
+        assert len(load_history(history_path)) == 1, "The directory of the history should be created"
@@ -0,0 +1,118 @@
+import os
+import time
+import pytest
+from data.cache import GenerationCache, cache_key, remove_output
+from data.data import main
+from unittest.mock import patch
+
+
+def _write(path, content):
+    with open(path, 'wb') as f:
+        f.write(content)
+
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+class TestCache:
+    def test_store_and_restore_copy_the_files(self, tmp_path):
+        cache = GenerationCache(tmp_path / 'cache')
+        _write(tmp_path / 'data.csv', b'rows')
+        key = cache_key({'seed': 1})
+
+        assert not cache.restore(key, {'students': tmp_path / 'out.csv'}), "An empty cache should miss"
+        cache.store(key, {'students': tmp_path / 'data.csv'})
+        assert cache.restore(key, {'students': tmp_path / 'out.csv'}), "A stored key should hit"
+        assert _read(tmp_path / 'out.csv') == b'rows', "The cached file should be restored"
+        assert not os.path.samefile(tmp_path / 'out.csv', tmp_path / 'data.csv'), "Files should not share an inode"
+        assert cache.stats_counters() == {'hits': 1, 'misses': 1, 'evictions': 0}, "Hits and misses are counted"
+
+    def test_modified_entry_is_a_miss(self, tmp_path):
+        cache = GenerationCache(tmp_path / 'cache')
+        _write(tmp_path / 'data.csv', b'rows')
+        cache.store('key', {'students': tmp_path / 'data.csv'})
+        _write(tmp_path / 'cache' / 'key' / 'students', b'changed in the cache')
+
+        assert not cache.restore('key', {'students': tmp_path / 'out.csv'}), "A modified entry should miss"
+        assert cache.entries() == [], "The modified entry should be evicted"
+
+    def test_directory_outputs(self, tmp_path):
+        cache = GenerationCache(tmp_path / 'cache')
+        store = tmp_path / 'data.store'
+        os.makedirs(store)
+        _write(store / 'meta.json', b'{}')
+        _write(store / 'GPA.npy', b'numbers')
+        cache.store('key', {'students': store})
+
+        assert cache.restore('key', {'students': tmp_path / 'copy.store'}), "A directory output should hit"
+        assert sorted(os.listdir(tmp_path / 'copy.store')) == ['GPA.npy', 'meta.json'], "Every file is restored"
+
+    def test_least_recently_used_entries_are_evicted(self, tmp_path):
+        cache = GenerationCache(tmp_path / 'cache', max_bytes=250)
+        for key in ['a', 'b']:
+            _write(tmp_path / key, b'x' * 100)
+            cache.store(key, {'students': tmp_path / key})
+        past = time.time() - 60
+        os.utime(tmp_path / 'cache' / 'b' / 'entry.json', (past, past))
+        assert cache.restore('a', {'students': tmp_path / 'out'}), "Restoring marks the entry as used"
+
+        _write(tmp_path / 'c', b'x' * 100)
+        cache.store('c', {'students': tmp_path / 'c'})
+        assert sorted(key for _, _, key in cache.entries()) == ['a', 'c'], "The least recently used entry should go"
+        assert cache.stats_counters()['evictions'] == 1, "Evictions should be counted"
+
+    def test_remove_output_refuses_other_directories(self, tmp_path):
+        os.makedirs(tmp_path / 'documents')
+        with pytest.raises(ValueError, match='not a column store'):
+            remove_output(tmp_path / 'documents')
+
+    def test_main_hits_on_the_second_run(self, tmp_path):
+        def run(seed, output):
+            argv = ['data.py', '40', str(tmp_path / output), '--seed', str(seed), '--cache',
+                    '--cache-dir', str(tmp_path / 'cache'), '--tables', 'advisors']
+            with patch('sys.argv', argv):
+                with patch('builtins.print') as mocked_print:
+                    main()
+            return [call.args[0] for call in mocked_print.call_args_list]
+
+        run(1, 'first.csv')
+        with patch('data.data.iter_university_students_data', side_effect=AssertionError('regenerated')):
+            printed = run(1, 'second.csv')
+        assert printed[0].startswith('Restored 40 rows'), "An identical run should be restored from the cache"
+        assert _read(tmp_path / 'first.csv') == _read(tmp_path / 'second.csv'), "The restored file should match"
+        assert _read(tmp_path / 'first_advisors.csv') == _read(tmp_path / 'second_advisors.csv'), \
+            "Every table should be restored"
+
+        printed = run(2, 'second.csv')
+        assert printed[0].startswith('Generated 40 rows'), "Another seed should miss"
+        assert _read(tmp_path / 'first.csv') != _read(tmp_path / 'second.csv'), \
+            "Regenerating should not write into the cache"
+        assert any('1 hits, 2 misses' in line for line in printed), "The run should report the cache stats"
+
+    def test_rewriting_a_restored_copy_leaves_the_others(self, tmp_path):
+        def run(*argv):
+            with patch('sys.argv', ['data.py', *argv]):
+                with patch('builtins.print'):
+                    main()
+
+        cached = ['--seed', '1', '--cache', '--cache-dir', str(tmp_path / 'cache')]
+        run('40', str(tmp_path / 'c1.csv'), *cached)
+        run('40', str(tmp_path / 'c2.csv'), *cached)
+        original = _read(tmp_path / 'c2.csv')
+
+        run('10', str(tmp_path / 'c1.csv'))
+        run('5', str(tmp_path / 'c1.csv'), '--append')
+        assert _read(tmp_path / 'c2.csv') == original, "Another restored copy should not change"
+        [entry] = GenerationCache(tmp_path / 'cache').entries()
+        assert _read(tmp_path / 'cache' / entry[2] / 'students') == original, "The cache entry should not change"
+        run('40', str(tmp_path / 'c3.csv'), *cached)
+        assert _read(tmp_path / 'c3.csv') == original, "The entry should still be restored intact"
+
+    def test_main_cache_needs_seed(self, tmp_path):
+        with patch('sys.argv', ['data.py', '10', str(tmp_path / 'data.csv'), '--cache']):
+            with patch('builtins.print') as mocked_print:
+                with pytest.raises(SystemExit):
+                    main()
+                mocked_print.assert_called_with("Error: --cache needs --seed, an unseeded run never repeats")
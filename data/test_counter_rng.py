@@ -0,0 +1,31 @@
+import numpy as np
+from data.counter_rng import CounterRandom
+
+
+def _draw(start, size, method, *args, **kwargs):
+    return getattr(CounterRandom(7, (3,), start), method)(*args, size=size, **kwargs)
+
+
+class TestCounterRandom:
+    def test_rows_do_not_depend_on_the_range(self):
+        for method, args in [('random', ()), ('integers', (5, 50)), ('normal', (3.5, 0.5)), ('poisson', (3,)),
+                             ('standard_cauchy', ()), ('choice', (3,))]:
+            full = _draw(0, 100, method, *args)
+            assert (_draw(37, 20, method, *args) == full[37:57]).all(), f"{method} should be indexed by row"
+
+    def test_calls_and_streams_are_independent(self):
+        rng = CounterRandom(7, (3,), 0)
+        first, second = rng.random(50), rng.random(50)
+        assert not np.array_equal(first, second), "Every call should draw new values"
+        assert not np.array_equal(first, CounterRandom(7, (4,), 0).random(50)), "Streams should differ"
+
+    def test_distributions(self):
+        rng = CounterRandom(1, (0,), 0)
+        integers = rng.integers(15, 21, 100000)
+        assert integers.min() == 15 and integers.max() == 20, "integers should cover [low, high)"
+        choices = rng.choice(3, 100000, p=[0.9, 0.08, 0.02])
+        assert abs((choices == 0).mean() - 0.9) < 0.01, "choice should follow p"
+        normal = rng.normal(3.5, 0.5, 100000)
+        assert abs(normal.mean() - 3.5) < 0.01 and abs(normal.std() - 0.5) < 0.01, "normal should have loc and scale"
+        poisson = rng.poisson(3, 100000)
+        assert abs(poisson.mean() - 3) < 0.03 and abs(poisson.var() - 3) < 0.1, "poisson should have mean lam"
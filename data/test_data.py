@@ -1,7 +1,13 @@
-import csv
 from datetime import datetime
-from data.data import generate_university_students_data, main
-from unittest.mock import patch
+from data.data import (CATEGORIES, _months_between, generate_university_students_data, iter_university_students_data,
+                       main, write_parallel)
+from data.writers import write_csv
+import numpy as np
+import pandas as pd
+import pytest
+from data.pools import load_pools
+from dateutil.relativedelta import relativedelta
+from unittest.mock import ANY, Mock, patch
 import os
 
 current_year = datetime.now().year
@@ -102,6 +108,17 @@ class TestUniversityStudentsData:
         assert 0 < female_count < 100, "There should be some female students"
         assert 0 <= other_count <= 20, "There should be a small number of 'Other' gender students"
 
+    def test_first_name_matches_gender(self):
+        df = generate_university_students_data(100, pool_size=50)
+        pools = load_pools(pool_size=50)
+        gender_pools = {
+            'Male': set(pools['first_name_male']),
+            'Female': set(pools['first_name_female']),
+            'Other': set(pools['first_name_nonbinary']),
+        }
+        for i in range(len(df)):
+            assert df['first_name'][i] in gender_pools[df['gender'][i]], "First name should come from the gender's pool"
+
     def test_type_id_number_and_age(self):
         df = generate_university_students_data(100)
         for i in range(len(df)):
@@ -160,6 +177,95 @@ class TestUniversityStudentsData:
             assert start_date <= date.year <= end_date, "Enrollment date should be within the last 4 years"
 
 
+    def test_current_semester_matches_enrollment_date(self):
+        df = generate_university_students_data(100)
+        now = datetime.now()
+        for i in range(len(df)):
+            enrollment_date = datetime.combine(df['enrollment_date'][i], datetime.min.time())
+            delta = relativedelta(now, enrollment_date)
+            expected = min(10, max(1, (delta.years * 12 + delta.months) // 6 + 1))
+            assert df['current_semester'][i] == expected, "Current semester should follow the months since enrollment"
+
+    @pytest.mark.parametrize('now', [datetime(2026, 2, 28, 15), datetime(2024, 2, 29, 9), datetime(2026, 4, 30, 12),
+                                     datetime(2026, 1, 31, 8), datetime(2026, 3, 1, 0)])
+    def test_months_between_matches_relativedelta_at_month_end(self, now):
+        starts = np.arange(np.datetime64('2020-12-25'), np.datetime64(now.date()) + 1)
+        expected = [relativedelta(now, datetime.combine(start.item(), datetime.min.time())) for start in starts]
+        expected = np.array([delta.years * 12 + delta.months for delta in expected])
+        assert (_months_between(starts, now) == expected).all(), "Months should match relativedelta"
+
+    def test_credits_approved_and_remaining(self):
+        df = generate_university_students_data(100)
+        for i in range(len(df)):
+            approved = int(df['Number_of_credits_approved'][i])
+            semester = int(df['current_semester'][i])
+            assert 0 <= approved <= min(semester * 18 + 18, 180), "Approved credits should be bounded by the semester"
+            assert 0 <= df['credits_remaining'][i] <= 180 - approved, "Remaining credits should not exceed the total"
+
+
+    def test_student_id_offset(self):
+        df = generate_university_students_data(5, offset=1000)
+        assert list(df['student_id']) == [f'STU00{i}' for i in range(1000, 1005)], "Student ids should start at the offset"
+
+    def test_iter_chunks_sizes_and_ids(self):
+        chunks = list(iter_university_students_data(25, 10))
+        assert [len(chunk) for chunk in chunks] == [10, 10, 5], "Chunks should have at most chunk_size rows"
+        student_ids = [student_id for chunk in chunks for student_id in chunk['student_id']]
+        assert student_ids == [f'STU{str(i).zfill(6)}' for i in range(25)], "Student ids should continue across chunks"
+
+    def test_seed_is_reproducible(self):
+        first = pd.concat(iter_university_students_data(30, 10, seed=7))
+        second = pd.concat(iter_university_students_data(30, 10, seed=7))
+        other = pd.concat(iter_university_students_data(30, 10, seed=8))
+        assert first.equals(second), "The same seed should generate the same rows"
+        assert not first.equals(other), "Different seeds should generate different rows"
+
+    def test_generator_does_not_use_global_random_state(self):
+        np.random.seed(0)
+        first = generate_university_students_data(10, rng=np.random.default_rng(3))
+        second = generate_university_students_data(10, rng=np.random.default_rng(3))
+        assert first.equals(second), "Rows should only depend on the rng passed in"
+
+    def test_parallel_output_matches_sequential(self, tmp_path):
+        sequential_path = tmp_path / 'sequential.csv'
+        parallel_path = tmp_path / 'parallel.csv'
+        write_csv(iter_university_students_data(25, 10, seed=11), sequential_path)
+        written = write_parallel(25, str(parallel_path), 2, chunk_size=10, seed=11)
+        assert written == [str(parallel_path)], "Merged output should be a single file"
+        assert parallel_path.read_bytes() == sequential_path.read_bytes(), "Output should not depend on the workers"
+        assert sorted(p.name for p in tmp_path.iterdir()) == ['parallel.csv', 'sequential.csv'], "Part files should be removed"
+
+    def test_parallel_keep_parts(self, tmp_path):
+        written = write_parallel(25, str(tmp_path / 'data.csv'), 2, chunk_size=10, seed=11, keep_parts=True)
+        assert [os.path.basename(p) for p in written] == [
+            'data.part00000.csv', 'data.part00001.csv', 'data.part00002.csv'
+        ], "There should be one part file per chunk"
+        parts = [pd.read_csv(p) for p in written]
+        assert [len(part) for part in parts] == [10, 10, 5], "Each part should be a standalone CSV of its chunk"
+        assert parts[2]['student_id'][0] == 'STU000020', "Part files should keep the global student ids"
+
+    def test_compact_dtypes(self):
+        df = generate_university_students_data(100)
+        for column, values in CATEGORIES.items():
+            assert isinstance(df[column].dtype, pd.CategoricalDtype), f"'{column}' should be categorical"
+            assert list(df[column].cat.categories) == values, f"'{column}' should have every possible category"
+        assert df['current_semester'].dtype == np.int8, "Current semester should be int8"
+        assert df['course_load'].dtype == np.int8, "Course load should be int8"
+        assert df['Number_of_credits_approved'].dtype == np.int16, "Credits approved should be int16"
+        assert df['credits_remaining'].dtype == np.int16, "Credits remaining should be int16"
+        assert df['library_books_borrowed'].dtype == np.int16, "Library books borrowed should be int16"
+        assert df['GPA'].dtype == np.float32, "GPA should be float32"
+
+    def test_compact_opt_out_matches_compact_values(self):
+        compact = generate_university_students_data(100, rng=np.random.default_rng(5))
+        plain = generate_university_students_data(100, rng=np.random.default_rng(5), compact=False)
+        assert plain['GPA'].dtype == np.float64, "GPA should stay float64 without compact"
+        assert plain['current_semester'].dtype == np.int64, "Integers should stay int64 without compact"
+        assert not isinstance(plain['program'].dtype, pd.CategoricalDtype), "Enumerations should be strings without compact"
+        for column in compact.columns.drop('GPA'):
+            assert list(compact[column].astype(str)) == list(plain[column].astype(str)), f"'{column}' should not depend on compact"
+        assert np.allclose(compact['GPA'], plain['GPA'], atol=1e-6), "GPA should only lose float32 precision"
+
     def test_main_with_invalid_row_count(self):
         with patch('sys.argv', ['data.py', '0']):
             with patch('sys.exit') as mock_exit:
@@ -171,13 +277,95 @@ class TestUniversityStudentsData:
 
     def test_main_with_custom_output_path(self):
         with patch('sys.argv', ['data.py', '10', 'custom/path/data.csv']):
-            with patch('pandas.DataFrame.to_csv') as mock_to_csv:
+            with patch.dict('data.data.WRITERS', {'csv': Mock()}) as writers:
                 with patch('os.makedirs') as mock_makedirs:
                     with patch('os.path.exists', return_value=False) as mock_exists:
                         with patch('builtins.print') as mock_print:
                             main()
-                            mock_to_csv.assert_called_once_with('custom/path/data.csv', index=False, quoting=csv.QUOTE_ALL)
+                            writers['csv'].assert_called_once_with(ANY, 'custom/path/data.csv', float_precision=None)
                             mock_makedirs.assert_called_once()
                             mock_print.assert_any_call("Generated 10 rows of university data and saved to 'custom/path/data.csv'")
                             mock_print.assert_any_call(f"Current working directory: {os.getcwd()}")
 
+    def test_main_with_chunk_size(self, tmp_path):
+        output_path = tmp_path / 'chunked.csv'
+        with patch('sys.argv', ['data.py', '25', str(output_path), '--chunk-size', '10']):
+            with patch('builtins.print'):
+                main()
+        lines = output_path.read_text().splitlines()
+        assert len(lines) == 26, "Chunked output should have a header plus one line per row"
+        assert lines[-1].startswith('"STU000024"'), "The last row should have the last student id"
+
+    def test_column_selection_matches_full_dataset(self):
+        full = generate_university_students_data(50, rng=np.random.default_rng(7))
+        narrow = generate_university_students_data(50, rng=np.random.default_rng(7),
+                                                   columns=['GPA', 'student_id', 'credits_remaining'])
+        assert list(narrow.columns) == ['GPA', 'student_id', 'credits_remaining'], "Columns should keep the given order"
+        pd.testing.assert_frame_equal(narrow, full[list(narrow.columns)])
+
+    def test_row_range_matches_larger_range(self):
+        full = generate_university_students_data(0, 60, seed=11)
+        part = generate_university_students_data(45, 52, seed=11)
+        pd.testing.assert_frame_equal(part, full.iloc[45:52].reset_index(drop=True))
+        assert list(part['student_id']) == [f'STU0000{i}' for i in range(45, 52)], "Ids should start at start"
+
+    def test_counter_chunks_do_not_depend_on_chunk_size(self):
+        small = pd.concat(iter_university_students_data(25, 4, seed=6, counter=True), ignore_index=True)
+        large = pd.concat(iter_university_students_data(25, 10, seed=6, counter=True), ignore_index=True)
+        pd.testing.assert_frame_equal(small, large)
+        pd.testing.assert_frame_equal(small, generate_university_students_data(0, 25, seed=6))
+
+    def test_main_start_needs_counter(self):
+        with patch('sys.argv', ['data.py', '10', '--start', '5']):
+            with patch('sys.exit') as mock_exit:
+                with patch('builtins.print') as mock_print:
+                    main()
+                    mock_print.assert_called_with("Error: --start needs --rng counter, otherwise the rows would not match the full run")
+                    mock_exit.assert_called_with(1)
+
+    def test_unknown_column_is_rejected(self):
+        with pytest.raises(ValueError, match='Unknown column'):
+            generate_university_students_data(10, columns=['student_id', 'height'])
+
+    def test_main_with_columns(self, tmp_path):
+        output_path = tmp_path / 'narrow.csv'
+        with patch('sys.argv', ['data.py', '20', str(output_path), '--columns', 'student_id,program,GPA',
+                                '--chunk-size', '8']):
+            with patch('builtins.print'):
+                main()
+        df = pd.read_csv(output_path)
+        assert list(df.columns) == ['student_id', 'program', 'GPA'], "Only the selected columns should be written"
+        assert len(df) == 20, "Every row should be written"
+
+    @pytest.mark.parametrize('precision', [0, 1, 2])
+    def test_gpa_precision_keeps_the_classification_of_the_written_gpa(self, tmp_path, precision):
+        output_path = tmp_path / 'gpa.csv'
+        with patch('sys.argv', ['data.py', '20000', str(output_path), '--seed', '1', '--gpa-precision', str(precision),
+                                '--columns', 'GPA,academic_standing,scholarship']):
+            with patch('builtins.print'):
+                main()
+        df = pd.read_csv(output_path, dtype={'GPA': str})
+        gpa = df['GPA'].astype(float)
+        decimals = rf'\.\d{{{precision}}}' if precision else ''
+        assert df['GPA'].str.fullmatch(rf'\d{decimals}').all(), "The GPA should be written with the given decimals"
+        expected = np.select([gpa >= 4.5, gpa >= 4.0, gpa >= 3.0], ['Excellent', 'Good', 'Average'], 'Poor')
+        assert (df['academic_standing'] == expected).all(), "The standing should match the written GPA"
+        assert (df['scholarship'] == (gpa >= 4.5)).all(), "The scholarship should match the written GPA"
+
+    def test_main_with_invalid_chunk_size(self):
+        with patch('sys.argv', ['data.py', '10', '--chunk-size', '0']):
+            with patch('sys.exit') as mock_exit:
+                with patch('builtins.print') as mock_print:
+                    main()
+                    mock_print.assert_called_with("Error: Chunk size must be positive")
+                    mock_exit.assert_called_with(1)
+
+    def test_main_with_parquet_format(self, tmp_path):
+        pytest.importorskip('pyarrow')
+        output_path = tmp_path / 'data.parquet'
+        with patch('sys.argv', ['data.py', '25', str(output_path), '--chunk-size', '10', '--workers', '2']):
+            with patch('builtins.print'):
+                main()
+        df = pd.read_parquet(output_path)
+        assert len(df) == 25, "Parquet output should have one row per student"
+        assert df['student_id'].iloc[-1] == 'STU000024', "Parallel Parquet output should keep the chunk order"
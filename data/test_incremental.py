@@ -0,0 +1,153 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from data import data, incremental
+from data.data import STATE_PROGRAMS, STUDENT_STATUSES, main
+from data.incremental import EVOLVED_COLUMNS, advance_semester, append_point, evolve_output
+from data.store import open_store
+from unittest.mock import patch
+
+
+def _run(*argv):
+    with patch('sys.argv', ['data.py', *argv]):
+        with patch('builtins.print') as mocked_print:
+            main()
+    return [call.args[0] for call in mocked_print.call_args_list]
+
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+class TestAppend:
+    @pytest.mark.parametrize('extension', ['.csv', '.store'])
+    def test_append_matches_the_full_run(self, tmp_path, extension):
+        first, full = str(tmp_path / f'first{extension}'), str(tmp_path / f'full{extension}')
+        _run('120', first, '--seed', '3', '--rng', 'counter', '--chunk-size', '50')
+        printed = _run('80', first, '--seed', '3', '--rng', 'counter', '--append')
+        _run('200', full, '--seed', '3', '--rng', 'counter')
+
+        assert printed[0] == f"Appended 80 rows of university data (STU000120 to STU000199) to '{first}'", \
+            "The run should continue after the last student"
+        if extension == '.csv':
+            assert _read(first) == _read(full), "Appending should write the rows of the full run"
+        else:
+            pd.testing.assert_frame_equal(open_store(first).to_frame(), open_store(full).to_frame())
+
+    def test_append_point_reads_the_last_id(self, tmp_path):
+        path = str(tmp_path / 'data.csv')
+        _run('30', path, '--columns', 'student_id,GPA', '--rng', 'counter', '--start', '70', '--seed', '1')
+        assert append_point(path, 'csv') == (['student_id', 'GPA'], 100), "The next id should follow the last one"
+
+    def test_append_keeps_the_columns_of_the_file(self, tmp_path):
+        path = str(tmp_path / 'data.csv')
+        _run('10', path, '--columns', 'student_id,program')
+        _run('5', path, '--append')
+        df = pd.read_csv(path)
+        assert list(df.columns) == ['student_id', 'program'], "Appended rows should have the columns of the file"
+        assert df['student_id'].is_unique and len(df) == 15, "Student ids should keep increasing"
+
+    def test_append_with_seed_needs_counter(self, tmp_path):
+        path = str(tmp_path / 'data.csv')
+        _run('10', path, '--seed', '1')
+        with pytest.raises(SystemExit):
+            _run('10', path, '--seed', '1', '--append')
+
+    def test_parquet_cannot_be_appended(self, tmp_path):
+        pytest.importorskip('pyarrow')
+        path = str(tmp_path / 'data.parquet')
+        _run('10', path)
+        with patch('sys.argv', ['data.py', '10', path, '--append']):
+            with patch('builtins.print') as mocked_print:
+                with pytest.raises(SystemExit):
+                    main()
+                mocked_print.assert_called_with("Error: Only csv and store outputs can be appended to, not parquet")
+
+
+class TestEvolve:
+    def test_evolve_draws_chunks_like_the_generator(self):
+        assert incremental.chunk_rng is data.chunk_rng, "Evolving should derive the chunk generators like a full run"
+
+    def test_advance_semester(self):
+        rng = np.random.default_rng(0)
+        states = STATE_PROGRAMS
+        codes = np.repeat([0, 1, 2], 1000)
+        semester, approved, remaining, new_codes = advance_semester(
+            np.full(3000, 10), np.full(3000, 100), np.full(3000, 10), np.full(3000, 15), codes, states, rng)
+
+        enrolled = codes == 0
+        assert (semester[enrolled] == 10).all() and (semester[~enrolled] == 10).all(), "Semesters stop at 10"
+        assert (approved[enrolled] <= 110).all() and (approved[enrolled] > 100).mean() > 0.99, \
+            "Enrolled students earn credits up to the total"
+        assert (approved[~enrolled] == 100).all(), "Only enrolled students earn credits"
+        assert (approved + remaining == 110).all(), "The total of credits should not change"
+        assert (new_codes[codes == 2] == 2).all(), "Withdrawn students should stay withdrawn"
+        assert 0.9 < (new_codes[enrolled] == 0).mean() < 1.0, "Most enrolled students should stay enrolled"
+
+    def test_approved_credits_stay_within_the_generator_bound(self):
+        rng = np.random.default_rng(1)
+        semester, approved, remaining = np.full(1000, 1), np.full(1000, 36), np.full(1000, 144)
+        for _ in range(12):
+            semester, approved, remaining, _ = advance_semester(
+                semester, approved, remaining, np.full(1000, 30), np.zeros(1000, dtype=np.int64), STATE_PROGRAMS, rng)
+            assert (approved <= semester * 18 + 18).all(), "Approved credits should stay within semester * 18 + 18"
+            assert (approved + remaining == 180).all(), "The total of credits should not change"
+        assert (approved == 180).all(), "Students should still reach their total"
+
+    @pytest.mark.parametrize('extension', ['.parquet', '.feather'])
+    def test_evolve_streams_arrow_files_like_csv(self, tmp_path, extension):
+        pytest.importorskip('pyarrow')
+        for name in ['data.csv', f'data{extension}']:
+            _run('200', str(tmp_path / name), '--seed', '5', '--row-group-size', '30')
+            evolve_output(str(tmp_path / name), os.path.splitext(name)[1][1:], STATE_PROGRAMS, STUDENT_STATUSES,
+                          chunk_size=64, seed=9)
+        csv = pd.read_csv(tmp_path / 'data.csv')
+        arrow = (pd.read_parquet if extension == '.parquet' else pd.read_feather)(tmp_path / f'data{extension}')
+        assert len(arrow) == 200, "Every row should be written back"
+        for column in EVOLVED_COLUMNS:
+            assert (csv[column].astype(str) == arrow[column].astype(str)).all(), \
+                f"{column} should evolve the same way when the file is streamed in record batches"
+
+    @pytest.mark.parametrize('extension', ['.csv', '.store'])
+    def test_evolve_changes_only_the_evolved_columns(self, tmp_path, extension):
+        path = str(tmp_path / f'data{extension}')
+        _run('300', path, '--seed', '5')
+        read = pd.read_csv if extension == '.csv' else (lambda p: open_store(p).to_frame())
+        before = read(path)
+        printed = _run('--evolve', path, '--seed', '6', '--chunk-size', '100')
+        after = read(path)
+
+        assert printed[0] == f"Advanced 300 students of '{path}' by one semester", "The run should report the rows"
+        kept = [column for column in before.columns if column not in EVOLVED_COLUMNS]
+        pd.testing.assert_frame_equal(before[kept], after[kept])
+        enrolled = before['state_program'] == 'Enrolled'
+        assert (after['current_semester'][enrolled] >= before['current_semester'][enrolled]).all(), \
+            "Enrolled students should move up a semester"
+        assert (after['current_semester'][~enrolled] == before['current_semester'][~enrolled]).all(), \
+            "Other students should stay in their semester"
+        assert ((after['student_status'] == 'Active') == (after['state_program'] == 'Enrolled')).all(), \
+            "Only enrolled students should be active"
+
+    def test_evolve_is_the_same_for_csv_and_store(self, tmp_path):
+        for extension in ['.csv', '.store']:
+            _run('200', str(tmp_path / f'data{extension}'), '--seed', '5')
+            evolve_output(str(tmp_path / f'data{extension}'), extension[1:], STATE_PROGRAMS, STUDENT_STATUSES,
+                          chunk_size=64, seed=9)
+        csv = pd.read_csv(tmp_path / 'data.csv')
+        store = open_store(str(tmp_path / 'data.store')).to_frame().reset_index(drop=True)
+        for column in EVOLVED_COLUMNS:
+            assert (csv[column].astype(str) == store[column].astype(str)).all(), \
+                f"{column} should evolve the same way in every format"
+
+    def test_evolve_reads_csv_from_other_writers(self, tmp_path):
+        path = tmp_path / 'data.csv'
+        _run('50', str(path), '--seed', '5')
+        df = pd.read_csv(path)
+        df['address'] = df['address'].str.replace(', ', '\n', n=1)
+        df.to_csv(path, index=False)
+        evolve_output(str(path), 'csv', STATE_PROGRAMS, STUDENT_STATUSES, chunk_size=20, seed=1)
+        after = pd.read_csv(path)
+        assert after['address'].equals(df['address']), "Quoted newlines should survive the rewrite"
+        assert (after['current_semester'] >= df['current_semester']).all(), "The students should be advanced"
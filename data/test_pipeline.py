@@ -0,0 +1,77 @@
+import time
+import pandas as pd
+import pytest
+from data.data import main
+from data.pipeline import write_pipelined
+from unittest.mock import patch
+
+
+def _frames(count, delay=0.0):
+    for i in range(count):
+        time.sleep(delay)
+        yield pd.DataFrame({'chunk': [i] * 3})
+
+
+def _collect(written):
+    def write(chunks, output_path):
+        for df in chunks:
+            written.append(df['chunk'].iloc[0])
+    return write
+
+
+class TestPipeline:
+    def test_chunks_are_written_in_order(self):
+        written = []
+        stats = write_pipelined(_frames(10), _collect(written), 'unused', queue_depth=3)
+        assert written == list(range(10)), "The writer should receive every chunk in order"
+        assert (stats.chunks, stats.rows) == (10, 30), "Chunks and rows should be counted"
+        assert stats.max_depth <= 3, "The queue should never hold more than queue_depth chunks"
+
+    def test_slow_writer_blocks_the_generator(self):
+        def slow_write(chunks, output_path):
+            for _ in chunks:
+                time.sleep(0.02)
+
+        stats = write_pipelined(_frames(8), slow_write, 'unused', queue_depth=1)
+        assert stats.bound == 'io', "A slow writer should make the run I/O-bound"
+        assert stats.put_wait_seconds > 0.05, "The generator should wait for room in the queue"
+
+    def test_slow_generator_starves_the_writer(self):
+        stats = write_pipelined(_frames(5, delay=0.02), _collect([]), 'unused')
+        assert stats.bound == 'cpu', "A slow generator should make the run CPU-bound"
+
+    def test_writer_error_is_raised(self):
+        def failing_write(chunks, output_path):
+            next(iter(chunks))
+            raise OSError('disk full')
+
+        with pytest.raises(OSError, match='disk full'):
+            write_pipelined(_frames(20), failing_write, 'unused', queue_depth=1)
+
+    def test_generator_error_stops_the_writer(self):
+        closed = []
+
+        def write(chunks, output_path):
+            try:
+                for _ in chunks:
+                    pass
+            finally:
+                closed.append(True)
+
+        def failing_frames():
+            yield from _frames(2)
+            raise RuntimeError('generation failed')
+
+        with pytest.raises(RuntimeError, match='generation failed'):
+            write_pipelined(failing_frames(), write, 'unused')
+        assert closed == [True], "The writer should get to close its file"
+
+    def test_main_pipeline_matches_sequential(self, tmp_path):
+        outputs = []
+        for extra in ([], ['--pipeline', '--queue-depth', '1']):
+            output_path = tmp_path / f'out{len(outputs)}.csv'
+            with patch('sys.argv', ['data.py', '30', str(output_path), '--chunk-size', '7', '--seed', '4'] + extra):
+                with patch('builtins.print'):
+                    main()
+            outputs.append(output_path.read_bytes())
+        assert outputs[0] == outputs[1], "Pipelined output should be identical to sequential output"
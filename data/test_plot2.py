@@ -0,0 +1,77 @@
+import numpy as np
+from data.data import CATEGORIES, iter_university_students_data
+from data.plot2 import (FigureManifest, aggregate_data, categorical_columns, figure_path, numerical_columns,
+                        read_data, render_figures)
+from data.writers import write_csv, write_store
+
+
+class TestPlot2:
+    def test_aggregate_data_matches_full_read(self, tmp_path):
+        path = tmp_path / 'data.csv'
+        write_csv(iter_university_students_data(120, 50, seed=2), path)
+        aggregates = aggregate_data(path, chunk_size=17, kde_sample=30, rng=np.random.default_rng(0))
+        df = read_data(path)
+
+        assert aggregates['rows'] == 120, "Every row should be aggregated"
+        for column in categorical_columns:
+            expected = df[column].value_counts()
+            assert aggregates['counts'][column].to_dict() == expected.to_dict(), f"Counts of '{column}' should match"
+        for column in numerical_columns:
+            counts, edges = aggregates['histograms'][column]
+            assert counts.sum() == 120, f"Every '{column}' value should fall in a histogram bin"
+            sample = aggregates['samples'][column]
+            assert len(sample) == 30, f"The '{column}' reservoir should hold kde_sample values"
+            assert np.isin(sample, df[column].to_numpy(dtype=np.float64)).all(), "The sample should come from the data"
+
+    def test_aggregate_store_matches_csv(self, tmp_path):
+        write_csv(iter_university_students_data(120, 50, seed=2), tmp_path / 'data.csv')
+        write_store(iter_university_students_data(120, 50, seed=2), tmp_path / 'data.store', categories=CATEGORIES)
+        from_csv = aggregate_data(tmp_path / 'data.csv', chunk_size=17, kde_sample=0)
+        from_store = aggregate_data(tmp_path / 'data.store', chunk_size=17, kde_sample=0)
+
+        assert from_store['rows'] == 120, "Every row of the store should be aggregated"
+        for column in categorical_columns:
+            expected = {key: value for key, value in from_csv['counts'][column].items()}
+            actual = {key: value for key, value in from_store['counts'][column].items() if value}
+            assert actual == expected, f"Counts of '{column}' should match the CSV"
+        for column in numerical_columns:
+            assert (from_store['histograms'][column][0] == from_csv['histograms'][column][0]).all(), \
+                f"The '{column}' histogram should match the CSV"
+
+    def test_facets_are_aggregated_in_the_same_pass(self, tmp_path):
+        path = tmp_path / 'data.store'
+        write_store(iter_university_students_data(200, 64, seed=3), path, categories=CATEGORIES)
+        aggregates = aggregate_data(path, chunk_size=64, kde_sample=10, facets=['program', 'student_status'])
+        df = read_data(path)
+
+        programs = aggregates['facets']['program']
+        assert set(programs) == set(df['program'].unique()), "Every program should have its aggregates"
+        assert sum(group['rows'] for group in programs.values()) == 200, "Every row should be in one group"
+        for value, group in aggregates['facets']['student_status'].items():
+            expected = df.loc[df['student_status'] == value, 'gender'].value_counts()
+            actual = group['counts']['gender']
+            assert actual[actual > 0].to_dict() == expected[expected > 0].to_dict(), \
+                f"The gender counts of the {value} students should match"
+            assert group['histograms']['GPA'][0].sum() == group['rows'], "Every GPA of the group should be binned"
+
+    def test_figure_path(self):
+        assert figure_path('output/charts.svg', 'program', 'Computer Science') == \
+            'output/charts_program_computer_science.svg', "Facet figures should be named after the output"
+
+    def test_unchanged_figures_are_skipped(self, tmp_path):
+        path = tmp_path / 'data.csv'
+        write_csv(iter_university_students_data(100, 50, seed=2), path)
+        output = str(tmp_path / 'charts' / 'all.svg')
+
+        def render(dpi):
+            aggregates = aggregate_data(path, chunk_size=40, kde_sample=20, rng=np.random.default_rng(0),
+                                        facets=['student_status'])
+            return render_figures(aggregates, output, dpi=dpi, manifest=FigureManifest(output))
+
+        drawn, skipped = render(20)
+        assert len(drawn) == 3 and not skipped, "The first run should draw every figure"
+        assert figure_path(output, 'student_status', 'Active') in drawn, "Each group should get its figure"
+        drawn, skipped = render(20)
+        assert not drawn and len(skipped) == 3, "Figures of unchanged aggregates should be skipped"
+        drawn, skipped = render(30)
+        assert len(drawn) == 3, "Changing an option should redraw the figures"
@@ -0,0 +1,59 @@
+import os
+import numpy as np
+import pytest
+from data import pools
+from data.cache import DEFAULT_CACHE_DIR
+from data.pools import POOL_PROVIDERS, build_pools, load_pools, user_cache_dir
+
+
+class TestPools:
+    def test_build_pools_sizes(self):
+        built = build_pools(pool_size=20)
+        assert set(built) == set(POOL_PROVIDERS), "Every provider should have a pool"
+        for name, values in built.items():
+            assert len(values) == 20, f"Pool '{name}' should have pool_size entries"
+            assert all(value != '' for value in values), f"Pool '{name}' should not contain empty values"
+
+    def test_build_pools_is_deterministic(self):
+        first = build_pools(pool_size=10)
+        second = build_pools(pool_size=10)
+        for name in POOL_PROVIDERS:
+            assert np.array_equal(first[name], second[name]), "Pools should not depend on the global Faker state"
+
+    def test_addresses_are_single_line(self):
+        built = build_pools(pool_size=20)
+        assert not any('\n' in address for address in built['address']), "Addresses should be on one line"
+
+    def test_load_pools_writes_and_reads_disk_cache(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(pools, '_loaded_pools', {})
+        built = load_pools(pool_size=5, cache_dir=str(tmp_path))
+        cached_files = os.listdir(tmp_path)
+        assert len(cached_files) == 1 and cached_files[0].startswith('en_US-5-'), "Pools should be cached per locale and size"
+
+        monkeypatch.setattr(pools, '_loaded_pools', {})
+        monkeypatch.setattr(pools, 'build_pools', lambda *args: pytest.fail("Cached pools should not be rebuilt"))
+        reloaded = load_pools(pool_size=5, cache_dir=str(tmp_path))
+        for name in POOL_PROVIDERS:
+            assert np.array_equal(built[name], reloaded[name]), "Cached pools should match the built ones"
+
+    def test_load_pools_caches_in_every_cache_dir(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(pools, '_loaded_pools', {})
+        load_pools(pool_size=5, cache_dir=str(tmp_path / 'first'))
+        load_pools(pool_size=5, cache_dir=str(tmp_path / 'second'))
+        assert len(os.listdir(tmp_path / 'second')) == 1, "A pool loaded for one cache dir should not skip another"
+
+    def test_tests_do_not_write_to_the_home_cache(self):
+        assert pools.POOL_CACHE_DIR.startswith(os.environ['XDG_CACHE_HOME']), \
+            "The default pool cache should be a temporary directory during the tests"
+        assert DEFAULT_CACHE_DIR.startswith(os.environ['XDG_CACHE_HOME']), \
+            "The default dataset cache should be a temporary directory during the tests"
+
+    def test_user_cache_dir_falls_back_to_the_home_cache(self, monkeypatch):
+        monkeypatch.setenv('XDG_CACHE_HOME', '')
+        monkeypatch.setenv('HOME', '/home/student')
+        assert user_cache_dir('pools') == os.path.join('/home/student', '.cache', 'data-generator', 'pools'), \
+            "Without XDG_CACHE_HOME the caches should live in ~/.cache"
+
+    def test_load_pools_rejects_non_positive_size(self):
+        with pytest.raises(ValueError, match="Pool size must be positive"):
+            load_pools(pool_size=0, cache_dir=None)
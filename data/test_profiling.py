@@ -0,0 +1,59 @@
+import json
+import os
+import subprocess
+import sys
+from data.data import iter_university_students_data, main
+from data.profiling import profiling, stage
+from data.writers import write_csv
+from unittest.mock import patch
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestProfiling:
+    def test_stage_is_noop_when_not_profiling(self):
+        with stage('nothing'):
+            value = 1
+        assert value == 1, "stage() should run its block when nothing is recording"
+
+    def test_stages_and_chunks_are_recorded(self, tmp_path):
+        with profiling() as profile:
+            write_csv(iter_university_students_data(30, chunk_size=10, seed=1), tmp_path / 'out.csv')
+        assert [c['chunk'] for c in profile.chunks] == [0, 1, 2], "Every chunk should be recorded in order"
+        assert all(c['rows'] == 10 for c in profile.chunks), "Chunks should record their row counts"
+        assert profile.stages['phone_number']['calls'] == 3, "Each chunk should run the phone_number stage once"
+        assert profile.stages['phone_number']['rows'] == 30, "Stages should be credited with the chunk rows"
+        assert 'write_csv' in profile.stages, "Writing should be recorded as a stage"
+        assert profile.stages['dataframe']['peak_allocated'] > 0, "Allocations should be traced"
+
+    def test_report_is_sorted_by_time(self):
+        with profiling(trace_memory=False) as profile:
+            list(iter_university_students_data(20, chunk_size=10, seed=1))
+        lines = profile.report().splitlines()
+        assert lines[0].startswith('stage'), "The report should start with the stage table header"
+        seconds = [float(line.split()[2]) for line in lines[1:len(profile.stages) + 1]]
+        assert seconds == sorted(seconds, reverse=True), "Stages should be sorted by descending time"
+
+    def test_main_writes_json_and_chrome_trace(self, tmp_path):
+        json_path = tmp_path / 'profile.json'
+        trace_path = tmp_path / 'trace.json'
+        argv = ['data.py', '20', str(tmp_path / 'out.csv'), '--chunk-size', '10', '--workers', '2',
+                '--profile-json', str(json_path), '--profile-trace', str(trace_path)]
+        with patch('sys.argv', argv):
+            with patch('builtins.print'):
+                main()
+        profile = json.loads(json_path.read_text())
+        assert len(profile['chunks']) == 2, "Chunks profiled in worker processes should be merged"
+        assert 'GPA' in profile['stages'], "Stages profiled in worker processes should be merged"
+        events = json.loads(trace_path.read_text())['traceEvents']
+        assert {e['ph'] for e in events} == {'X'}, "Trace events should be complete events"
+        assert any(e['name'] == 'chunk 1' for e in events), "The trace should contain one event per chunk"
+
+    def test_pandas_import_is_its_own_stage(self, tmp_path):
+        json_path = tmp_path / 'profile.json'
+        subprocess.run([sys.executable, os.path.join('data', 'data.py'), '200', str(tmp_path / 'out.csv'),
+                        '--profile-json', str(json_path)], cwd=ROOT, capture_output=True, check=True)
+        stages = json.loads(json_path.read_text())['stages']
+        assert stages['import pandas']['calls'] == 1, "The pandas import should be reported as a stage"
+        assert stages['dataframe']['seconds'] < stages['import pandas']['seconds'], \
+            "Building the first DataFrame should not be charged with the pandas import"
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+from data.data import SCHEMA
+from data.schema import Schema
+
+
+def _schema():
+    schema = Schema()
+    schema.column('a')(lambda batch: batch.rng.integers(0, 10, batch.size))
+    schema.column('b', depends=['a'])(lambda batch: batch['a'] * 2)
+    schema.column('c', depends=['b', 'a'])(lambda batch: batch['a'] + batch['b'] + batch.shift)
+    schema.column('d')(lambda batch: np.zeros(batch.size))
+    return schema
+
+
+class TestSchema:
+    def test_resolve_orders_dependencies_first(self):
+        assert _schema().resolve(['c']) == ['a', 'b', 'c'], "Dependencies should come before their dependents"
+
+    def test_resolve_skips_unrequested_columns(self):
+        assert _schema().resolve(['b']) == ['a', 'b'], "Columns nobody asked for should not be generated"
+
+    def test_generate_passes_dependencies_and_options(self):
+        values = _schema().generate(['c'], 5, np.random.default_rng(0), shift=1)
+        assert (values['c'] == values['a'] * 3 + 1).all(), "A column should see its dependencies and the options"
+
+    def test_column_values_do_not_depend_on_the_selection(self):
+        alone = _schema().generate(['a'], 5, np.random.default_rng(0))
+        together = _schema().generate(['d', 'c'], 5, np.random.default_rng(0), shift=0)
+        assert (alone['a'] == together['a']).all(), "Each column should draw from its own stream"
+
+    def test_unknown_and_circular_columns(self):
+        schema = _schema()
+        with pytest.raises(ValueError, match="Unknown column 'x'"):
+            schema.resolve(['x'])
+        schema.column('e', depends=['f'])(lambda batch: None)
+        schema.column('f', depends=['e'])(lambda batch: None)
+        with pytest.raises(ValueError, match='Circular'):
+            schema.resolve(['e'])
+
+    def test_student_dependencies_are_declared(self):
+        order = SCHEMA.resolve(['credits_remaining', 'phone_number'])
+        assert order.index('current_semester') < order.index('Number_of_credits_approved'), \
+            "Credits approved should be generated after the semester"
+        assert order.index('nationality') < order.index('phone_number'), "Phone numbers depend on the nationality"
+        assert 'email' not in order, "Unrequested columns should not be generated"
@@ -0,0 +1,92 @@
+import sqlite3
+import numpy as np
+import pandas as pd
+import pytest
+from data.data import generate_university_students_data, iter_university_students_data, main
+from data.sinks import parse_sink, write_duckdb, write_sqlite
+from data.writers import write_csv
+from unittest.mock import patch
+
+
+def _sqlite_frame(path, table='students'):
+    with sqlite3.connect(path) as connection:
+        return pd.read_sql(f'SELECT * FROM {table}', connection)
+
+
+class TestSinks:
+    def test_parse_sink(self):
+        assert parse_sink('sqlite:///output/university.db') == ('sqlite', 'output/university.db'), \
+            "Three slashes should give a relative path"
+        assert parse_sink('duckdb:////tmp/university.duckdb') == ('duckdb', '/tmp/university.duckdb'), \
+            "Four slashes should give an absolute path"
+        with pytest.raises(ValueError, match='Unknown sink'):
+            parse_sink('postgres:///university')
+        with pytest.raises(ValueError, match='needs a database path'):
+            parse_sink('sqlite://')
+
+    def test_sqlite_matches_csv(self, tmp_path):
+        rows = write_sqlite(iter_university_students_data(50, 20, seed=6), tmp_path / 'data.db', batch_rows=7)
+        write_csv(iter_university_students_data(50, 20, seed=6), tmp_path / 'data.csv')
+
+        loaded = _sqlite_frame(tmp_path / 'data.db')
+        expected = pd.read_csv(tmp_path / 'data.csv', dtype=str, keep_default_na=False)
+        expected['scholarship'] = (expected['scholarship'] == 'True').astype(int).astype(str)
+        assert rows == len(loaded) == 50, "Every row should be loaded"
+        assert list(loaded.columns) == list(expected.columns), "Columns should keep their order"
+        for column in expected.columns:
+            assert list(loaded[column].astype(str)) == list(expected[column]), f"'{column}' should match the CSV"
+
+    def test_sqlite_column_types_and_indexes(self, tmp_path):
+        df = generate_university_students_data(20, rng=np.random.default_rng(1))
+        write_sqlite([df], tmp_path / 'data.db', indexes=['student_id', 'program', 'missing'])
+
+        with sqlite3.connect(tmp_path / 'data.db') as connection:
+            types = {name: kind for _, name, kind, *_ in connection.execute('PRAGMA table_info(students)')}
+            indexes = {name: unique for _, name, unique, *_ in connection.execute('PRAGMA index_list(students)')}
+        assert types['GPA'] == 'REAL' and types['course_load'] == 'INTEGER', "Numbers should get numeric types"
+        assert types['program'] == 'TEXT' and types['date_of_birth'] == 'TEXT', "Text and dates should be TEXT"
+        assert indexes == {'students_student_id': 1, 'students_program': 0}, "Only existing columns are indexed"
+
+    def test_sqlite_replaces_the_table(self, tmp_path):
+        path = tmp_path / 'data.db'
+        write_sqlite([pd.DataFrame({'a': [1, 2, 3]})], path, table='t')
+        write_sqlite([pd.DataFrame({'b': ['x']})], path, table='t')
+        assert list(_sqlite_frame(path, 't')['b']) == ['x'], "A second load should replace the table"
+
+    def test_duckdb(self, tmp_path):
+        duckdb = pytest.importorskip('duckdb')
+        path = tmp_path / 'data.duckdb'
+        df = generate_university_students_data(30, rng=np.random.default_rng(2))
+        write_duckdb([df[:10], df[10:]], path, indexes=['student_id'])
+        connection = duckdb.connect(str(path))
+        loaded = connection.execute('SELECT * FROM students').df()
+        connection.close()
+        assert list(loaded['student_id']) == list(df['student_id']), "Every row should be loaded in order"
+        assert list(loaded['program'].astype(str)) == list(df['program'].astype(str)), "Enums should round trip"
+
+    def test_main_with_sqlite_sink(self, tmp_path):
+        path = tmp_path / 'university.db'
+        argv = ['data.py', '30', '--sink', f'sqlite:///{path}', '--seed', '2', '--chunk-size', '12',
+                '--sink-indexes', '--tables', 'enrollments,advisors']
+        with patch('sys.argv', argv):
+            with patch('builtins.print'):
+                main()
+
+        with sqlite3.connect(path) as connection:
+            counts = {table: connection.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                      for table in ['students', 'advisors', 'enrollments']}
+            orphans = connection.execute('SELECT COUNT(*) FROM enrollments LEFT JOIN students USING (student_id) '
+                                         'WHERE students.student_id IS NULL').fetchone()[0]
+            indexes = [row[1] for row in connection.execute('PRAGMA index_list(enrollments)')]
+        assert counts['students'] == 30 and counts['advisors'] == 49, "Every table should be loaded"
+        assert counts['enrollments'] > 30 and orphans == 0, "Enrollments should reference loaded students"
+        assert sorted(indexes) == ['enrollments_course_id', 'enrollments_student_id'], \
+            "Foreign keys of enrollments should be indexed"
+
+    def test_main_sink_with_output_path(self, tmp_path):
+        with patch('sys.argv', ['data.py', '10', str(tmp_path / 'data.csv'), '--sink', 'sqlite:///data.db']):
+            with patch('builtins.print') as mocked_print:
+                with pytest.raises(SystemExit):
+                    main()
+                mocked_print.assert_called_with(
+                    "Error: --sink loads a database, it cannot be combined with an output file")
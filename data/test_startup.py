@@ -0,0 +1,44 @@
+import os
+import subprocess
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+"""
+Times the import of numpy, measured in the same -X importtime run, that importing each
+module may take. The modules take about 1.5 times numpy and pandas alone about 6 times,
+so the budget still catches an eager pandas import while a busy machine slows both alike
+"""
+IMPORT_BUDGET_RATIO = 3
+
+HEAVY_MODULES = ['pandas', 'faker', 'scipy', 'matplotlib', 'seaborn', 'pyarrow', 'duckdb']
+
+
+def _import_times(*args):
+    """
+    Cumulative import time in seconds of every top level module imported by python -X importtime args
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', *args], cwd=ROOT, capture_output=True, text=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and 'cumulative' not in line:
+            _, cumulative, name = line.split('|')
+            times.setdefault(name.strip(), int(cumulative) / 1e6)
+    return times
+
+
+class TestStartup:
+    @pytest.mark.parametrize('module', ['data.data', 'data.plot2'])
+    def test_import_stays_light(self, module):
+        times = _import_times('-c', f'import {module}')
+        heavy = [name for name in HEAVY_MODULES if name in times]
+        assert not heavy, f"Importing {module} should not import {', '.join(heavy)}"
+        budget = IMPORT_BUDGET_RATIO * times['numpy']
+        assert times[module] < budget, \
+            f"Importing {module} took {times[module]:.3f} s, over {IMPORT_BUDGET_RATIO} times numpy ({budget:.3f} s)"
+
+    def test_help_does_not_import_pandas(self):
+        times = _import_times(os.path.join('data', 'data.py'), '--help')
+        assert 'argparse' in times, "The script should have run"
+        assert 'pandas' not in times, "--help should answer without importing pandas"
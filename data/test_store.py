@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+from data.data import CATEGORIES, generate_university_students_data, iter_university_students_data, main
+from data.store import open_store
+from data.writers import write_store
+from unittest.mock import patch
+
+
+class TestStore:
+    def test_round_trip(self, tmp_path):
+        path = tmp_path / 'data.store'
+        expected = pd.concat(iter_university_students_data(50, 20, seed=4), ignore_index=True)
+        rows = write_store(iter_university_students_data(50, 20, seed=4), path, categories=CATEGORIES)
+        store = open_store(path)
+
+        assert rows == len(store) == 50, "The store should hold every row"
+        df = store.to_frame()
+        assert list(df.columns) == list(expected.columns), "Columns should keep their order"
+        for column in expected.columns:
+            assert df[column].dtype == expected[column].dtype, f"'{column}' should keep its dtype"
+            assert list(df[column].astype(str)) == list(expected[column].astype(str)), f"'{column}' should round trip"
+
+    def test_rows_between_maps_only_the_slice(self, tmp_path):
+        path = tmp_path / 'data.store'
+        df = generate_university_students_data(100, rng=np.random.default_rng(2))
+        write_store([df], path)
+        store = open_store(path)
+
+        rows = store.rows_between(40, 45, ['student_id', 'GPA', 'program'])
+        assert list(rows.index) == [40, 41, 42, 43, 44], "Rows should keep their position in the store"
+        assert list(rows['student_id']) == [f'STU0000{i}' for i in range(40, 45)], "The slice should start at row 40"
+        assert isinstance(store.array('GPA'), np.memmap), "Numeric columns should be memory-mapped"
+        assert np.shares_memory(store.column('GPA', 40, 45), store.array('GPA')), "Numeric slices should not be copied"
+        assert list(store.column('program', 40, 45)) == list(df['program'][40:45]), "Categories should be decoded"
+
+    def test_strings(self, tmp_path):
+        path = tmp_path / 'text.store'
+        write_store([pd.DataFrame({'name': ['Ana', '', 'José Núñez']}), pd.DataFrame({'name': ['Zoë']})], path)
+        store = open_store(path)
+        assert list(store.strings('name')) == ['Ana', '', 'José Núñez', 'Zoë'], "Strings should round trip as UTF-8"
+        assert list(store.strings('name', 1, 2)) == [''], "Empty strings should be kept"
+        with pytest.raises(ValueError):
+            store.array('name')
+
+    def test_main_with_store_format(self, tmp_path):
+        path = tmp_path / 'data.store'
+        with patch('sys.argv', ['data.py', '30', str(path), '--chunk-size', '8', '--columns', 'student_id,gender,GPA']):
+            with patch('builtins.print'):
+                main()
+        store = open_store(path)
+        assert store.columns == ['student_id', 'gender', 'GPA'], "Only the selected columns should be stored"
+        assert store.categories('gender') == CATEGORIES['gender'], "Categorical columns should be stored as codes"
+        assert store.strings('student_id', 29)[0] == 'STU000029', "Chunks should be appended in order"
@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+import pytest
+from data.data import (PROGRAMS, dimension_tables, generate_university_students_data, generate_university_tables,
+                       iter_university_students_data, main)
+from data.tables import COURSES_PER_PROGRAM, PROGRAM_FACULTIES, enrollment_counts
+from unittest.mock import patch
+
+
+class TestTables:
+    def test_students_join_their_advisor(self):
+        advisors = dimension_tables(['advisors'])['advisors']
+        df = generate_university_students_data(2000, rng=np.random.default_rng(0))
+        joined = df.merge(advisors, on='advisor_id', how='left', suffixes=('', '_advisor'))
+        assert joined['advisor_name_advisor'].notna().all(), "Every advisor_id should exist in the advisors table"
+        assert (joined['advisor_name'] == joined['advisor_name_advisor']).all(), "Names should match the advisor"
+        assert df.groupby('advisor_id')['advisor_name'].nunique().max() == 1, "An advisor should have a single name"
+
+    def test_advisor_belongs_to_the_program(self):
+        tables = dimension_tables(['advisors', 'programs'])
+        df = generate_university_students_data(2000, rng=np.random.default_rng(1))
+        joined = df.merge(tables['advisors'], on='advisor_id').merge(tables['programs'], on='program_id')
+        assert (joined['program_x'].astype(str) == joined['program_y']).all(), "Advisors should be of the program"
+        assert tables['advisors']['program_id'].nunique() == len(PROGRAMS), "Every program should have an advisor"
+
+    def test_dimension_tables(self):
+        tables = dimension_tables()
+        assert len(tables['advisors']) == 49, "There should be 49 advisors by default"
+        assert tables['advisors']['advisor_id'].is_unique, "Advisor ids should be unique"
+        assert list(tables['programs']['program']) == PROGRAMS, "Programs should follow PROGRAMS"
+        assert set(PROGRAM_FACULTIES) == set(PROGRAMS), "Every program should have a faculty"
+        courses = tables['courses']
+        assert len(courses) == len(PROGRAMS) * COURSES_PER_PROGRAM, "Every program should have its courses"
+        assert courses['course_id'].is_unique, "Course ids should be unique"
+        assert courses['program_id'].isin(tables['programs']['program_id']).all(), "Courses should have a program"
+
+    def test_enrollments_reference_students_and_courses(self):
+        tables = generate_university_tables(500, tables=('students', 'enrollments'), rng=np.random.default_rng(2))
+        students, enrollments = tables['students'], tables['enrollments']
+        dimensions = dimension_tables(['programs', 'courses'])
+
+        assert len(enrollments) == enrollment_counts(students['course_load']).sum(), "course_load // 3 courses each"
+        assert enrollments['student_id'].isin(students['student_id']).all(), "Enrollments should have a student"
+        assert enrollments['enrollment_id'].is_unique, "Enrollment ids should be unique"
+        assert not enrollments.duplicated(['student_id', 'course_id']).any(), "Courses should not repeat per student"
+        joined = (enrollments.merge(dimensions['courses'], on='course_id')
+                  .merge(dimensions['programs'], on='program_id')
+                  .merge(students[['student_id', 'program', 'current_semester']], on='student_id'))
+        assert len(joined) == len(enrollments), "Every course_id should exist in the courses table"
+        assert (joined['program_x'] == joined['program_y'].astype(str)).all(), "Courses should be of the program"
+        assert (joined['semester'] == joined['current_semester']).all(), "Enrollments should be this semester"
+        assert enrollments['grade'].between(0, 5).all(), "Grades should be between 0 and 5"
+
+    def test_enrollments_do_not_depend_on_the_row_range(self):
+        whole = generate_university_tables(0, 40, ('enrollments',), seed=5)['enrollments']
+        part = generate_university_tables(25, 40, ('enrollments',), seed=5)['enrollments']
+        expected = whole[whole['student_id'] >= 'STU000025'].reset_index(drop=True)
+        pd.testing.assert_frame_equal(part, expected)
+
+    def test_enrollments_do_not_change_the_students(self):
+        alone = pd.concat(iter_university_students_data(30, 10, seed=3), ignore_index=True)
+        chunks = list(iter_university_students_data(30, 10, seed=3, tables=['students', 'enrollments']))
+        together = pd.concat([chunk['students'] for chunk in chunks], ignore_index=True)
+        pd.testing.assert_frame_equal(alone, together)
+
+    def test_too_few_advisors_is_rejected(self):
+        with pytest.raises(ValueError, match='at least the number of programs'):
+            generate_university_students_data(10, advisor_count=len(PROGRAMS) - 1)
+
+    def test_advisor_check_only_runs_when_advisors_are_drawn(self):
+        df = generate_university_students_data(5, columns=['GPA'], advisor_count=len(PROGRAMS) - 1)
+        assert list(df.columns) == ['GPA'], "Columns without an advisor should not need a valid advisor count"
+
+    def test_small_pool_size_with_the_default_advisors(self, tmp_path):
+        output_path = tmp_path / 'data.csv'
+        with patch('sys.argv', ['data.py', '30', str(output_path), '--pool-size', '10', '--tables', 'advisors']):
+            with patch('builtins.print'):
+                main()
+
+        students = pd.read_csv(output_path, dtype=str)
+        advisors = pd.read_csv(tmp_path / 'data_advisors.csv', dtype=str)
+        assert len(advisors) == 49 and advisors['advisor_name'].is_unique, \
+            "Every advisor should get its own name even when the pool is smaller"
+        joined = students.merge(advisors, on='advisor_id', suffixes=('', '_advisor'))
+        assert len(joined) == 30 and (joined['advisor_name'] == joined['advisor_name_advisor']).all(), \
+            "Students should get the names of the advisors table"
+
+    def test_gpa_precision_only_rounds_the_gpa(self, tmp_path):
+        output_path = tmp_path / 'data.csv'
+        argv = ['data.py', '40', str(output_path), '--seed', '1', '--gpa-precision', '0', '--tables', 'enrollments']
+        with patch('sys.argv', argv):
+            with patch('builtins.print'):
+                main()
+
+        students = pd.read_csv(output_path, dtype=str)
+        enrollments = pd.read_csv(tmp_path / 'data_enrollments.csv', dtype=str)
+        assert students['GPA'].str.isdigit().all(), "The GPA should be written without decimals"
+        assert enrollments['grade'].str.contains('.', regex=False).any(), "Grades should keep their decimals"
+
+    def test_main_writes_every_table(self, tmp_path):
+        output_path = tmp_path / 'data.csv'
+        argv = ['data.py', '40', str(output_path), '--seed', '1', '--chunk-size', '15', '--advisors', '60',
+                '--tables', 'enrollments,advisors,programs,courses']
+        with patch('sys.argv', argv):
+            with patch('builtins.print'):
+                main()
+
+        students = pd.read_csv(output_path, dtype=str)
+        advisors = pd.read_csv(tmp_path / 'data_advisors.csv', dtype=str)
+        enrollments = pd.read_csv(tmp_path / 'data_enrollments.csv', dtype=str)
+        assert (tmp_path / 'data_programs.csv').exists() and (tmp_path / 'data_courses.csv').exists(), \
+            "Every table should be written to its own file"
+        assert len(students) == 40 and len(advisors) == 60, "The students and advisors should be complete"
+        assert students['advisor_id'].isin(advisors['advisor_id']).all(), "Advisors should exist"
+        assert set(enrollments['student_id']) == set(students['student_id']), "Every student should be enrolled"
+
+    def test_main_with_unknown_table(self):
+        with patch('sys.argv', ['data.py', '10', '--tables', 'teachers']):
+            with patch('builtins.print') as mocked_print:
+                with pytest.raises(SystemExit):
+                    main()
+                mocked_print.assert_called_with("Error: Unknown table(s): teachers")
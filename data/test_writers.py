@@ -0,0 +1,110 @@
+import csv
+import numpy as np
+import pandas as pd
+import pytest
+from data.data import CATEGORIES, generate_university_students_data, iter_university_students_data
+from data.writers import format_from_path, write_csv, write_feather, write_parquet
+
+
+class TestWriters:
+    def test_write_csv_chunks(self, tmp_path):
+        output_path = tmp_path / 'data.csv'
+        rows = write_csv(iter_university_students_data(25, 10), output_path)
+        assert rows == 25, "write_csv should report the rows written"
+
+        lines = output_path.read_text().splitlines()
+        assert len(lines) == 26, "The CSV should have a header plus one line per row"
+        assert sum(line.startswith('"student_id"') for line in lines) == 1, "The header should be written once"
+
+        df = pd.read_csv(output_path)
+        assert list(df['student_id']) == [f'STU{str(i).zfill(6)}' for i in range(25)], "Student ids should be continuous"
+
+    def test_write_csv_matches_pandas(self, tmp_path):
+        df = generate_university_students_data(300, rng=np.random.default_rng(1), compact=False)
+        df.to_csv(tmp_path / 'pandas.csv', index=False, quoting=csv.QUOTE_ALL)
+        write_csv([df], tmp_path / 'fast.csv')
+        assert (tmp_path / 'fast.csv').read_bytes() == (tmp_path / 'pandas.csv').read_bytes(), \
+            "write_csv should write the same bytes as to_csv with QUOTE_ALL"
+
+    def test_write_csv_compact_reads_back(self, tmp_path):
+        df = generate_university_students_data(300, rng=np.random.default_rng(1))
+        write_csv([df], tmp_path / 'fast.csv')
+        read = pd.read_csv(tmp_path / 'fast.csv', dtype=str)
+        assert (read['GPA'].astype(np.float32) == df['GPA']).all(), "GPA should read back as the exact float32 value"
+        for column in CATEGORIES:
+            assert list(read[column].astype(str)) == list(df[column].astype(str)), f"'{column}' should be unchanged"
+
+    def test_write_csv_special_values(self, tmp_path):
+        df = pd.DataFrame({
+            'text': ['say "hi"', None, 'Bogotá'],
+            'number': [-12, 0, 7],
+            'ratio': [1.5, np.nan, -0.25],
+            'flag': [True, False, True],
+            'day': pd.to_datetime(['2001-02-03', None, '1999-12-31']),
+        })
+        write_csv([df], tmp_path / 'fast.csv')
+        df.to_csv(tmp_path / 'pandas.csv', index=False, quoting=csv.QUOTE_ALL)
+        assert (tmp_path / 'fast.csv').read_bytes() == (tmp_path / 'pandas.csv').read_bytes(), \
+            "Quotes, missing values, negative numbers and non-ASCII text should be written like pandas"
+
+    def test_write_csv_float_precision_rounds_like_pandas(self, tmp_path):
+        df = pd.DataFrame({'GPA': np.array([2.3, 4.4999, 4.5, 2.0, 3.14159, 0.125, 0.375, 1.15], dtype=np.float32)})
+        write_csv([df], tmp_path / 'gpa.csv', float_precision=2)
+        lines = (tmp_path / 'gpa.csv').read_text().splitlines()
+        assert lines[1:] == ['"2.30"', '"4.50"', '"4.50"', '"2.00"', '"3.14"', '"0.12"', '"0.38"', '"1.15"'], \
+            "Floats should be rounded half-even to the precision"
+
+    @pytest.mark.parametrize('precision', [0, 1, 2, 4])
+    def test_write_csv_float_precision_matches_float_format(self, tmp_path, precision):
+        rng = np.random.default_rng(precision)
+        values = np.round(rng.uniform(0, 5, 5000), precision + 1) - 10.0 ** -(precision + 3)
+        df = pd.DataFrame({'GPA': np.concatenate([values, -values]).astype(np.float32)})
+        write_csv([df], tmp_path / 'fast.csv', float_precision=precision)
+        df.to_csv(tmp_path / 'pandas.csv', index=False, quoting=csv.QUOTE_ALL, float_format=f'%.{precision}f')
+        assert (tmp_path / 'fast.csv').read_bytes() == (tmp_path / 'pandas.csv').read_bytes(), \
+            "Float32 values just below a decimal boundary should round like float_format"
+
+    @pytest.mark.filterwarnings('error::RuntimeWarning')
+    def test_write_csv_float_precision_keeps_infinite_and_large_values(self, tmp_path):
+        df = pd.DataFrame({'GPA': [np.inf, -np.inf, 1e20, -1e20, np.nan, 2 ** 53 / 100, 3.25]})
+        write_csv([df], tmp_path / 'fast.csv', float_precision=2)
+        df.to_csv(tmp_path / 'pandas.csv', index=False, quoting=csv.QUOTE_ALL, float_format='%.2f')
+        assert (tmp_path / 'fast.csv').read_bytes() == (tmp_path / 'pandas.csv').read_bytes(), \
+            "Infinite values and values past 2 ** 53 once scaled should be written like float_format"
+
+    def test_format_from_path(self):
+        assert format_from_path('out/data.parquet') == 'parquet', "The .parquet extension should be Parquet"
+        assert format_from_path('out/data.PQ') == 'parquet', "Extensions should be case insensitive"
+        assert format_from_path('out/data.feather') == 'feather', "The .feather extension should be Feather"
+        assert format_from_path('out/data.csv') == 'csv', "The .csv extension should be CSV"
+        assert format_from_path('out/data') == 'csv', "Unknown extensions should default to CSV"
+
+    def test_write_parquet_chunks(self, tmp_path):
+        pq = pytest.importorskip('pyarrow.parquet')
+        output_path = tmp_path / 'data.parquet'
+        expected = pd.concat(iter_university_students_data(25, 10, seed=3), ignore_index=True)
+        rows = write_parquet(iter_university_students_data(25, 10, seed=3), output_path, row_group_size=4,
+                             categories=CATEGORIES)
+        assert rows == 25, "write_parquet should report the rows written"
+        metadata = pq.ParquetFile(output_path).metadata
+        row_group_rows = [metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)]
+        assert row_group_rows == [4, 4, 2, 4, 4, 2, 4, 1], "Row groups should hold at most row_group_size rows of a chunk"
+
+        df = pd.read_parquet(output_path)
+        assert list(df['student_id']) == list(expected['student_id']), "Parquet output should keep the rows in order"
+        for column, values in CATEGORIES.items():
+            assert isinstance(df[column].dtype, pd.CategoricalDtype), f"'{column}' should be dictionary encoded"
+            assert list(df[column].cat.categories) == values, f"'{column}' should keep every category"
+        assert (df['GPA'] == expected['GPA']).all(), "Numeric values should round trip exactly"
+
+    def test_write_feather_chunks(self, tmp_path):
+        pytest.importorskip('pyarrow')
+        output_path = tmp_path / 'data.feather'
+        expected = pd.concat(iter_university_students_data(25, 10, seed=3), ignore_index=True)
+        rows = write_feather(iter_university_students_data(25, 10, seed=3), output_path, categories=CATEGORIES)
+        assert rows == 25, "write_feather should report the rows written"
+
+        df = pd.read_feather(output_path, columns=['student_id', 'nationality'])
+        assert list(df.columns) == ['student_id', 'nationality'], "Only the requested columns should be read"
+        assert list(df['student_id']) == list(expected['student_id']), "Feather output should keep the rows in order"
+        assert list(df['nationality'].astype(str)) == list(expected['nationality']), "Categorical values should round trip"
@@ -0,0 +1,470 @@
+import json
+import os
+import numpy as np
+
+try:
+    from .lazy import lazy_import
+    from .profiling import stage
+except ImportError:
+    from lazy import lazy_import
+    from profiling import stage
+
+pd = lazy_import('pandas')
+
+DEFAULT_ROW_GROUP_SIZE = 1000000
+
+"""
+Extensions recognised for each output format, the first one is the default
+"""
+FORMAT_EXTENSIONS = {
+    'csv': ['.csv'],
+    'parquet': ['.parquet', '.pq'],
+    'feather': ['.feather', '.arrow'],
+    'store': ['.store'],
+}
+
+
+def format_from_path(path):
+    """
+    Guess the file format from the extension of path, CSV when it is not recognised
+    """
+    extension = os.path.splitext(str(path))[1].lower()
+    for file_format, extensions in FORMAT_EXTENSIONS.items():
+        if extension in extensions:
+            return file_format
+    return 'csv'
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("Parquet and Feather output need pyarrow, install it with 'pip install pyarrow'")
+    return pyarrow
+
+
+def _as_categorical(df, categories):
+    """
+    Convert the columns named in categories to pandas Categoricals with a fixed set of
+    categories, so every chunk is written with the same dictionary
+    """
+    if not categories:
+        return df
+    return df.astype({
+        column: pd.CategoricalDtype(values) for column, values in categories.items() if column in df.columns
+    })
+
+
+"""
+Rows serialized at a time by write_csv, every field of the block is laid out in
+a byte matrix of block rows by the widest value of each column
+"""
+CSV_BLOCK_ROWS = 65536
+
+_QUOTE = np.frombuffer(b'"', dtype=np.uint8)
+_SEPARATOR = np.frombuffer(b'","', dtype=np.uint8)
+_END = np.frombuffer(b'"\n', dtype=np.uint8)
+
+
+def _byte_matrix(values):
+    """
+    Fixed width bytes array as a (rows, width) uint8 matrix, shorter values padded with NUL
+    """
+    values = np.asarray(values)
+    if values.dtype.itemsize == 0:
+        return np.zeros((len(values), 0), dtype=np.uint8)
+    return values.view(np.uint8).reshape(len(values), values.dtype.itemsize)
+
+
+def _encode(values):
+    """
+    Unicode array as a UTF-8 byte matrix, casting the code points straight to bytes
+    when every character is ASCII
+    """
+    if values.dtype.itemsize == 0:
+        return np.zeros((len(values), 0), dtype=np.uint8)
+    code_points = values.view(np.uint32).reshape(len(values), -1)
+    if (code_points < 128).all():
+        return code_points.astype(np.uint8)
+    return _byte_matrix(np.char.encode(values, 'utf-8'))
+
+
+def _escape_quotes(matrix):
+    """
+    Double the quotes inside a field, as csv.QUOTE_ALL does
+    """
+    if not (matrix == ord('"')).any():
+        return matrix
+    values = matrix.copy().view(f'S{matrix.shape[1]}').ravel()
+    return _byte_matrix(np.char.replace(values, b'"', b'""'))
+
+
+_POWERS_OF_TEN = 10 ** np.arange(1, 19, dtype=np.int64)
+
+
+def _digits(values, width):
+    """
+    Non-negative integers as a (rows, width) matrix of their zero padded decimal digits
+    """
+    powers = 10 ** np.arange(width - 1, -1, -1, dtype=np.int64)
+    return (values[:, None] // powers % 10 + ord('0')).astype(np.uint8)
+
+
+def _format_integers(values):
+    """
+    Integers as a digit matrix, the leading zeros are left as NUL padding
+    """
+    values = values.astype(np.int64)
+    if len(values) == 0:
+        return np.zeros((0, 0), dtype=np.uint8)
+    magnitudes = np.abs(values)
+    width = len(str(magnitudes.max()))
+    matrix = _digits(magnitudes, width)
+    lengths = np.searchsorted(_POWERS_OF_TEN, magnitudes, side='right') + 1
+    matrix[np.arange(width) < (width - lengths)[:, None]] = 0
+    if (values < 0).any():
+        matrix = np.concatenate([np.where(values < 0, ord('-'), 0).astype(np.uint8)[:, None], matrix], axis=1)
+    return matrix
+
+
+def _format_fixed(values, precision):
+    """
+    Floats with exactly precision decimals, rounded half-even on the exact binary value
+    as float_format='%.Nf' rounds them. Scaling can land a value within an ulp of a
+    tie on the wrong side, so those few are rounded by the % operator instead, as are
+    the infinities and the values too large for their scaled digits to fit a float
+    """
+    scale = 10 ** precision
+    magnitudes = np.abs(values.astype(np.float64))
+    scaled = magnitudes * scale
+    outside = ~(scaled < 2 ** 53)
+    scaled[outside] = 0
+    rounded = np.rint(scaled)
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) <= 4 * np.spacing(scaled)
+    rounded[near_tie] = [float(('%.*f' % (precision, value)).replace('.', '')) for value in magnitudes[near_tie]]
+    scaled = rounded.astype(np.int64)
+    pieces = [np.where(values < 0, ord('-'), 0).astype(np.uint8)[:, None], _format_integers(scaled // scale)]
+    if precision > 0:
+        pieces.append(np.full((len(values), 1), ord('.'), dtype=np.uint8))
+        pieces.append(_format_integers(scaled % scale + scale)[:, 1:])
+    matrix = np.concatenate(pieces, axis=1)
+    formatted = outside & ~np.isnan(magnitudes)
+    if formatted.any():
+        fallback = _encode(np.array(['%.*f' % (precision, value) for value in values[formatted]]))
+        matrix = np.pad(matrix, ((0, 0), (0, max(fallback.shape[1] - matrix.shape[1], 0))))
+        matrix[formatted] = 0
+        matrix[formatted, :fallback.shape[1]] = fallback
+    return matrix
+
+
+def _format_dates(dates):
+    """
+    datetime64[D] values from year 1000 to 9999 as YYYY-MM-DD
+    """
+    months = dates.astype('datetime64[M]')
+    years = months.astype('datetime64[Y]')
+    dash = np.full((len(dates), 1), ord('-'), dtype=np.uint8)
+    return np.concatenate([
+        _digits(years.astype(np.int64) + 1970, 4), dash,
+        _digits((months - years).astype(np.int64) + 1, 2), dash,
+        _digits((dates - months).astype(np.int64) + 1, 2),
+    ], axis=1)
+
+
+def _format_column(series, float_precision):
+    """
+    Byte matrix of one column as pandas writes it, with missing values left empty
+    """
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        table = np.array([str(value) for value in dtype.categories] + [''])
+        return _escape_quotes(_encode(table))[series.cat.codes.to_numpy()]
+    if pd.api.types.is_bool_dtype(dtype) and not series.hasnans:
+        return _byte_matrix(np.array([b'False', b'True'])[series.to_numpy().astype(np.int8)])
+    if pd.api.types.is_integer_dtype(dtype) and not series.hasnans:
+        return _format_integers(series.to_numpy())
+    if pd.api.types.is_float_dtype(dtype):
+        values = series.to_numpy()
+        if float_precision is None:
+            matrix = _byte_matrix(values.astype('S32'))
+            matrix = matrix[:, :np.flatnonzero(matrix.any(axis=0)).max(initial=-1) + 1]
+        else:
+            matrix = _format_fixed(values, float_precision)
+        matrix[np.isnan(values)] = 0
+        return matrix
+    if pd.api.types.is_datetime64_dtype(dtype):
+        values = series.to_numpy()
+        missing = np.isnat(values)
+        dates = values.astype('datetime64[D]')
+        if (values[~missing] == dates[~missing]).all():
+            matrix = _format_dates(np.where(missing, np.datetime64(0, 'D'), dates))
+        else:
+            matrix = _encode(np.char.replace(np.datetime_as_string(values), 'T', ' '))
+        matrix[missing] = 0
+        return matrix
+    if series.hasnans:
+        series = series.astype(object).where(series.notna(), '')
+    return _escape_quotes(_encode(series.to_numpy(dtype=str)))
+
+
+def _csv_block(df, float_precision=None):
+    """
+    The rows of df as QUOTE_ALL CSV bytes. Every field becomes a byte matrix padded
+    with NUL, the matrices are laid side by side with the quotes and separators, and
+    dropping the padding leaves the lines back to back.
+    """
+    if not isinstance(float_precision, dict):
+        float_precision = dict.fromkeys(df.columns, float_precision)
+    fields = [_format_column(df[column], float_precision.get(column)) for column in df.columns]
+    width = sum(field.shape[1] for field in fields) + 3 * len(fields)
+    matrix = np.empty((len(df), width), dtype=np.uint8)
+    matrix[:, 0] = _QUOTE[0]
+    position = 1
+    for i, field in enumerate(fields):
+        if i:
+            matrix[:, position:position + 3] = _SEPARATOR
+            position += 3
+        matrix[:, position:position + field.shape[1]] = field
+        position += field.shape[1]
+    matrix[:, position:] = _END
+    return matrix[matrix != 0].tobytes()
+
+
+def _csv_header(columns):
+    header = pd.DataFrame([list(map(str, columns))], columns=range(len(columns)))
+    return _csv_block(header.astype(object))
+
+
+def write_csv(chunks, output_path, header=True, float_precision=None, append=False):
+    """
+    Write DataFrame chunks to one CSV file, header first and then appending
+    each chunk, so a chunk can be freed as soon as it is on disk.
+    Every field is quoted like to_csv(quoting=csv.QUOTE_ALL), floats are written
+    with float_precision decimals or in their shortest exact form when None.
+    float_precision can also map column names to decimals, for only some columns.
+    With append, the rows are added at the end of an existing file, without a header.
+    Returns the number of rows written.
+    """
+    rows = 0
+    with open(output_path, 'ab' if append else 'wb') as f:
+        for i, df in enumerate(chunks):
+            with stage('write_csv'):
+                if i == 0 and header and not append:
+                    f.write(_csv_header(df.columns))
+                for start in range(0, len(df), CSV_BLOCK_ROWS):
+                    f.write(_csv_block(df.iloc[start:start + CSV_BLOCK_ROWS], float_precision))
+            rows += len(df)
+    return rows
+
+
+def write_parquet(chunks, output_path, row_group_size=DEFAULT_ROW_GROUP_SIZE, categories=None):
+    """
+    Write DataFrame chunks to one Parquet file, at most row_group_size rows per row group.
+    Columns in categories are dictionary encoded.
+    Returns the number of rows written.
+    """
+    pa = _require_pyarrow()
+    import pyarrow.parquet as pq
+
+    rows = 0
+    writer = None
+    try:
+        for df in chunks:
+            with stage('write_parquet'):
+                df = _as_categorical(df, categories)
+                if writer is None:
+                    table = pa.Table.from_pandas(df, preserve_index=False)
+                    writer = pq.ParquetWriter(output_path, table.schema)
+                else:
+                    table = pa.Table.from_pandas(df, schema=writer.schema, preserve_index=False)
+                writer.write_table(table, row_group_size=row_group_size)
+            rows += len(df)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def write_feather(chunks, output_path, row_group_size=DEFAULT_ROW_GROUP_SIZE, categories=None):
+    """
+    Write DataFrame chunks to one Feather (Arrow IPC) file, at most row_group_size rows
+    per record batch. Columns in categories are dictionary encoded.
+    Returns the number of rows written.
+    """
+    pa = _require_pyarrow()
+    import pyarrow.ipc
+
+    rows = 0
+    writer = None
+    try:
+        for df in chunks:
+            with stage('write_feather'):
+                df = _as_categorical(df, categories)
+                if writer is None:
+                    table = pa.Table.from_pandas(df, preserve_index=False)
+                    options = pa.ipc.IpcWriteOptions(compression='lz4')
+                    writer = pa.ipc.new_file(output_path, table.schema, options=options)
+                    schema = table.schema
+                else:
+                    table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+                writer.write_table(table, max_chunksize=row_group_size)
+            rows += len(df)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+"""
+Layout of a column store directory: STORE_META describes every column, numeric,
+boolean, date and categorical code columns are <column>.npy and string columns are
+<column>.offsets.npy (rows + 1 byte offsets) plus <column>.blob (UTF-8 bytes)
+"""
+STORE_META = 'meta.json'
+STORE_HEADER_SIZE = 128
+
+
+def _npy_header(dtype, rows):
+    """
+    .npy version 1.0 header of a 1-d array padded to STORE_HEADER_SIZE bytes, so it can
+    be rewritten in place once the final row count is known
+    """
+    header = repr({'descr': np.lib.format.dtype_to_descr(np.dtype(dtype)), 'fortran_order': False, 'shape': (rows,)})
+    preamble = np.lib.format.MAGIC_PREFIX + bytes([1, 0])
+    header_length = STORE_HEADER_SIZE - len(preamble) - 2
+    return preamble + header_length.to_bytes(2, 'little') + header.ljust(header_length - 1).encode('latin1') + b'\n'
+
+
+class _NpyColumn:
+    """
+    A .npy file that arrays are appended to, after the rows it already holds when append is set
+    """
+
+    def __init__(self, path, dtype, append=False):
+        self.dtype = np.dtype(dtype)
+        if append:
+            self.file = open(path, 'r+b')
+            self.rows = (self.file.seek(0, os.SEEK_END) - STORE_HEADER_SIZE) // self.dtype.itemsize
+        else:
+            self.file = open(path, 'wb')
+            self.file.write(_npy_header(self.dtype, 0))
+            self.rows = 0
+
+    def append(self, values):
+        self.file.write(np.ascontiguousarray(values, dtype=self.dtype).tobytes())
+        self.rows += len(values)
+
+    def close(self):
+        self.file.seek(0)
+        self.file.write(_npy_header(self.dtype, self.rows))
+        self.file.close()
+
+
+class _StringColumn:
+    """
+    Variable length strings as an offsets .npy column and a blob of UTF-8 bytes
+    """
+
+    def __init__(self, directory, column, append=False):
+        self.offsets = _NpyColumn(os.path.join(directory, f'{column}.offsets.npy'), np.int64, append)
+        if not append:
+            self.offsets.append(np.zeros(1, dtype=np.int64))
+        self.blob = open(os.path.join(directory, f'{column}.blob'), 'ab' if append else 'wb')
+        self.size = self.blob.tell()
+
+    def append(self, series):
+        matrix = _encode(series.fillna('').to_numpy(dtype=str))
+        lengths = (matrix != 0).sum(axis=1)
+        self.offsets.append(self.size + np.cumsum(lengths))
+        self.size += int(lengths.sum())
+        self.blob.write(matrix[matrix != 0].tobytes())
+
+    def close(self):
+        self.offsets.close()
+        self.blob.close()
+
+
+def _store_column(directory, series, meta):
+    column = series.name
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = [str(value) for value in series.dtype.categories]
+        code_dtype = np.int8 if len(categories) < 128 else np.int32
+        meta.update(kind='categorical', dtype=np.dtype(code_dtype).str, categories=categories)
+        return _NpyColumn(os.path.join(directory, f'{column}.npy'), code_dtype)
+    if pd.api.types.is_bool_dtype(series.dtype) or pd.api.types.is_numeric_dtype(series.dtype) \
+            or pd.api.types.is_datetime64_dtype(series.dtype):
+        dtype = series.to_numpy()[:0].dtype
+        meta.update(kind='numeric', dtype=dtype.str)
+        return _NpyColumn(os.path.join(directory, f'{column}.npy'), dtype)
+    meta.update(kind='string')
+    return _StringColumn(directory, column)
+
+
+def _reopen_store_column(directory, column, meta):
+    """
+    Writer appending to a column of an existing store described by its meta
+    """
+    if meta['kind'] == 'string':
+        return _StringColumn(directory, column, append=True)
+    return _NpyColumn(os.path.join(directory, f'{column}.npy'), meta['dtype'], append=True)
+
+
+def read_store_meta(output_path):
+    with open(os.path.join(output_path, STORE_META)) as f:
+        return json.load(f)
+
+
+def write_store(chunks, output_path, row_group_size=None, categories=None, append=False):
+    """
+    Write DataFrame chunks to a column store directory that store.open_store maps back
+    without reading it. Columns in categories, and Categorical columns, are stored as
+    integer codes. row_group_size is accepted for symmetry with the other writers.
+    With append, the rows are added after those of an existing store with the same columns.
+    Returns the number of rows written.
+    """
+    os.makedirs(output_path, exist_ok=True)
+    existing = read_store_meta(output_path) if append and os.path.exists(os.path.join(output_path, STORE_META)) \
+        else {'rows': 0}
+    rows = 0
+    columns = None
+    meta = {}
+    try:
+        for df in chunks:
+            with stage('write_store'):
+                df = _as_categorical(df, categories)
+                if columns is None and 'columns' in existing:
+                    if list(df.columns) != list(existing['columns']):
+                        raise ValueError(f"Cannot append columns {list(df.columns)} "
+                                         f"to a store of {list(existing['columns'])}")
+                    meta = existing['columns']
+                    columns = {column: _reopen_store_column(output_path, column, meta[column]) for column in df.columns}
+                elif columns is None:
+                    meta = {column: {} for column in df.columns}
+                    columns = {column: _store_column(output_path, df[column], meta[column]) for column in df.columns}
+                for column, writer in columns.items():
+                    series = df[column]
+                    if meta[column]['kind'] == 'categorical':
+                        if not isinstance(series.dtype, pd.CategoricalDtype) \
+                                or [str(value) for value in series.dtype.categories] != meta[column]['categories']:
+                            raise ValueError(f"The categories of '{column}' changed between chunks")
+                        writer.append(series.cat.codes.to_numpy())
+                    elif meta[column]['kind'] == 'string':
+                        writer.append(series)
+                    else:
+                        writer.append(series.to_numpy())
+            rows += len(df)
+    finally:
+        for writer in (columns or {}).values():
+            writer.close()
+
+    with open(os.path.join(output_path, STORE_META), 'w') as f:
+        json.dump({'rows': existing['rows'] + rows, 'columns': meta}, f, indent=2)
+    return rows
+
+
+WRITERS = {
+    'csv': write_csv,
+    'parquet': write_parquet,
+    'feather': write_feather,
+    'store': write_store,
+}